@@ -3,10 +3,19 @@ import os
 from dotenv import load_dotenv
 from embeddings_manager import EmbeddingsManager
 from gemini_api import GeminiAPI
+from logging_setup import configure_logging
 
 # Load environment variables
 load_dotenv()
 
+# Log to the console through a background thread (once per process, not per rerun)
+configure_logging()
+
+@st.cache_resource
+def get_gemini_api():
+    """One Groq client per process, so its connection pool and rate-limit state survive reruns and are shared by all sessions"""
+    return GeminiAPI()
+
 # Set page title and favicon
 st.set_page_config(
     page_title="Grain AI",
@@ -137,7 +146,13 @@ with st.sidebar:
     # Initialize Groq API
     if st.session_state.embeddings_loaded:
         try:
-            st.session_state.gemini_api = GeminiAPI()
+            st.session_state.gemini_api = get_gemini_api()
+            # Paraphrased questions are matched with the knowledge base's embedding model;
+            # cached answers are dropped when a rebuilt knowledge base is loaded
+            st.session_state.gemini_api.semantic_cache.attach(
+                st.session_state.embeddings_manager.encode_question,
+                st.session_state.embeddings_manager.kb_version
+            )
             st.success("Groq API initialized.")
         except Exception as e:
             st.error(f"Error initializing Groq API: {str(e)}")
@@ -296,25 +311,30 @@ if prompt := st.chat_input("Ask about admissions, fees, courses, or university l
                                     if 'content_quality' in chunk['metadata']:
                                         st.write(f"Quality: {chunk['metadata']['content_quality']:.2f}")
                     
-                    # Generate response with enhanced API
-                    response = st.session_state.gemini_api.generate_response(
-                        prompt, 
-                        relevant_chunks,
-                        st.session_state.query_history[:-1] if st.session_state.use_session_memory else None  # Exclude current query if session memory enabled
-                    )
-                    
-                    # Add a special case for meta-questions about previous queries (debug info)
-                    if st.session_state.debug_mode and st.session_state.use_session_memory and any(phrase in prompt.lower() for phrase in ["what did i ask", "previous question", "what have i asked"]):
-                        with st.expander("Session Memory Debug", expanded=True):
-                            st.write("Query History:")
-                            for i, q in enumerate(st.session_state.query_history[:-1]):
-                                st.write(f"{i+1}. {q}")
-                    
-                    # Display response
-                    st.markdown(response)
-                    
-                    # Add assistant message to chat history
-                    st.session_state.messages.append({"role": "assistant", "content": response})
+                # Add a special case for meta-questions about previous queries (debug info)
+                if st.session_state.debug_mode and st.session_state.use_session_memory and any(phrase in prompt.lower() for phrase in ["what did i ask", "previous question", "what have i asked"]):
+                    with st.expander("Session Memory Debug", expanded=True):
+                        st.write("Query History:")
+                        for i, q in enumerate(st.session_state.query_history[:-1]):
+                            st.write(f"{i+1}. {q}")
+                
+                # Generate response with enhanced API, showing it token by token as it arrives
+                stream = st.session_state.gemini_api.generate_response_stream(
+                    prompt, 
+                    relevant_chunks,
+                    st.session_state.query_history[:-1] if st.session_state.use_session_memory else None  # Exclude current query if session memory enabled
+                )
+                response_placeholder = st.empty()
+                with response_placeholder.container():
+                    st.write_stream(stream)
+                
+                # Post-processing may replace the streamed text once the response is complete
+                response = stream.text
+                if response != stream.streamed_text:
+                    response_placeholder.markdown(response)
+                
+                # Add assistant message to chat history
+                st.session_state.messages.append({"role": "assistant", "content": response})
 
 # Run instructions
 if not st.session_state.messages:
@@ -0,0 +1,359 @@
+"""
+Microbenchmarks for the ingestion pipeline
+
+Usage:
+    python benchmark.py text [--repeat N]
+    python benchmark.py pdf-backends [--data-dir Data] [--backends pypdf2,pymupdf]
+    python benchmark.py html [--links Data/Links.txt | --html-dir pages/] [--repeat N]
+    python benchmark.py enrich [--repeat N] [--workers N]
+"""
+import os
+import re
+import sys
+import glob
+import time
+import pickle
+import argparse
+
+import text_normalizer
+from pdf_backends import available_backends, get_backend
+
+def load_text_corpus(data_dir="Data", embeddings_folder="embeddings", limit=None):
+    """
+    Load real document text to benchmark against
+
+    Pages are extracted from the PDFs under data_dir when available; otherwise
+    the chunk texts of the saved knowledge bases are used.
+
+    Args:
+        data_dir: Folder with the source PDFs
+        embeddings_folder: Folder with saved *_chunks.pkl files
+        limit: Maximum number of texts to load
+
+    Returns:
+        List of raw text strings
+    """
+    texts = []
+    if os.path.isdir(data_dir):
+        import PyPDF2
+        from pdf_loader import _list_pdf_files
+        for file_path in _list_pdf_files(data_dir):
+            try:
+                with open(file_path, 'rb') as f:
+                    reader = PyPDF2.PdfReader(f)
+                    texts.extend(page.extract_text() or "" for page in reader.pages)
+            except Exception as e:
+                print(f"Skipping {file_path}: {e}")
+            if limit and len(texts) >= limit:
+                break
+
+    if not texts:
+        for chunks_path in sorted(glob.glob(os.path.join(embeddings_folder, "*_chunks.pkl"))):
+            with open(chunks_path, "rb") as f:
+                texts.extend(chunk["text"] for chunk in pickle.load(f))
+
+    return texts[:limit] if limit else texts
+
+# Reference implementations of the original multi-pass pdf_loader functions
+def _legacy_clean_extracted_text(text):
+    if not text:
+        return ""
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'^\d+$', '', text, flags=re.MULTILINE)
+    text = re.sub(r'([a-z])([A-Z])', r'\1 \2', text)
+    text = re.sub(r'([.!?])([A-Z])', r'\1 \2', text)
+    text = re.sub(r'\n\s*\n', '\n\n', text)
+    return text.strip()
+
+def _legacy_normalize_text_formatting(text):
+    text = re.sub(r'[•·▪▫◦‣⁃]', '•', text)
+    text = re.sub(r'^\d+\.\s*', r'\g<0>', text, flags=re.MULTILINE)
+    text = re.sub(r'\s+([.!?])', r'\1', text)
+    text = re.sub(r'([.!?])\s*', r'\1 ', text)
+    return text
+
+def _legacy_is_table_line(line):
+    patterns = [r'\d+\s+\d+', r'[A-Z][a-z]+\s+\d+', r'\$\d+', r'\d+\.\d+', r'[A-Z]+\s+[A-Z]+']
+    return any(re.search(pattern, line) for pattern in patterns)
+
+def _legacy_is_section_header(line):
+    section_patterns = [
+        r'(?:^|\n)([A-Z][A-Z\s]+:?)',
+        r'(?:^|\n)(\d+\.\s*[A-Z][^:\n]+)',
+        r'(?:^|\n)([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*:)',
+    ]
+    return any(re.match(pattern, line) for pattern in section_patterns)
+
+def _legacy_classify_content_type(text):
+    if re.search(r'\$\d+', text):
+        return 'financial'
+    elif re.search(r'\d{1,2}[/-]\d{1,2}[/-]\d{2,4}', text):
+        return 'temporal'
+    elif '•' in text or re.search(r'^\d+\.', text, re.MULTILINE):
+        return 'list'
+    elif _legacy_is_table_line(text):
+        return 'tabular'
+    elif len(text.split('.')) > 3:
+        return 'narrative'
+    else:
+        return 'general'
+
+def _legacy_chunk_features(text):
+    return {
+        "has_numbers": bool(re.search(r'\d+', text)),
+        "has_dates": bool(re.search(r'\d{1,2}[/-]\d{1,2}[/-]\d{2,4}', text)),
+        "has_currency": bool(re.search(r'\$[\d,]+', text)),
+        "has_bullet_points": '•' in text,
+        "has_table_data": '|TABLE|' in text or _legacy_is_table_line(text),
+        "content_type": _legacy_classify_content_type(text)
+    }
+
+# Reference implementations of the original per-chunk process_pdfs scoring functions
+def _legacy_classify_chunk_semantics(text):
+    from chunk_enrichment import SEMANTIC_CATEGORIES
+    text_lower = text.lower()
+    category_scores = {category: sum(1 for keyword in keywords if keyword in text_lower)
+                       for category, keywords in SEMANTIC_CATEGORIES.items()}
+    return max(category_scores, key=category_scores.get)
+
+def _legacy_assess_content_quality(text):
+    if not text or len(text.strip()) < 10:
+        return 0.1
+    factors = {
+        'length': min(len(text) / 500, 1.0),
+        'structure': 1.0 if any(char in text for char in ['•', '-', '1.', '2.', '3.']) else 0.5,
+        'specificity': 1.0 if any(word in text.lower() for word in ['specific', 'detail', 'information', 'procedure']) else 0.7,
+        'completeness': 1.0 if text.count('.') >= 2 else 0.6
+    }
+    weights = {'length': 0.3, 'structure': 0.2, 'specificity': 0.3, 'completeness': 0.2}
+    return min(sum(factors[key] * weights[key] for key in factors), 1.0)
+
+def _legacy_calculate_importance_score(text):
+    from chunk_enrichment import IMPORTANT_KEYWORDS
+    text_lower = text.lower()
+    importance_score = min(sum(1 for keyword in IMPORTANT_KEYWORDS if keyword in text_lower) / 5, 1.0)
+    if any(word in text_lower for word in ['specific', 'detail', 'exact', 'precise']):
+        importance_score = min(importance_score + 0.2, 1.0)
+    return importance_score
+
+def _legacy_enrich(texts):
+    return [(_legacy_classify_chunk_semantics(text), _legacy_assess_content_quality(text),
+             _legacy_calculate_importance_score(text)) for text in texts]
+
+def _legacy_pipeline(texts):
+    results = []
+    for text in texts:
+        cleaned = _legacy_clean_extracted_text(text)
+        normalized = _legacy_normalize_text_formatting(cleaned)
+        header = _legacy_is_section_header(normalized)
+        results.append((cleaned, normalized, header, _legacy_chunk_features(normalized)))
+    return results
+
+def _compiled_pipeline(texts):
+    results = []
+    for text in texts:
+        cleaned = text_normalizer.clean_extracted_text(text)
+        normalized = text_normalizer.normalize_text_formatting(cleaned)
+        header = text_normalizer.is_section_header(normalized)
+        results.append((cleaned, normalized, header, text_normalizer.extract_chunk_features(normalized)))
+    return results
+
+def _best_time(func, texts, repeat):
+    """Return the fastest of several timed runs and the last result"""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(texts)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def benchmark_text(args):
+    """
+    Compare the compiled normalizer against the original multi-pass regexes
+    """
+    texts = load_text_corpus(data_dir=args.data_dir, limit=args.limit)
+    if not texts:
+        print("No text found to benchmark (add PDFs under Data/ or run process_pdfs.py)")
+        return 1
+
+    total_chars = sum(len(text) for text in texts)
+    print(f"Corpus: {len(texts)} texts, {total_chars:,} characters")
+
+    legacy_time, legacy_results = _best_time(_legacy_pipeline, texts, args.repeat)
+    compiled_time, compiled_results = _best_time(_compiled_pipeline, texts, args.repeat)
+
+    mismatches = sum(1 for old, new in zip(legacy_results, compiled_results) if old != new)
+    print(f"Legacy multi-pass:   {legacy_time * 1000:8.1f} ms  ({total_chars / legacy_time / 1e6:6.1f} MB/s)")
+    print(f"Compiled normalizer: {compiled_time * 1000:8.1f} ms  ({total_chars / compiled_time / 1e6:6.1f} MB/s)")
+    print(f"Speedup: {legacy_time / compiled_time:.2f}x, output mismatches: {mismatches}")
+    return 1 if mismatches else 0
+
+def benchmark_pdf_backends(args):
+    """
+    Measure raw extraction throughput of each installed PDF backend
+    """
+    from pdf_loader import _list_pdf_files
+
+    pdf_files = _list_pdf_files(args.data_dir) if os.path.isdir(args.data_dir) else []
+    if not pdf_files:
+        print(f"No PDFs found under {args.data_dir}")
+        return 1
+
+    backends = args.backends.split(",") if args.backends else available_backends()
+    print(f"Corpus: {len(pdf_files)} PDFs under {args.data_dir}")
+    print(f"{'backend':<12}{'pages':>8}{'chars':>12}{'seconds':>10}{'pages/s':>10}{'chars/s':>12}{'errors':>8}")
+
+    for name in backends:
+        backend = get_backend(name)
+        pages = chars = errors = 0
+        start = time.perf_counter()
+        for file_path in pdf_files:
+            try:
+                with backend.open(file_path) as document:
+                    for page_num in range(document.page_count):
+                        chars += len(document.extract_page(page_num))
+                        pages += 1
+            except Exception:
+                errors += 1
+        elapsed = time.perf_counter() - start
+        print(f"{name:<12}{pages:>8}{chars:>12,}{elapsed:>10.2f}{pages / elapsed:>10.1f}{chars / elapsed:>12,.0f}{errors:>8}")
+    return 0
+
+def load_html_pages(links_file="Data/Links.txt", html_dir=None):
+    """
+    Load HTML pages to benchmark against
+    
+    Args:
+        links_file: File of URLs (one per line) to download
+        html_dir: Folder of saved *.html files to use instead of downloading
+        
+    Returns:
+        List of (url, html) tuples
+    """
+    if html_dir:
+        paths = sorted(glob.glob(os.path.join(html_dir, "**", "*.htm*"), recursive=True))
+        pages = []
+        for path in paths:
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                pages.append((path, f.read()))
+        return pages
+    
+    if not os.path.exists(links_file):
+        return []
+    
+    from web_scraper import WebScraper
+    with open(links_file, "r") as f:
+        urls = list(dict.fromkeys(line.strip() for line in f if line.strip()))
+    
+    scraper = WebScraper()
+    pages = []
+    try:
+        session = scraper.get_session()
+        for url in urls:
+            try:
+                response = session.get(url, timeout=30)
+            except Exception as e:
+                print(f"Skipping {url}: {e}")
+                continue
+            if response.status_code == 200 and "html" in response.headers.get("Content-Type", "html"):
+                pages.append((url, response.text))
+    finally:
+        scraper.close()
+    return pages
+
+def benchmark_html(args):
+    """
+    Compare the lxml and BeautifulSoup HTML text extraction paths
+    """
+    from web_scraper import WebScraper, lxml
+    
+    if lxml is None:
+        print("lxml is not installed")
+        return 1
+    
+    pages = load_html_pages(args.links, args.html_dir)
+    if not pages:
+        print("No HTML pages found to benchmark")
+        return 1
+    
+    total_bytes = sum(len(html.encode("utf-8")) for _, html in pages)
+    print(f"Corpus: {len(pages)} pages, {total_bytes:,} bytes")
+    
+    scraper = WebScraper()
+    
+    def run(extract):
+        return lambda items: [extract(html, url) for url, html in items]
+    
+    bs4_time, bs4_results = _best_time(run(scraper._extract_text_with_bs4), pages, args.repeat)
+    lxml_time, lxml_results = _best_time(run(scraper._extract_text_with_lxml), pages, args.repeat)
+    
+    mismatches = [url for (url, _), old, new in zip(pages, bs4_results, lxml_results) if old != new]
+    print(f"BeautifulSoup (html.parser): {bs4_time * 1000:8.1f} ms  ({len(pages) / bs4_time:7.1f} pages/s)")
+    print(f"lxml:                        {lxml_time * 1000:8.1f} ms  ({len(pages) / lxml_time:7.1f} pages/s)")
+    print(f"Speedup: {bs4_time / lxml_time:.2f}x, pages with different text: {len(mismatches)}")
+    # The parsers repair malformed markup differently, so a few differences are expected
+    for url in mismatches[:10]:
+        print(f"  differs: {url}")
+    return 0
+
+def benchmark_enrich(args):
+    """
+    Compare batched chunk enrichment against the original per-chunk scoring
+    """
+    from chunk_enrichment import iter_enriched_chunks
+
+    texts = load_text_corpus(data_dir=args.data_dir, limit=args.limit)
+    if not texts:
+        print("No text found to benchmark (add PDFs under Data/ or run process_pdfs.py)")
+        return 1
+    print(f"Corpus: {len(texts)} texts, {sum(len(text) for text in texts):,} characters")
+
+    def batched(items):
+        chunks = ({"text": text, "metadata": {}} for text in items)
+        return [(chunk["metadata"]["semantic_category"], chunk["metadata"]["content_quality"],
+                 chunk["metadata"]["importance_score"])
+                for chunk in iter_enriched_chunks(chunks, workers=args.workers)]
+
+    legacy_time, legacy_results = _best_time(_legacy_enrich, texts, args.repeat)
+    batched_time, batched_results = _best_time(batched, texts, args.repeat)
+
+    mismatches = sum(1 for old, new in zip(legacy_results, batched_results) if old != new)
+    print(f"Per-chunk scoring: {legacy_time * 1000:8.1f} ms  ({len(texts) / legacy_time:9.0f} chunks/s)")
+    print(f"Batched scoring:   {batched_time * 1000:8.1f} ms  ({len(texts) / batched_time:9.0f} chunks/s)")
+    print(f"Speedup: {legacy_time / batched_time:.2f}x, output mismatches: {mismatches}")
+    return 1 if mismatches else 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ingestion microbenchmarks")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    text_parser = subparsers.add_parser("text", help="Text normalization and chunk feature extraction")
+    text_parser.add_argument("--repeat", type=int, default=5, help="Timed runs per implementation")
+    text_parser.add_argument("--data-dir", default="Data", help="Folder with the source PDFs")
+    text_parser.add_argument("--limit", type=int, default=None, help="Maximum number of texts")
+    text_parser.set_defaults(func=benchmark_text)
+
+    backend_parser = subparsers.add_parser("pdf-backends", help="PDF text-extraction throughput per backend")
+    backend_parser.add_argument("--data-dir", default="Data", help="Folder with the source PDFs")
+    backend_parser.add_argument("--backends", default=None, help="Comma-separated backends (default: all installed)")
+    backend_parser.set_defaults(func=benchmark_pdf_backends)
+
+    html_parser = subparsers.add_parser("html", help="HTML text extraction with lxml vs BeautifulSoup")
+    html_parser.add_argument("--links", default=os.path.join("Data", "Links.txt"), help="File of URLs to download")
+    html_parser.add_argument("--html-dir", default=None, help="Folder of saved HTML pages (instead of downloading)")
+    html_parser.add_argument("--repeat", type=int, default=3, help="Timed runs per implementation")
+    html_parser.set_defaults(func=benchmark_html)
+
+    enrich_parser = subparsers.add_parser("enrich", help="Chunk metadata enrichment, batched vs per chunk")
+    enrich_parser.add_argument("--repeat", type=int, default=3, help="Timed runs per implementation")
+    enrich_parser.add_argument("--data-dir", default="Data", help="Folder with the source PDFs")
+    enrich_parser.add_argument("--limit", type=int, default=None, help="Maximum number of texts")
+    enrich_parser.add_argument("--workers", type=int, default=1, help="Processes used for batched scoring")
+    enrich_parser.set_defaults(func=benchmark_enrich)
+    
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
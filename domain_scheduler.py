@@ -0,0 +1,104 @@
+import time
+import threading
+from typing import Dict, Optional
+
+class _TokenBucket:
+    """Token bucket refilled at one token per delay seconds"""
+
+    def __init__(self, delay: float, burst: int):
+        self.delay = delay
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        if self.delay <= 0:
+            self.tokens = float(self.burst)
+        else:
+            # A bucket created after now was read must not lose tokens
+            self.tokens = min(self.burst, self.tokens + max(now - self.updated, 0.0) / self.delay)
+        self.updated = max(now, self.updated)
+
+class DomainScheduler:
+    def __init__(self, delay=1.0, burst=1):
+        """
+        Rate limiter with one token bucket per domain
+
+        A request to a domain takes one token; buckets refill at one token per
+        delay seconds and hold at most burst tokens, so with the default burst
+        requests to a domain are at least delay seconds apart while other
+        domains proceed independently.
+
+        Args:
+            delay: Default seconds between requests to the same domain
+            burst: Requests a domain may receive back to back after being idle
+        """
+        self.delay = delay
+        self.burst = burst
+        self._buckets: Dict[str, _TokenBucket] = {}
+        self._delays: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def set_delay(self, domain: str, delay: float):
+        """
+        Override the delay of one domain (e.g. from a robots.txt crawl-delay)
+
+        Args:
+            domain: Domain (netloc) to configure
+            delay: Seconds between requests to the domain
+        """
+        with self._lock:
+            self._delays[domain] = delay
+            if domain in self._buckets:
+                self._buckets[domain].delay = delay
+
+    def get_delay(self, domain: str) -> float:
+        """Return the delay in effect for a domain"""
+        with self._lock:
+            return self._delays.get(domain, self.delay)
+
+    def try_acquire(self, domain: str) -> float:
+        """
+        Take a request slot for a domain without blocking
+
+        Args:
+            domain: Domain (netloc) of the request
+
+        Returns:
+            0.0 if the slot was taken, otherwise seconds until one is available
+        """
+        with self._lock:
+            now = time.monotonic()
+            bucket = self._buckets.get(domain)
+            if bucket is None:
+                bucket = _TokenBucket(self._delays.get(domain, self.delay), self.burst)
+                self._buckets[domain] = bucket
+            bucket.refill(now)
+
+            if bucket.tokens >= 1:
+                bucket.tokens -= 1
+                return 0.0
+            return (1 - bucket.tokens) * bucket.delay
+
+    def acquire(self, domain: str, timeout: Optional[float] = None) -> bool:
+        """
+        Block until a request slot for a domain is available and take it
+
+        Args:
+            domain: Domain (netloc) of the request
+            timeout: Maximum seconds to wait (None waits indefinitely)
+
+        Returns:
+            True if the slot was taken, False on timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self.try_acquire(domain)
+            if wait == 0:
+                return True
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
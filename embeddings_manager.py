@@ -1,28 +1,48 @@
 import os
+import json
 import pickle
 import faiss
 import numpy as np
-from sentence_transformers import SentenceTransformer, util
 import re
+import hashlib
+from itertools import islice
 from typing import List, Dict, Tuple, Optional
+from profiling import profile_stage
 import logging
 
 # Set up logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def text_key(text: str) -> str:
+    """
+    Key identifying a chunk text when reusing its embedding
+    
+    Args:
+        text: Chunk text
+        
+    Returns:
+        Hex digest of the text
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
 class EmbeddingsManager:
-    def __init__(self, model_name="BAAI/bge-base-en-v1.5"):
+    def __init__(self, model_name="BAAI/bge-base-en-v1.5", model=None, embeddings_folder="embeddings"):
         """
         Initialize the embeddings manager with the specified model
         
         Args:
             model_name: Name of the sentence transformer model to use
+            model: Already loaded SentenceTransformer to share instead of loading model_name
+            embeddings_folder: Folder where the index and chunks are stored
         """
-        self.model = SentenceTransformer(model_name)
+        # The model is loaded on first use, so saving or loading an index does not pay for it
+        self.model_name = model_name
+        self._model = model
         self.index = None
         self.chunks = None
-        self.embeddings_folder = "embeddings"
+        self.kb_version = None  # Identifies the loaded knowledge base, see _update_kb_version
+        self.embeddings_folder = embeddings_folder
+        self.reused_embeddings = 0
         self.relevance_threshold = 0.65  # Minimum similarity score for relevance
         self.dynamic_threshold = 0.45  # Lower threshold for dynamic responses
         
@@ -40,6 +60,18 @@ class EmbeddingsManager:
         if not os.path.exists(self.embeddings_folder):
             os.makedirs(self.embeddings_folder)
     
+    @property
+    def model(self):
+        """The SentenceTransformer, loaded on first access"""
+        if self._model is None:
+            from sentence_transformers import SentenceTransformer
+            self._model = SentenceTransformer(self.model_name)
+        return self._model
+    
+    @model.setter
+    def model(self, model):
+        self._model = model
+    
     def create_embeddings(self, chunks):
         """
         Create embeddings for text chunks and build FAISS index
@@ -51,15 +83,182 @@ class EmbeddingsManager:
         texts = [chunk["text"] for chunk in chunks]
         
         # Generate embeddings
-        embeddings = self.model.encode(texts, normalize_embeddings=True)
+        with profile_stage("create_embeddings", items=len(texts)):
+            embeddings = self.model.encode(texts, normalize_embeddings=True)
         
         # Create FAISS index - using IndexFlatIP for cosine similarity
         dimension = embeddings.shape[1]
         self.index = faiss.IndexFlatIP(dimension)
         self.index.add(embeddings)
+        self._update_kb_version()
+        
+        return embeddings
+    
+    def create_embeddings_streaming(self, chunks, batch_size=256, reuse_prefix=None):
+        """
+        Create embeddings for a stream of chunks, adding them to the FAISS index batch by batch
+        
+        Args:
+            chunks: Iterable of dictionaries with text and metadata
+            batch_size: Number of chunks encoded at a time
+            reuse_prefix: Prefix of a saved index whose vectors are reused for chunks
+                with identical text, so only new or changed chunks are encoded
+            
+        Returns:
+            Number of chunks embedded
+        """
+        self.chunks = []
+        self.index = None
+        self.reused_embeddings = 0
+        reusable = self.load_reusable_vectors(reuse_prefix) if reuse_prefix else None
+        batch = []
+        
+        for chunk in chunks:
+            batch.append(chunk)
+            if len(batch) >= batch_size:
+                self._add_embedding_batch(batch, reusable)
+                batch = []
+        
+        if batch:
+            self._add_embedding_batch(batch, reusable)
+        self._update_kb_version()
+        
+        return len(self.chunks)
+    
+    def load_reusable_vectors(self, filename_prefix):
+        """
+        Load the vectors of a saved index keyed by chunk text
+        
+        Only an index built with this manager's model is reused; vectors from
+        another model live in a different space (or have another dimension).
+        
+        Args:
+            filename_prefix: Prefix of the saved files
+            
+        Returns:
+            Tuple of (vectors array, dict mapping text_key(text) to row), or None if unavailable
+        """
+        index_path = os.path.join(self.embeddings_folder, f"{filename_prefix}_index.faiss")
+        chunks_path = os.path.join(self.embeddings_folder, f"{filename_prefix}_chunks.pkl")
+        if not os.path.exists(index_path) or not os.path.exists(chunks_path):
+            return None
+        
+        saved_model = self.saved_model_name(filename_prefix)
+        if saved_model != self.model_name:
+            logger.info(f"Not reusing embeddings from {filename_prefix}: built with {saved_model or 'an unknown model'}, "
+                        f"not {self.model_name}")
+            return None
+        
+        try:
+            index = faiss.read_index(index_path)
+            with open(chunks_path, "rb") as f:
+                saved_chunks = pickle.load(f)
+            vectors = index.reconstruct_n(0, index.ntotal)
+        except Exception as e:
+            logger.warning(f"Not reusing embeddings from {filename_prefix}: {e}")
+            return None
+        
+        rows = {text_key(chunk["text"]): row for row, chunk in enumerate(saved_chunks[:index.ntotal])}
+        return vectors, rows
+    
+    def encode_texts(self, texts, batch_size=256, reusable=None):
+        """
+        Encode texts, reusing known vectors for texts that were encoded before
+        
+        Args:
+            texts: Iterable of texts (consumed one batch at a time)
+            batch_size: Number of texts encoded at a time
+            reusable: Optional (vectors, rows) where rows maps text_key(text) to a row of vectors
+            
+        Returns:
+            Float32 array of normalized embeddings, one row per text
+        """
+        batches = []
+        texts = iter(texts)
+        with profile_stage("encode_texts") as record:
+            batch = list(islice(texts, batch_size))
+            while batch:
+                batches.append(self._encode_batch(batch, reusable))
+                batch = list(islice(texts, batch_size))
+            record.items = sum(len(batch) for batch in batches)
+        if not batches:
+            return np.empty((0, 0), dtype=np.float32)
+        return np.vstack(batches)
+    
+    def build_index(self, chunks, embeddings):
+        """
+        Build the FAISS index from chunks and their precomputed embeddings
+        
+        Args:
+            chunks: List of dictionaries with text and metadata
+            embeddings: Float32 array with one normalized row per chunk
+        """
+        self.chunks = chunks
+        self.index = faiss.IndexFlatIP(embeddings.shape[1])
+        self.index.add(embeddings)
+        self._update_kb_version()
+    
+    def encode_question(self, question: str) -> np.ndarray:
+        """
+        Encode a question as it is, without the retrieval query enhancement
         
+        Args:
+            question: User's question
+            
+        Returns:
+            Normalized float32 embedding
+        """
+        return np.asarray(self.model.encode([question], normalize_embeddings=True)[0], dtype=np.float32)
+    
+    def _update_kb_version(self):
+        """Fingerprint the embedding model and chunk texts, so caches of answers can tell a rebuilt knowledge base"""
+        digest = hashlib.sha256(self.model_name.encode("utf-8"))
+        for chunk in self.chunks or []:
+            digest.update(text_key(chunk["text"]).encode("ascii"))
+        self.kb_version = digest.hexdigest()[:16]
+    
+    def _encode_batch(self, texts, reusable=None):
+        """
+        Encode a batch of texts, copying reusable vectors instead of encoding them
+        
+        Args:
+            texts: List of texts
+            reusable: Optional (vectors, rows) keyed by text_key
+            
+        Returns:
+            Float32 array of normalized embeddings
+        """
+        rows = [reusable[1].get(text_key(text)) for text in texts] if reusable else [None] * len(texts)
+        missing = [i for i, row in enumerate(rows) if row is None]
+        
+        if len(missing) == len(texts):
+            return self.model.encode(texts, normalize_embeddings=True)
+        
+        vectors = reusable[0]
+        embeddings = np.empty((len(texts), vectors.shape[1]), dtype=np.float32)
+        if missing:
+            embeddings[missing] = self.model.encode([texts[i] for i in missing], normalize_embeddings=True)
+        for i, row in enumerate(rows):
+            if row is not None:
+                embeddings[i] = vectors[row]
+        self.reused_embeddings += len(texts) - len(missing)
         return embeddings
     
+    def _add_embedding_batch(self, batch, reusable=None):
+        """
+        Encode a batch of chunks and append it to the index
+        
+        Args:
+            batch: List of dictionaries with text and metadata
+            reusable: Optional (vectors, rows) from load_reusable_vectors
+        """
+        embeddings = self._encode_batch([chunk["text"] for chunk in batch], reusable)
+        
+        if self.index is None:
+            self.index = faiss.IndexFlatIP(embeddings.shape[1])
+        self.index.add(embeddings)
+        self.chunks.extend(batch)
+    
     def save_embeddings(self, filename_prefix="university_combined"):
         """
         Save the embeddings and chunks to disk
@@ -79,8 +278,32 @@ class EmbeddingsManager:
         with open(chunks_path, "wb") as f:
             pickle.dump(self.chunks, f)
         
+        # Record the model, so a later build only reuses these vectors with the same model
+        with open(self._meta_path(filename_prefix), "w") as f:
+            json.dump({"model": self.model_name}, f)
+        
         return index_path, chunks_path
     
+    def saved_model_name(self, filename_prefix="university_combined") -> Optional[str]:
+        """
+        Get the name of the model a saved index was built with
+        
+        Args:
+            filename_prefix: Prefix of the saved files
+            
+        Returns:
+            Model name, or None if it was not recorded
+        """
+        try:
+            with open(self._meta_path(filename_prefix), "r") as f:
+                return json.load(f).get("model")
+        except (OSError, ValueError, AttributeError):
+            return None
+    
+    def _meta_path(self, filename_prefix):
+        """Path of the file describing a saved index"""
+        return os.path.join(self.embeddings_folder, f"{filename_prefix}_meta.json")
+    
     def load_embeddings(self, filename_prefix="university_combined"):
         """
         Load embeddings and chunks from disk
@@ -103,9 +326,26 @@ class EmbeddingsManager:
         # Load the chunks
         with open(chunks_path, "rb") as f:
             self.chunks = pickle.load(f)
+        self._update_kb_version()
         
         return True
     
+    def memory_usage_bytes(self) -> int:
+        """
+        Estimate the memory held by the loaded index and chunks
+        
+        Returns:
+            Approximate size in bytes (0 if nothing is loaded)
+        """
+        total = 0
+        if self.index is not None:
+            # Flat indexes store one float32 vector per entry
+            total += self.index.ntotal * self.index.d * 4
+        if self.chunks:
+            for chunk in self.chunks:
+                total += len(chunk["text"]) + 64 * len(chunk.get("metadata", {}))
+        return total
+    
     def combine_embeddings(self, sources):
         """
         Combine embeddings from multiple sources
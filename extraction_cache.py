@@ -0,0 +1,191 @@
+import os
+import json
+import pickle
+import hashlib
+import threading
+from typing import Dict, List, Optional
+import logging
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+class ExtractionCache:
+    def __init__(self, cache_folder=os.path.join("embeddings", "extraction_cache")):
+        """
+        On-disk cache of extracted PDF pages and chunks keyed by file fingerprint
+
+        A file's fingerprint is the SHA-256 of its content. The path, size and
+        mtime are remembered so unchanged files are recognised without re-hashing,
+        and a touched but identical file still hits.
+
+        Args:
+            cache_folder: Folder where cache entries are stored
+        """
+        self.cache_folder = cache_folder
+        self.index_path = os.path.join(cache_folder, "index.json")
+        self.page_hits = 0
+        self.chunk_hits = 0
+        self.misses = 0
+        self._fingerprints: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+        if not os.path.exists(self.cache_folder):
+            os.makedirs(self.cache_folder)
+
+        self._index = {}
+        if os.path.exists(self.index_path):
+            try:
+                with open(self.index_path, "r") as f:
+                    self._index = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable extraction cache index: {e}")
+
+    def fingerprint(self, file_path: str) -> str:
+        """
+        Get the content fingerprint of a file, hashing only if it looks changed
+
+        Args:
+            file_path: Path to the file
+
+        Returns:
+            Hex SHA-256 digest of the file content
+        """
+        key = os.path.abspath(file_path)
+        with self._lock:
+            if key in self._fingerprints:
+                return self._fingerprints[key]
+
+        stat = os.stat(file_path)
+        entry = self._index.get(key)
+        if entry and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime_ns:
+            digest = entry["sha256"]
+        else:
+            digest = _hash_file(file_path)
+            with self._lock:
+                self._index[key] = {"size": stat.st_size, "mtime": stat.st_mtime_ns, "sha256": digest}
+                self._save_index()
+
+        with self._lock:
+            self._fingerprints[key] = digest
+        return digest
+
+    def get_pages(self, file_path: str, pages_key: str) -> Optional[List[str]]:
+        """
+        Get cached page texts for a file
+
+        Args:
+            file_path: Path to the PDF file
+            pages_key: Identifier of the extraction configuration
+
+        Returns:
+            List of cleaned page texts, or None on a miss
+        """
+        pages = self._load(self._entry_path(file_path, "pages", pages_key))
+        if pages is None:
+            return None
+        self.page_hits += 1
+        return pages
+
+    def put_pages(self, file_path: str, pages_key: str, pages: List[str]):
+        """
+        Store the page texts extracted from a file
+
+        Args:
+            file_path: Path to the PDF file
+            pages_key: Identifier of the extraction configuration
+            pages: List of cleaned page texts
+        """
+        self.misses += 1
+        self._store(self._entry_path(file_path, "pages", pages_key), pages)
+
+    def has_chunks(self, file_path: str, chunk_key: str) -> bool:
+        """
+        Check whether chunks for a file and chunking configuration are cached
+
+        Args:
+            file_path: Path to the PDF file
+            chunk_key: Identifier of the chunking configuration
+
+        Returns:
+            True if a cache entry exists
+        """
+        return os.path.exists(self._entry_path(file_path, "chunks", chunk_key))
+
+    def get_chunks(self, file_path: str, chunk_key: str) -> Optional[List[Dict]]:
+        """
+        Get cached chunks for a file and chunking configuration
+
+        Args:
+            file_path: Path to the PDF file
+            chunk_key: Identifier of the chunking configuration
+
+        Returns:
+            List of chunk dictionaries, or None on a miss
+        """
+        chunks = self._load(self._entry_path(file_path, "chunks", chunk_key))
+        if chunks is None:
+            return None
+        self.chunk_hits += 1
+        return chunks
+
+    def put_chunks(self, file_path: str, chunk_key: str, chunks: List[Dict]):
+        """
+        Store the chunks produced from a file
+
+        Args:
+            file_path: Path to the PDF file
+            chunk_key: Identifier of the chunking configuration
+            chunks: List of chunk dictionaries
+        """
+        self._store(self._entry_path(file_path, "chunks", chunk_key), chunks)
+
+    def stats(self) -> Dict[str, int]:
+        """Return cache hit and miss counters"""
+        return {"page_hits": self.page_hits, "chunk_hits": self.chunk_hits, "misses": self.misses}
+
+    def _entry_path(self, file_path: str, kind: str, extra: str = "") -> str:
+        """Build the on-disk path of a cache entry"""
+        key = f"{kind}|{extra}|{os.path.basename(file_path)}"
+        suffix = hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.cache_folder, f"{self.fingerprint(file_path)}_{suffix}.pkl")
+
+    def _load(self, path: str):
+        """Load a pickled entry, treating unreadable entries as misses"""
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "rb") as f:
+                return pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError) as e:
+            logger.warning(f"Ignoring corrupt extraction cache entry {path}: {e}")
+            return None
+
+    def _store(self, path: str, value):
+        """Atomically write a pickled entry"""
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(value, f)
+        os.replace(tmp_path, path)
+
+    def _save_index(self):
+        """Atomically write the fingerprint index"""
+        tmp_path = f"{self.index_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self._index, f)
+        os.replace(tmp_path, self.index_path)
+
+def _hash_file(file_path: str) -> str:
+    """
+    Hash a file's content
+
+    Args:
+        file_path: Path to the file
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
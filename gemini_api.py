@@ -1,9 +1,16 @@
 import requests
 import os
+import time
+import random
+from email.utils import parsedate_to_datetime
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
 import json
 import re
-from typing import List, Dict, Optional, Tuple
+import numpy as np
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from rate_limiter import HeaderRateLimiter
+from response_cache import ResponseCache, SemanticResponseCache
 import logging
 
 # Load environment variables
@@ -12,12 +19,49 @@ load_dotenv()
 # Set up logging
 logger = logging.getLogger(__name__)
 
+# Responses worth retrying: rate limited, or a transient server error
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_BACKOFF = 20.0  # Upper bound of a single retry delay (seconds)
+
+class StreamedResponse:
+    def __init__(self, deltas: Iterator[str], finish: Callable[[str], str]):
+        """
+        A response that arrives as text deltas
+        
+        Args:
+            deltas: Iterator of text pieces
+            finish: Function mapping the complete streamed text to the final response
+        """
+        self._deltas = deltas
+        self._finish = finish
+        self._parts = []
+        self.streamed_text = None
+        self.text = None
+    
+    def __iter__(self) -> Iterator[str]:
+        for delta in self._deltas:
+            self._parts.append(delta)
+            yield delta
+        self.streamed_text = "".join(self._parts)
+        self.text = self._finish(self.streamed_text)
+
 class GeminiAPI:
-    def __init__(self):
+    def __init__(self, max_retries=3, backoff_factor=0.5, max_rate_limit_wait=30.0, response_cache=None,
+                 semantic_cache=None):
         """
         Initialize the Groq API client using direct HTTP requests
         
         Requires GROQ_API_KEY environment variable to be set in .env file
+        
+        Args:
+            max_retries: Retries of a request that failed with 429, 5xx or a connection error
+            backoff_factor: Base of the jittered exponential backoff between retries (seconds)
+            max_rate_limit_wait: Longest a request waits for rate-limit quota before it is sent (seconds)
+            response_cache: ResponseCache for answers (default: in memory, or the
+                file named by RESPONSE_CACHE_PATH)
+            semantic_cache: SemanticResponseCache for paraphrased questions (default: one with
+                the similarity threshold from SEMANTIC_CACHE_THRESHOLD); it is only
+                consulted once attached to a question encoder and knowledge-base version
         """
         # Load environment variables again to ensure it's loaded
         load_dotenv()
@@ -29,6 +73,11 @@ class GeminiAPI:
         self.api_key = api_key
         self.api_url = "https://api.groq.com/openai/v1/chat/completions"
         self.model_name = 'llama-3.1-8b-instant'
+        self.generation_params = {
+            "temperature": 0.3,  # Slightly higher for more dynamic responses
+            "max_tokens": 2048,
+            "top_p": 0.9  # Higher for more creative responses
+        }
         
         # Using direct HTTP requests to bypass client library issues
         self.headers = {
@@ -36,6 +85,24 @@ class GeminiAPI:
             "Content-Type": "application/json"
         }
         
+        # One pooled session keeps the TLS connection to the API open between questions
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=10))
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.rate_limiter = HeaderRateLimiter(max_wait=max_rate_limit_wait)
+        
+        # Identical questions over the same retrieved chunks are answered without calling the API
+        if response_cache is None:
+            response_cache = ResponseCache(path=os.getenv("RESPONSE_CACHE_PATH") or None)
+        self.response_cache = response_cache
+        
+        # Paraphrases of answered questions over mostly the same chunks reuse the answer too
+        if semantic_cache is None:
+            semantic_cache = SemanticResponseCache(similarity_threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.9")))
+        self.semantic_cache = semantic_cache
+        
         # University-specific response patterns for dynamic responses
         self.university_domains = {
             'academic': {
@@ -158,7 +225,8 @@ class GeminiAPI:
                     'filtering_reason': 'domain_general_knowledge'
                 }
             }
-            context.append(general_knowledge)
+            # A new list, so the caller's retrieved chunks (and their cache key) stay unchanged
+            context = context + [general_knowledge]
         
         return context
     
@@ -174,6 +242,106 @@ class GeminiAPI:
         Returns:
             Gemini's response
         """
+        answer, enhanced_context = self._prepare_response(question, context, query_history)
+        if answer is not None:
+            return answer
+        
+        cached, cache_key, embedding = self._cached_answer(question, enhanced_context, query_history)
+        if cached is not None:
+            return cached
+        
+        prompt = self._create_prompt(question, enhanced_context, query_history)
+        
+        try:
+            # Make direct HTTP request to Groq API
+            response = self._post(self._chat_payload(prompt, stream=False))
+            
+            if response.status_code == 200:
+                response_data = response.json()
+                response_text = response_data['choices'][0]['message']['content']
+                
+                # Add a post-processing step to verify answer integrity
+                answer = self._verify_and_refine_response(response_text, question, enhanced_context)
+                self._store_answer(cache_key, embedding, question, enhanced_context, query_history, answer)
+                return answer
+            else:
+                return f"Error: HTTP {response.status_code} - {response.text}"
+        except Exception as e:
+            logger.error(f"Error generating response: {str(e)}")
+            # Fallback to dynamic response
+            return self._generate_dynamic_response(question, enhanced_context)
+    
+    def generate_response_stream(self, question: str, context: List[Dict],
+                                 query_history: Optional[List[str]] = None) -> StreamedResponse:
+        """
+        Generate a response like generate_response, yielding text as the model produces it
+        
+        Args:
+            question: User's question
+            context: Context from relevant PDF chunks
+            query_history: Previous user queries for context
+            
+        Returns:
+            StreamedResponse; iterate it for text deltas, then read its text attribute
+            for the final response (after _verify_and_refine_response)
+        """
+        answer, enhanced_context = self._prepare_response(question, context, query_history)
+        if answer is None:
+            answer, cache_key, embedding = self._cached_answer(question, enhanced_context, query_history)
+        if answer is not None:
+            return StreamedResponse(iter([answer]), lambda text: answer)
+        
+        prompt = self._create_prompt(question, enhanced_context, query_history)
+        
+        # Only model output is verified; error messages and fallbacks are shown as they are.
+        # An answer cut off by a failure mid-stream is shown but not cached.
+        state = {"model_output": True, "complete": True}
+        
+        def deltas():
+            received = False
+            try:
+                response = self._post(self._chat_payload(prompt, stream=True), stream=True)
+                with response:
+                    if response.status_code != 200:
+                        state["model_output"] = False
+                        yield f"Error: HTTP {response.status_code} - {response.text}"
+                        return
+                    for delta in _iter_sse_deltas(response):
+                        received = True
+                        yield delta
+            except Exception as e:
+                logger.error(f"Error generating response: {str(e)}")
+                state["complete"] = False
+                if not received:
+                    # Fallback to dynamic response
+                    state["model_output"] = False
+                    yield self._generate_dynamic_response(question, enhanced_context)
+        
+        def finish(text):
+            if not state["model_output"]:
+                return text
+            # Add a post-processing step to verify answer integrity
+            answer = self._verify_and_refine_response(text, question, enhanced_context)
+            if state["complete"]:
+                self._store_answer(cache_key, embedding, question, enhanced_context, query_history, answer)
+            return answer
+        
+        return StreamedResponse(deltas(), finish)
+    
+    def _prepare_response(self, question: str, context: List[Dict],
+                          query_history: Optional[List[str]] = None) -> Tuple[Optional[str], Optional[List[Dict]]]:
+        """
+        Answer questions that need no model call and prepare the context for the rest
+        
+        Args:
+            question: User's question
+            context: Context from relevant PDF chunks
+            query_history: Previous user queries for context
+            
+        Returns:
+            Tuple of (answer, None) when the question is answered without the model,
+            or (None, enhanced context) when the model should be asked
+        """
         # Special handling for questions about previous queries
         if query_history and len(query_history) > 0:
             lower_question = question.lower()
@@ -195,13 +363,13 @@ class GeminiAPI:
             
             if is_meta_query:
                 if len(query_history) == 1:
-                    return f"Your previous question was: \"{query_history[0]}\""
+                    return f"Your previous question was: \"{query_history[0]}\"", None
                 else:
                     response = "Here are your previous questions:\n\n"
                     # Show last 5 questions in reverse order (most recent first)
                     for i, q in enumerate(reversed(query_history[-5:])):
                         response += f"{i+1}. \"{q}\"\n"
-                    return response
+                    return response, None
         
         # Check if this is a casual greeting or small talk
         greeting_phrases = ["hi", "hello", "hey", "greetings", "good morning", "good afternoon", "good evening", 
@@ -218,28 +386,28 @@ class GeminiAPI:
         # Handle greetings
         if any(question.lower().strip() == phrase or question.lower().strip().startswith(phrase + " ") 
                for phrase in greeting_phrases):
-            return f"Hey! How's it going? I'm here to help you with university-related questions. What would you like to know about?"
+            return f"Hey! How's it going? I'm here to help you with university-related questions. What would you like to know about?", None
         
         # Handle other small talk patterns
         for category, phrases in small_talk_patterns.items():
             if any(phrase in question.lower() for phrase in phrases):
                 if category == "thanks":
-                    return "You're welcome! If you have any more questions about university matters, feel free to ask."
+                    return "You're welcome! If you have any more questions about university matters, feel free to ask.", None
                 elif category == "goodbye":
-                    return "Goodbye! Feel free to return anytime you have questions about university matters."
+                    return "Goodbye! Feel free to return anytime you have questions about university matters.", None
                 elif category == "help":
-                    return "I can help you with information about university procedures, admissions, fee structures, courses, campus facilities, and more. What specifically would you like to know about?"
+                    return "I can help you with information about university procedures, admissions, fee structures, courses, campus facilities, and more. What specifically would you like to know about?", None
                 elif category == "capabilities":
-                    return "I can provide information about university admissions, fee structures, course details, campus facilities, student services, and other university-related questions. How can I assist you today?"
+                    return "I can provide information about university admissions, fee structures, course details, campus facilities, student services, and other university-related questions. How can I assist you today?", None
                 elif category == "identity":
-                    return "I'm a university assistant chatbot designed to provide accurate information about university procedures, courses, fees, and other university-related topics. How can I help you today?"
+                    return "I'm a university assistant chatbot designed to provide accurate information about university procedures, courses, fees, and other university-related topics. How can I help you today?", None
         
         # Enhance context with general knowledge if needed
         enhanced_context = self._enhance_context_with_general_knowledge(question, context)
         
         # Check if we have enough relevant context
         if not enhanced_context or len(enhanced_context) == 0:
-            return self._generate_dynamic_response(question, [])
+            return self._generate_dynamic_response(question, []), None
         
         # Check for sufficient context relevance
         has_high_relevance = any(chunk.get("metadata", {}).get("relevance_score", 0) > 0.75 for chunk in enhanced_context)
@@ -247,49 +415,119 @@ class GeminiAPI:
         
         # If we have limited relevance, generate a more dynamic response
         if not has_high_relevance and not has_moderate_relevance:
-            return self._generate_dynamic_response(question, enhanced_context)
+            return self._generate_dynamic_response(question, enhanced_context), None
         
-        prompt = self._create_prompt(question, enhanced_context, query_history)
+        return None, enhanced_context
+    
+    def _post(self, payload: Dict, stream: bool = False, timeout: int = 30) -> requests.Response:
+        """
+        Send a chat completion request, waiting for rate-limit quota and retrying transient failures
         
-        try:
-            # Create messages for Groq API
-            messages = [
+        429 and 5xx responses and connection errors are retried with jittered
+        exponential backoff, or after the Retry-After delay when the server sends one.
+        
+        Args:
+            payload: Request body
+            stream: Stream the response body
+            timeout: Request timeout (seconds)
+            
+        Returns:
+            The response (the last one if every retry failed)
+        """
+        # Roughly four characters per token
+        estimated_tokens = sum(len(message["content"]) for message in payload["messages"]) // 4
+        
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.acquire(estimated_tokens)
+            try:
+                response = self.session.post(self.api_url, json=payload, timeout=timeout, stream=stream)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = self._backoff_delay(attempt)
+                logger.warning(f"Request to {self.api_url} failed ({e}); retrying in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+            
+            self.rate_limiter.update(response.headers)
+            if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                return response
+            
+            delay = _retry_after(response.headers.get("Retry-After"))
+            if delay is None:
+                delay = self._backoff_delay(attempt)
+            logger.warning(f"HTTP {response.status_code} from {self.api_url}; retrying in {delay:.1f}s")
+            response.close()
+            time.sleep(min(delay, MAX_BACKOFF))
+        
+        return response
+    
+    def _backoff_delay(self, attempt: int) -> float:
+        """Full-jitter exponential backoff delay for a retry attempt (seconds)"""
+        return random.uniform(0, min(MAX_BACKOFF, self.backoff_factor * (2 ** attempt)))
+    
+    def _model_params(self) -> Dict:
+        """Model name and sampling parameters, as part of the cache keys"""
+        return {"model": self.model_name, **self.generation_params}
+    
+    def _cache_key(self, question: str, context: List[Dict], query_history: Optional[List[str]] = None) -> str:
+        """Build the response cache key of a question answered from a context"""
+        return self.response_cache.make_key(question, context, self._model_params(), query_history)
+    
+    def _cached_answer(self, question: str, context: List[Dict],
+                       query_history: Optional[List[str]] = None) -> Tuple[Optional[str], str, Optional[np.ndarray]]:
+        """
+        Look a question up in the exact cache, then in the semantic cache
+        
+        Args:
+            question: User's question
+            context: Enhanced context the answer would be generated from
+            query_history: Previous user queries for context
+            
+        Returns:
+            Tuple of (cached answer or None, exact cache key, question embedding or None),
+            the key and embedding being reused to store a generated answer
+        """
+        cache_key = self._cache_key(question, context, query_history)
+        answer = self.response_cache.get(cache_key)
+        if answer is not None:
+            return answer, cache_key, None
+        
+        # The question is only encoded on an exact miss
+        embedding = self.semantic_cache.embed(question)
+        if embedding is not None:
+            answer = self.semantic_cache.get(embedding, context, self._model_params(), query_history)
+        return answer, cache_key, embedding
+    
+    def _store_answer(self, cache_key: str, embedding: Optional[np.ndarray], question: str,
+                      context: List[Dict], query_history: Optional[List[str]], answer: str):
+        """Store a generated answer in the exact and, if the question was encoded, the semantic cache"""
+        self.response_cache.put(cache_key, answer)
+        if embedding is not None:
+            self.semantic_cache.put(embedding, question, context, self._model_params(), query_history, answer)
+    
+    def _chat_payload(self, prompt: str, stream: bool = False) -> Dict:
+        """
+        Build the chat completion request body for a prompt
+        
+        Args:
+            prompt: Prompt sent as the user message
+            stream: Ask for server-sent events instead of one JSON response
+            
+        Returns:
+            Request payload
+        """
+        return {
+            "model": self.model_name,
+            "messages": [
                 {
                     "role": "user",
                     "content": prompt
                 }
-            ]
-            
-            # Create payload for direct HTTP request
-            payload = {
-                "model": self.model_name,
-                "messages": messages,
-                "temperature": 0.3,  # Slightly higher for more dynamic responses
-                "max_tokens": 2048,
-                "top_p": 0.9,  # Higher for more creative responses
-                "stream": False
-            }
-            
-            # Make direct HTTP request to Groq API
-            response = requests.post(
-                self.api_url,
-                headers=self.headers,
-                json=payload,
-                timeout=30
-            )
-            
-            if response.status_code == 200:
-                response_data = response.json()
-                response_text = response_data['choices'][0]['message']['content']
-                
-                # Add a post-processing step to verify answer integrity
-                return self._verify_and_refine_response(response_text, question, enhanced_context)
-            else:
-                return f"Error: HTTP {response.status_code} - {response.text}"
-        except Exception as e:
-            logger.error(f"Error generating response: {str(e)}")
-            # Fallback to dynamic response
-            return self._generate_dynamic_response(question, enhanced_context)
+            ],
+            **self.generation_params,
+            "stream": stream
+        }
     
     def _verify_and_refine_response(self, response_text: str, question: str, context: List[Dict]) -> str:
         """
@@ -354,12 +592,7 @@ SUMMARY:
                     "max_tokens": 200
                 }
                 
-                response = requests.post(
-                    self.api_url,
-                    headers=self.headers,
-                    json=summary_payload,
-                    timeout=30
-                )
+                response = self._post(summary_payload)
                 
                 if response.status_code == 200:
                     response_data = response.json()
@@ -443,4 +676,53 @@ Your knowledge comes from university documents and general academic knowledge. A
         # Put it all together
         prompt = f"{system_prompt}\n\nCONTEXT:{combined_context}{conversation_summary}{conversation_history}\n\nCURRENT QUESTION: {question}\n\nANSWER:"
         
-        return prompt 
\ No newline at end of file
+        return prompt 
+
+def _retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a Retry-After header
+    
+    Args:
+        value: Seconds or an HTTP date
+        
+    Returns:
+        Seconds to wait, or None if the header is missing or unreadable
+    """
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+def _iter_sse_deltas(response) -> Iterator[str]:
+    """
+    Yield the text deltas of an OpenAI-compatible chat completion event stream
+    
+    Args:
+        response: Streaming requests.Response
+        
+    Yields:
+        Non-empty content deltas, until the [DONE] event
+    """
+    # Event streams are UTF-8, but requests falls back to ISO-8859-1 without a charset
+    response.encoding = "utf-8"
+    # chunk_size=None hands over each chunk of the (chunked) stream as it arrives
+    # instead of waiting for 512-byte blocks
+    for line in response.iter_lines(chunk_size=None, decode_unicode=True):
+        if not line or not line.startswith("data:"):
+            continue  # Keep-alive comments and other SSE fields
+        data = line[len("data:"):].strip()
+        if data == "[DONE]":
+            break
+        event = json.loads(data)
+        if "error" in event:
+            raise RuntimeError(f"Error in response stream: {event['error']}")
+        for choice in event.get("choices", []):
+            delta = (choice.get("delta") or {}).get("content")
+            if delta:
+                yield delta
@@ -0,0 +1,166 @@
+import os
+import pickle
+import hashlib
+import threading
+from typing import Dict, List, Optional
+import logging
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+class HTTPCache:
+    def __init__(self, cache_folder=os.path.join("embeddings", "http_cache")):
+        """
+        On-disk cache of scraped pages for conditional re-crawls
+
+        Each URL's entry keeps the ETag and Last-Modified validators sent by the
+        server, the extracted text and the chunks produced from it, so a 304 Not
+        Modified response can reuse the previous extraction and chunking. Entries
+        also record the version of the extractor that produced the text; one
+        from another version is not revalidated, so the page is extracted again.
+
+        Args:
+            cache_folder: Folder where cache entries are stored
+        """
+        self.cache_folder = cache_folder
+        self.not_modified = 0
+        self.unchanged = 0
+        self.changed = 0
+        self._lock = threading.Lock()
+
+        if not os.path.exists(self.cache_folder):
+            os.makedirs(self.cache_folder)
+
+    def get(self, url: str) -> Optional[Dict]:
+        """
+        Get the cached entry of a URL
+
+        Args:
+            url: Page URL
+
+        Returns:
+            Dictionary with etag, last_modified, extraction_version, text, links,
+            format, pages and chunks, or None on a miss
+        """
+        path = self._entry_path(url)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "rb") as f:
+                return pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError) as e:
+            logger.warning(f"Ignoring corrupt HTTP cache entry for {url}: {e}")
+            return None
+
+    def conditional_headers(self, entry: Optional[Dict], extraction_version: Optional[str] = None) -> Dict[str, str]:
+        """
+        Build the revalidation headers for a cached entry
+
+        Args:
+            entry: Entry returned by get (or None)
+            extraction_version: Version of the extractor the caller would use on the page
+
+        Returns:
+            If-None-Match / If-Modified-Since headers (empty if nothing is cached or
+            the cached text came from another extraction version)
+        """
+        headers = {}
+        if entry and entry.get("extraction_version") == extraction_version:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def record_not_modified(self, url: str):
+        """Count a 304 response served from the cache"""
+        with self._lock:
+            self.not_modified += 1
+
+    def put(self, url: str, text: str, etag: Optional[str] = None, last_modified: Optional[str] = None,
+            previous: Optional[Dict] = None, links: Optional[List[str]] = None, content_format: str = "html",
+            pages: Optional[List[str]] = None, extraction_version: Optional[str] = None) -> bool:
+        """
+        Store a freshly downloaded page
+
+        Args:
+            url: Page URL
+            text: Extracted page text
+            etag: ETag response header
+            last_modified: Last-Modified response header
+            previous: The entry that was cached before the download (or None)
+            links: Links found on the page, reused when the page is not modified
+            content_format: "html" or "pdf"
+            pages: Page texts of a PDF
+            extraction_version: Version of the extractor that produced text
+
+        Returns:
+            True if the text differs from the previously cached text
+        """
+        changed = previous is None or previous.get("text") != text
+        entry = {
+            "url": url,
+            "etag": etag,
+            "last_modified": last_modified,
+            "extraction_version": extraction_version,
+            "text": text,
+            "links": links if links is not None else (previous or {}).get("links", []),
+            "format": content_format,
+            "pages": pages,
+            # Chunks stay valid while the text is identical, even if the validators changed
+            "chunks": {} if changed else previous.get("chunks", {})
+        }
+        self._store(url, entry)
+        with self._lock:
+            if changed:
+                self.changed += 1
+            else:
+                self.unchanged += 1
+        return changed
+
+    def get_chunks(self, url: str, chunk_key: str) -> Optional[List[Dict]]:
+        """
+        Get the cached chunks of a URL for a chunking configuration
+
+        Args:
+            url: Page URL
+            chunk_key: Identifier of the chunking configuration
+
+        Returns:
+            List of chunk dictionaries, or None on a miss
+        """
+        entry = self.get(url)
+        if entry is None:
+            return None
+        return entry["chunks"].get(chunk_key)
+
+    def put_chunks(self, url: str, chunk_key: str, chunks: List[Dict]):
+        """
+        Store the chunks produced from a URL's cached text
+
+        Args:
+            url: Page URL
+            chunk_key: Identifier of the chunking configuration
+            chunks: List of chunk dictionaries
+        """
+        entry = self.get(url)
+        if entry is None:
+            return
+        entry["chunks"][chunk_key] = chunks
+        self._store(url, entry)
+
+    def stats(self) -> Dict[str, int]:
+        """Return counters of not-modified, unchanged and changed pages"""
+        return {"not_modified": self.not_modified, "unchanged": self.unchanged, "changed": self.changed}
+
+    def _entry_path(self, url: str) -> str:
+        """Build the on-disk path of a URL's entry"""
+        return os.path.join(self.cache_folder, f"{hashlib.sha256(url.encode('utf-8')).hexdigest()}.pkl")
+
+    def _store(self, url: str, entry: Dict):
+        """Atomically write a URL's entry"""
+        path = self._entry_path(url)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(entry, f)
+        os.replace(tmp_path, path)
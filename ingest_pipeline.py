@@ -0,0 +1,364 @@
+import os
+import json
+import time
+import pickle
+import hashlib
+import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from profiling import profile_stage
+import logging
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+class Stage:
+    def __init__(self, name: str, run: Callable, deps: Sequence[str] = (), config: Any = None,
+                 always_run: bool = False, outputs: Sequence[str] = (), stream: bool = False,
+                 ordered: bool = True):
+        """
+        One step of the ingestion pipeline
+
+        Args:
+            name: Unique stage name (also names its artifact)
+            run: Function called with the artifacts of deps (in order) that returns this stage's artifact
+            deps: Names of the stages whose artifacts are inputs
+            config: JSON-serialisable settings and input description; a change reruns the stage.
+                May be a callable returning it, evaluated when the pipeline runs.
+            always_run: Run even if the fingerprint is unchanged (inputs the
+                pipeline cannot fingerprint, such as web pages). Downstream stages
+                still skip if the artifact comes out identical.
+            outputs: Files the stage writes outside the pipeline folder; the stage reruns if any is missing
+            stream: run returns an iterable whose items are written to the artifact one
+                at a time; downstream stages receive an iterator reading them back from
+                disk, so the whole artifact is never held in memory
+            ordered: Whether the order of a streaming stage's items is part of its output.
+                If False, the same items in another order count as unchanged and the
+                saved artifact (with its order) is kept, so downstream stages skip
+        """
+        if not ordered and not stream:
+            raise ValueError(f"Stage {name}: only streaming stages can be unordered")
+        self.name = name
+        self.run = run
+        self.deps = list(deps)
+        self.config = config
+        self.always_run = always_run
+        self.outputs = list(outputs)
+        self.stream = stream
+        self.ordered = ordered
+
+class _StageResult:
+    """Digest of a stage's artifact and a way to load it"""
+
+    def __init__(self, digest: str, loader: Callable[[], Any], ran: bool, stream: bool = False):
+        self.digest = digest
+        self.ran = ran
+        self.stream = stream
+        self._loader = loader
+        self._artifact = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def load(self):
+        if self.stream:
+            # Every consumer gets its own pass over the records
+            return self._loader()
+        with self._lock:
+            if not self._loaded:
+                self._artifact = self._loader()
+                self._loaded = True
+            return self._artifact
+
+class Pipeline:
+    def __init__(self, artifacts_folder=os.path.join("embeddings", ".pipeline")):
+        """
+        Stages with fingerprinted, on-disk artifacts
+
+        A stage's fingerprint hashes its config and the digests of its inputs'
+        artifacts. When the fingerprint matches the last run, the saved artifact
+        is used instead of running the stage, and it is only loaded from disk if
+        a downstream stage needs to run. Stages whose inputs are ready run
+        concurrently. Streaming stages keep their artifact on disk as a sequence
+        of records, so chunks flow from stage to stage without being collected.
+
+        Args:
+            artifacts_folder: Folder for artifacts and the manifest
+        """
+        self.artifacts_folder = artifacts_folder
+        self.manifest_path = os.path.join(artifacts_folder, "manifest.json")
+        self.stages: Dict[str, Stage] = {}
+        self.timings: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+        if not os.path.exists(self.artifacts_folder):
+            os.makedirs(self.artifacts_folder)
+
+        self._manifest = {}
+        if os.path.exists(self.manifest_path):
+            try:
+                with open(self.manifest_path, "r") as f:
+                    self._manifest = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable pipeline manifest: {e}")
+
+    def add(self, stage: Stage) -> Stage:
+        """
+        Add a stage (its dependencies must already be added)
+
+        Args:
+            stage: Stage to add
+
+        Returns:
+            The stage
+        """
+        missing = [dep for dep in stage.deps if dep not in self.stages]
+        if missing:
+            raise ValueError(f"Stage {stage.name} depends on unknown stages: {', '.join(missing)}")
+        self.stages[stage.name] = stage
+        return stage
+
+    def run(self, force: Sequence[str] = ()) -> Dict[str, Any]:
+        """
+        Run every stage that is out of date
+
+        Args:
+            force: Names of stages to run even if up to date
+
+        Returns:
+            Dictionary mapping stage name to a loader of its artifact (call it to load;
+            a streaming stage's loader returns a new iterator on each call)
+        """
+        results: Dict[str, Any] = {}
+        with ThreadPoolExecutor(max_workers=max(len(self.stages), 1)) as executor:
+            # Stages are added after their dependencies, so every dependency's future already exists
+            for name, stage in self.stages.items():
+                dep_futures = [results[dep] for dep in stage.deps]
+                results[name] = executor.submit(self._run_stage, stage, dep_futures, name in force)
+            stage_results = {name: future.result() for name, future in results.items()}
+        return {name: result.load for name, result in stage_results.items()}
+
+    def load_previous(self, name: str) -> Optional[Any]:
+        """
+        Load the artifact a stage produced on its last run, whatever its fingerprint
+
+        Lets a stage reuse part of its previous output (e.g. embeddings of unchanged chunks).
+
+        Args:
+            name: Stage name
+
+        Returns:
+            The artifact (an iterator for streaming stages), or None if there is none
+        """
+        path = self._artifact_path(name)
+        if not os.path.exists(path):
+            return None
+        stage = self.stages.get(name)
+        if stage is not None and stage.stream:
+            return _iter_records(path)
+        try:
+            return self._load_artifact(path)
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable artifact of stage {name}: {e}")
+            return None
+
+    def _run_stage(self, stage: Stage, dep_futures: List, force: bool) -> _StageResult:
+        """Run one stage once its dependencies finished, or reuse its artifact"""
+        deps = [future.result() for future in dep_futures]
+        config = stage.config() if callable(stage.config) else stage.config
+        fingerprint = _digest(json.dumps({
+            "stage": stage.name,
+            "stream": stage.stream,
+            "config": config,
+            "deps": [dep.digest for dep in deps]
+        }, sort_keys=True, default=str).encode("utf-8"))
+
+        path = self._artifact_path(stage.name)
+        entry = self._manifest.get(stage.name, {})
+        up_to_date = (
+            not force and not stage.always_run
+            and entry.get("fingerprint") == fingerprint
+            and entry.get("stream", False) == stage.stream
+            and os.path.exists(path)
+            and all(os.path.exists(output) for output in stage.outputs)
+        )
+        if up_to_date:
+            logger.info(f"Stage {stage.name}: up to date, reusing its artifact")
+            return _StageResult(entry["digest"], self._loader(stage, path), ran=False, stream=stage.stream)
+
+        logger.info(f"Stage {stage.name}: running")
+        started = time.perf_counter()
+        # An artifact saved in the other format (list or record stream) is rewritten
+        same_format = entry.get("stream", False) == stage.stream and os.path.exists(path)
+        unchanged = False
+        with profile_stage(f"pipeline.{stage.name}") as record:
+            artifact = stage.run(*[dep.load() for dep in deps])
+            if stage.stream:
+                tmp_path = _tmp_path(path)
+                try:
+                    digest, record.items = _write_records(tmp_path, artifact, ordered=stage.ordered)
+                except BaseException:
+                    if os.path.exists(tmp_path):
+                        os.remove(tmp_path)
+                    raise
+                unchanged = same_format and entry.get("digest") == digest
+                if unchanged:
+                    os.remove(tmp_path)
+                else:
+                    os.replace(tmp_path, path)
+            else:
+                record.items = len(artifact) if isinstance(artifact, list) else None
+                digest = artifact_digest(artifact)
+                unchanged = same_format and entry.get("digest") == digest
+                if not unchanged:
+                    _write_atomic(path, pickle.dumps(artifact, protocol=pickle.HIGHEST_PROTOCOL))
+        self.timings[stage.name] = time.perf_counter() - started
+
+        if unchanged:
+            logger.info(f"Stage {stage.name}: output unchanged ({self.timings[stage.name]:.1f}s)")
+        else:
+            logger.info(f"Stage {stage.name}: done ({self.timings[stage.name]:.1f}s)")
+
+        with self._lock:
+            self._manifest[stage.name] = {"fingerprint": fingerprint, "digest": digest, "stream": stage.stream,
+                                          "updated": time.time()}
+            _write_atomic(self.manifest_path, json.dumps(self._manifest, indent=2).encode("utf-8"))
+        if stage.stream:
+            return _StageResult(digest, self._loader(stage, path), ran=True, stream=True)
+        return _StageResult(digest, lambda: artifact, ran=True)
+
+    def _loader(self, stage: Stage, path: str) -> Callable[[], Any]:
+        """Function loading a stage's saved artifact"""
+        if stage.stream:
+            return lambda: _iter_records(path)
+        return lambda: self._load_artifact(path)
+
+    def _artifact_path(self, name: str) -> str:
+        """Path of a stage's artifact"""
+        return os.path.join(self.artifacts_folder, f"{name}.pkl")
+
+    def _load_artifact(self, path: str):
+        """Load a pickled artifact"""
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+def artifact_digest(artifact: Any) -> str:
+    """
+    Hash an artifact by value
+
+    Pickled bytes are not used because equal objects can pickle differently
+    (e.g. depending on which strings happen to be shared).
+
+    Args:
+        artifact: Nested dicts, lists, tuples, NumPy arrays and scalars
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    digest = hashlib.sha256()
+    _update_digest(digest, artifact)
+    return digest.hexdigest()
+
+def _update_digest(digest, value):
+    """Feed a value into a hash, recursing into containers"""
+    if isinstance(value, dict):
+        digest.update(b"{")
+        for key in sorted(value, key=repr):
+            _update_digest(digest, key)
+            _update_digest(digest, value[key])
+        digest.update(b"}")
+    elif isinstance(value, (list, tuple)):
+        digest.update(b"[")
+        for item in value:
+            _update_digest(digest, item)
+        digest.update(b"]")
+    elif isinstance(value, np.ndarray):
+        digest.update(f"array{value.dtype.str}{value.shape}".encode("utf-8"))
+        digest.update(np.ascontiguousarray(value).tobytes())
+    else:
+        digest.update(repr(value).encode("utf-8"))
+        digest.update(b";")
+
+def _write_records(path: str, items: Iterable, ordered: bool = True) -> Tuple[str, int]:
+    """
+    Pickle items one after another into a file
+
+    Args:
+        path: File to write
+        items: Iterable of artifacts
+        ordered: Whether the digest depends on the order of the items
+
+    Returns:
+        Tuple of (digest, number of items); an ordered digest equals
+        artifact_digest(list(items)), an unordered one is the same for any
+        order of the items
+    """
+    digest = hashlib.sha256(b"[")
+    item_digests = []
+    count = 0
+    with open(path, "wb") as f:
+        for item in items:
+            # One pickler per record, so its memo does not keep every record alive
+            pickle.dump(item, f, protocol=pickle.HIGHEST_PROTOCOL)
+            if ordered:
+                _update_digest(digest, item)
+            else:
+                item_digest = hashlib.sha256()
+                _update_digest(item_digest, item)
+                item_digests.append(item_digest.digest())
+            count += 1
+    if ordered:
+        digest.update(b"]")
+    else:
+        # Only the sorted per-item digests are kept, not the items
+        digest = hashlib.sha256(b"{")
+        for item_digest in sorted(item_digests):
+            digest.update(item_digest)
+        digest.update(b"}")
+    return digest.hexdigest(), count
+
+def _iter_records(path: str) -> Iterator:
+    """Read back the records written by _write_records"""
+    with open(path, "rb") as f:
+        while True:
+            try:
+                yield pickle.load(f)
+            except EOFError:
+                return
+
+def _digest(data: bytes) -> str:
+    """Hex SHA-256 of bytes"""
+    return hashlib.sha256(data).hexdigest()
+
+def _write_atomic(path: str, data: bytes):
+    """Write a file via a temporary file and rename"""
+    tmp_path = _tmp_path(path)
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+def _tmp_path(path: str) -> str:
+    """Temporary file next to path, unique to this process and thread"""
+    return f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+def directory_snapshot(directory_path: str, extension: str = ".pdf") -> List[List]:
+    """
+    Describe the files of a directory cheaply (path, size and mtime) for a stage config
+
+    Args:
+        directory_path: Folder to scan recursively
+        extension: File extension to include
+
+    Returns:
+        Sorted list of [relative path, size, mtime_ns]
+    """
+    snapshot = []
+    if not os.path.isdir(directory_path):
+        return snapshot
+    for root, _, files in os.walk(directory_path):
+        for filename in files:
+            if filename.lower().endswith(extension):
+                file_path = os.path.join(root, filename)
+                stat = os.stat(file_path)
+                snapshot.append([os.path.relpath(file_path, directory_path), stat.st_size, stat.st_mtime_ns])
+    return sorted(snapshot)
@@ -0,0 +1,101 @@
+import json
+import queue
+import atexit
+import logging
+import logging.handlers
+from typing import Optional
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+# Logger that receives structured timing records (see log_timing)
+TIMING_LOGGER_NAME = "timings"
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+class _TimingFilter(logging.Filter):
+    """Pass only timing records (wanted=True) or only ordinary records (wanted=False)"""
+
+    def __init__(self, wanted: bool):
+        super().__init__()
+        self.wanted = wanted
+
+    def filter(self, record):
+        return hasattr(record, "timing") == self.wanted
+
+class _JSONLinesFormatter(logging.Formatter):
+    """Format a timing record as one JSON object per line"""
+
+    def format(self, record):
+        return json.dumps({"time": round(record.created, 3), **record.timing})
+
+def configure_logging(level=logging.INFO, log_file=None, timings_file=None):
+    """
+    Route all logging through a queue so worker threads never wait on handler I/O
+
+    Log calls only enqueue the record; a background QueueListener thread writes
+    to the console, the optional log file and the optional timings file. Meant to
+    be called once by an entry point (later calls return the running listener).
+
+    Args:
+        level: Root logging level
+        log_file: Optional file that also receives the log
+        timings_file: Optional JSON-lines file for the records sent with log_timing
+
+    Returns:
+        The running QueueListener
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    formatter = logging.Formatter(LOG_FORMAT)
+    handlers = [logging.StreamHandler()]
+    if log_file:
+        handlers.append(logging.FileHandler(log_file))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+        handler.addFilter(_TimingFilter(False))
+
+    if timings_file:
+        timings_handler = logging.FileHandler(timings_file)
+        timings_handler.setFormatter(_JSONLinesFormatter())
+        timings_handler.addFilter(_TimingFilter(True))
+        handlers.append(timings_handler)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(level)
+
+    # Timing records are only written to the timings file
+    timing_logger = logging.getLogger(TIMING_LOGGER_NAME)
+    timing_logger.handlers = [queue_handler] if timings_file else []
+    timing_logger.setLevel(logging.INFO)
+    timing_logger.propagate = False
+    timing_logger.disabled = not timings_file
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+    return _listener
+
+def stop_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+def log_timing(event: str, **fields):
+    """
+    Record a structured timing measurement
+
+    Args:
+        event: Name of the measured step (e.g. "fetch" or "chunk")
+        **fields: JSON-serialisable values such as url and durations in seconds
+    """
+    timing_logger = logging.getLogger(TIMING_LOGGER_NAME)
+    if timing_logger.isEnabledFor(logging.INFO):
+        timing_logger.info(event, extra={"timing": {"event": event, **fields}})
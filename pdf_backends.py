@@ -0,0 +1,177 @@
+import importlib.util
+from abc import ABC, abstractmethod
+from typing import Dict, List
+
+DEFAULT_PDF_BACKEND = "pypdf2"
+
+class PDFDocument(ABC):
+    """An opened PDF whose pages can be extracted individually"""
+
+    def __init__(self, page_count: int):
+        self.page_count = page_count
+
+    @abstractmethod
+    def extract_page(self, page_num: int) -> str:
+        """
+        Extract the raw text of one page
+
+        Args:
+            page_num: Zero-based page index
+
+        Returns:
+            Raw page text (may be empty)
+        """
+
+    def close(self):
+        """Release the underlying file and parser resources"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+class PDFBackend(ABC):
+    """A text-extraction library that can open PDFs"""
+
+    name = ""
+    module = ""
+
+    def is_available(self) -> bool:
+        """Return True if the backend's library is installed"""
+        return importlib.util.find_spec(self.module) is not None
+
+    @abstractmethod
+    def open(self, source) -> PDFDocument:
+        """
+        Open a PDF
+
+        Args:
+            source: Path to the PDF or a binary file-like object
+
+        Returns:
+            PDFDocument for the file
+        """
+
+class _PyPDFDocument(PDFDocument):
+    def __init__(self, reader, file_handle=None):
+        super().__init__(len(reader.pages))
+        self._reader = reader
+        self._file_handle = file_handle
+
+    def extract_page(self, page_num):
+        return self._reader.pages[page_num].extract_text() or ""
+
+    def close(self):
+        if self._file_handle is not None:
+            self._file_handle.close()
+            self._file_handle = None
+
+class PyPDF2Backend(PDFBackend):
+    name = "pypdf2"
+    module = "PyPDF2"
+
+    def open(self, source):
+        import PyPDF2
+        file_handle = open(source, 'rb') if isinstance(source, str) else None
+        try:
+            return _PyPDFDocument(PyPDF2.PdfReader(file_handle or source), file_handle)
+        except Exception:
+            if file_handle is not None:
+                file_handle.close()
+            raise
+
+class PypdfBackend(PDFBackend):
+    name = "pypdf"
+    module = "pypdf"
+
+    def open(self, source):
+        import pypdf
+        file_handle = open(source, 'rb') if isinstance(source, str) else None
+        try:
+            return _PyPDFDocument(pypdf.PdfReader(file_handle or source), file_handle)
+        except Exception:
+            if file_handle is not None:
+                file_handle.close()
+            raise
+
+class _PyMuPDFDocument(PDFDocument):
+    def __init__(self, document):
+        super().__init__(document.page_count)
+        self._document = document
+
+    def extract_page(self, page_num):
+        return self._document.load_page(page_num).get_text()
+
+    def close(self):
+        self._document.close()
+
+class PyMuPDFBackend(PDFBackend):
+    name = "pymupdf"
+    module = "pymupdf"
+
+    def is_available(self):
+        # Releases before 1.24.3 only ship the legacy "fitz" module name
+        return super().is_available() or importlib.util.find_spec("fitz") is not None
+
+    def open(self, source):
+        try:
+            import pymupdf as fitz
+        except ImportError:
+            import fitz
+        if isinstance(source, str):
+            return _PyMuPDFDocument(fitz.open(source))
+        return _PyMuPDFDocument(fitz.open(stream=source.read(), filetype="pdf"))
+
+class _PdfiumDocument(PDFDocument):
+    def __init__(self, document):
+        super().__init__(len(document))
+        self._document = document
+
+    def extract_page(self, page_num):
+        page = self._document[page_num]
+        text_page = page.get_textpage()
+        try:
+            return text_page.get_text_range()
+        finally:
+            text_page.close()
+            page.close()
+
+    def close(self):
+        self._document.close()
+
+class PdfiumBackend(PDFBackend):
+    name = "pypdfium2"
+    module = "pypdfium2"
+
+    def open(self, source):
+        import pypdfium2
+        if isinstance(source, str):
+            return _PdfiumDocument(pypdfium2.PdfDocument(source))
+        return _PdfiumDocument(pypdfium2.PdfDocument(source.read()))
+
+BACKENDS: Dict[str, PDFBackend] = {
+    backend.name: backend
+    for backend in (PyPDF2Backend(), PypdfBackend(), PyMuPDFBackend(), PdfiumBackend())
+}
+
+def get_backend(name: str = DEFAULT_PDF_BACKEND) -> PDFBackend:
+    """
+    Look up an installed extraction backend by name
+
+    Args:
+        name: Backend name (see BACKENDS)
+
+    Returns:
+        The backend instance
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown PDF backend: {name} (choose from {', '.join(BACKENDS)})")
+    backend = BACKENDS[name]
+    if not backend.is_available():
+        raise ValueError(f"PDF backend {name} is not installed (pip install {backend.module})")
+    return backend
+
+def available_backends() -> List[str]:
+    """Return the names of the installed extraction backends"""
+    return [name for name, backend in BACKENDS.items() if backend.is_available()]
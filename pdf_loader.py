@@ -1,77 +1,464 @@
 import os
-import PyPDF2
+import io
+import time
+import bisect
+import multiprocessing
+import threading
+from collections import OrderedDict, deque
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 import re
 from typing import List, Dict, Tuple
 import logging
+from text_normalizer import (
+    clean_extracted_text,
+    normalize_text_formatting,
+    post_process_chunk,
+    is_section_header,
+    is_table_line,
+    extract_chunk_features,
+    classify_content_type,
+)
+from tokenization import get_length_function
+from pdf_backends import DEFAULT_PDF_BACKEND, get_backend
+from profiling import profile_stage
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
-def load_pdfs_from_directory(directory_path):
+# Bump these when extraction or chunking output changes so cached results are rebuilt
+EXTRACTION_VERSION = "1"
+CHUNKING_VERSION = "3"
+
+MAX_TABLE_GROUP_LINES = 5
+NON_ALNUM_PATTERN = re.compile(r'[\W_]+')
+
+def load_pdfs_from_directory(directory_path, workers=1, pages_per_task=40, file_timeout=None, cache=None,
+                             backend=DEFAULT_PDF_BACKEND, pool=None):
     """
     Load all PDFs from a specified directory
     
     Args:
         directory_path: Path to the directory containing PDF files
+        workers: Number of worker processes (1 extracts serially in this process)
+        pages_per_task: Large PDFs are split into page ranges of this size across workers
+        file_timeout: Seconds to wait for a single PDF before skipping it (process-pool mode only)
+        cache: Optional ExtractionCache; unchanged files are not re-parsed
+        backend: Name of the text-extraction backend (see pdf_backends)
+        pool: ExtractionPool to extract in (overrides workers; kept open for the caller)
         
     Returns:
         Dictionary with filename as key and text content as value
     """
     pdf_contents = {}
+    with profile_stage("load_pdfs_from_directory") as record:
+        for file_path, pages in iter_pdf_documents(directory_path, workers, pages_per_task, file_timeout, cache,
+                                                   backend, pool):
+            pdf_contents[os.path.basename(file_path)] = join_pages(pages)
+        record.items = len(pdf_contents)
+    
+    return pdf_contents
+
+def iter_pdf_documents(directory_path, workers=1, pages_per_task=40, file_timeout=None, cache=None,
+                       backend=DEFAULT_PDF_BACKEND, pool=None):
+    """
+    Yield the cleaned pages of each PDF in a directory, one document at a time
+    
+    Args:
+        directory_path: Path to the directory containing PDF files
+        workers: Number of worker processes (1 extracts serially in this process)
+        pages_per_task: Large PDFs are split into page ranges of this size across workers
+        file_timeout: Seconds to wait for a single PDF before skipping it (process-pool mode only)
+        cache: Optional ExtractionCache; unchanged files are not re-parsed
+        backend: Name of the text-extraction backend (see pdf_backends)
+        pool: ExtractionPool to extract in (overrides workers; kept open for the caller)
+        
+    Yields:
+        (file_path, page_texts) tuples in sorted file order
+    """
+    yield from _iter_documents(_list_pdf_files(directory_path), workers, pages_per_task, file_timeout, cache, backend,
+                               pool)
+
+def _iter_documents(pdf_files, workers=1, pages_per_task=40, file_timeout=None, cache=None,
+                    backend=DEFAULT_PDF_BACKEND, pool=None):
+    """
+    Yield the cleaned pages of the given PDFs, reading cached pages where possible
     
+    Args:
+        pdf_files: Ordered list of PDF file paths
+        workers: Number of worker processes (1 extracts serially in this process)
+        pages_per_task: Large PDFs are split into page ranges of this size across workers
+        file_timeout: Seconds to wait for a single PDF before skipping it (process-pool mode only)
+        cache: Optional ExtractionCache
+        backend: Name of the text-extraction backend (see pdf_backends)
+        pool: ExtractionPool to extract in; without one, a pool of workers is
+            started for these files when workers > 1
+        
+    Yields:
+        (file_path, page_texts) tuples in input order
+    """
+    pages_key = f"{EXTRACTION_VERSION}:{backend}"
+    cached_pages = {}
+    to_extract = pdf_files
+    if cache is not None:
+        for file_path in pdf_files:
+            pages = cache.get_pages(file_path, pages_key)
+            if pages is not None:
+                cached_pages[file_path] = pages
+        to_extract = [file_path for file_path in pdf_files if file_path not in cached_pages]
+    
+    own_pool = None
+    if to_extract and pool is None and workers and workers > 1:
+        pool = own_pool = ExtractionPool(workers)
+    if to_extract and pool is not None:
+        documents = _iter_pdfs_parallel(to_extract, pool, pages_per_task, file_timeout, backend)
+    else:
+        documents = _iter_pdfs_serial(to_extract, backend)
+    
+    try:
+        # Merge cached and freshly extracted documents back into input order
+        extracted = next(documents, None)
+        for file_path in pdf_files:
+            if file_path in cached_pages:
+                pages = cached_pages.pop(file_path)
+            elif extracted is not None and extracted[0] == file_path:
+                pages = extracted[1]
+                extracted = next(documents, None)
+                if cache is not None:
+                    cache.put_pages(file_path, pages_key, pages)
+            else:
+                continue  # Extraction failed and was already reported
+            
+            if any(page_text.strip() for page_text in pages):  # Only yield if text was extracted
+                yield file_path, pages
+            else:
+                print(f"Warning: No text extracted from {os.path.basename(file_path)}")
+    finally:
+        documents.close()
+        if own_pool is not None:
+            own_pool.close()
+
+def iter_pdf_pages(file_path, start=0, end=None, backend=DEFAULT_PDF_BACKEND):
+    """
+    Yield the cleaned text of each page of a PDF
+    
+    Args:
+        file_path: Path to the PDF file or a binary file-like object
+        start: First page index
+        end: Page index to stop before (None for the last page)
+        backend: Name of the text-extraction backend (see pdf_backends)
+        
+    Yields:
+        Cleaned page text
+    """
+    with get_backend(backend).open(file_path) as document:
+        if end is None:
+            end = document.page_count
+        for page_num in range(start, end):
+            yield clean_extracted_text(document.extract_page(page_num))
+
+def extract_pdf_bytes(data, backend=DEFAULT_PDF_BACKEND):
+    """
+    Extract and clean the pages of a PDF held in memory (e.g. a downloaded file)
+    
+    Args:
+        data: PDF file content
+        backend: Name of the text-extraction backend
+        
+    Returns:
+        List of cleaned page texts
+    """
+    return list(iter_pdf_pages(io.BytesIO(data), backend=backend))
+
+class PageExtractor:
+    def __init__(self, max_open=8, backend=DEFAULT_PDF_BACKEND):
+        """
+        Extract individual PDF pages on demand, keeping recently used files open
+        
+        Args:
+            max_open: Maximum number of PDFs kept open (least recently used are closed)
+            backend: Name of the text-extraction backend (see pdf_backends)
+        """
+        self.max_open = max_open
+        self.backend = backend
+        self._documents = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get_page(self, file_path, page_number):
+        """
+        Get the cleaned text of one page
+        
+        Args:
+            file_path: Path to the PDF file
+            page_number: 1-based page number
+            
+        Returns:
+            Cleaned page text
+        """
+        return self.get_pages(file_path, page_number, page_number)[0]
+    
+    def get_pages(self, file_path, page_start, page_end):
+        """
+        Get the cleaned text of a range of pages
+        
+        Args:
+            file_path: Path to the PDF file
+            page_start: First 1-based page number
+            page_end: Last 1-based page number (inclusive)
+            
+        Returns:
+            List of cleaned page texts
+        """
+        with self._lock:
+            document = self._open(file_path)
+            if page_start < 1 or page_end > document.page_count or page_start > page_end:
+                raise IndexError(f"Pages {page_start}-{page_end} out of range for {file_path} "
+                                 f"({document.page_count} pages)")
+            return [clean_extracted_text(document.extract_page(page_num - 1))
+                    for page_num in range(page_start, page_end + 1)]
+    
+    def get_chunk_pages(self, chunk):
+        """
+        Get the pages a chunk was taken from, e.g. to show its source
+        
+        Args:
+            chunk: Chunk dictionary produced by process_pdf_directory
+            
+        Returns:
+            List of cleaned page texts
+        """
+        metadata = chunk["metadata"]
+        if "source_path" not in metadata or "page_start" not in metadata:
+            raise ValueError(f"Chunk from {metadata.get('source')} has no page span")
+        return self.get_pages(metadata["source_path"], metadata["page_start"], metadata["page_end"])
+    
+    def chunk_pages(self, file_path, page_start, page_end, chunk_size=800, chunk_overlap=250, length_function=len):
+        """
+        Re-chunk only a range of pages, e.g. after those pages were edited
+        
+        Args:
+            file_path: Path to the PDF file
+            page_start: First 1-based page number
+            page_end: Last 1-based page number (inclusive)
+            chunk_size: Size of each chunk
+            chunk_overlap: Overlap between chunks
+            length_function: Measures chunk size in characters or tokens
+            
+        Returns:
+            List of dictionaries with text chunks and metadata
+        """
+        pages = self.get_pages(file_path, page_start, page_end)
+        return list(iter_document_chunks(os.path.basename(file_path), pages, chunk_size, chunk_overlap,
+                                         length_function, source_path=file_path, first_page=page_start))
+    
+    def close(self):
+        """Close every open PDF"""
+        with self._lock:
+            while self._documents:
+                _, document = self._documents.popitem(last=False)
+                document.close()
+    
+    def _open(self, file_path):
+        """Get an open document from the LRU, opening and evicting as needed"""
+        key = os.path.abspath(file_path)
+        document = self._documents.get(key)
+        if document is not None:
+            self._documents.move_to_end(key)
+            return document
+        
+        document = get_backend(self.backend).open(file_path)
+        self._documents[key] = document
+        while len(self._documents) > self.max_open:
+            _, evicted = self._documents.popitem(last=False)
+            evicted.close()
+        return document
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+def join_pages(pages):
+    """
+    Join cleaned page texts into the document text used for chunking
+    
+    Args:
+        pages: List of page texts
+        
+    Returns:
+        Document text with one line per page
+    """
+    return "\n".join(pages) + "\n" if pages else ""
+
+def _list_pdf_files(directory_path):
+    """
+    List PDF files under a directory in a deterministic order
+    
+    Args:
+        directory_path: Path to the directory containing PDF files
+        
+    Returns:
+        Sorted list of PDF file paths
+    """
+    pdf_files = []
     for root, _, files in os.walk(directory_path):
         for file in files:
             if file.lower().endswith('.pdf'):
-                file_path = os.path.join(root, file)
-                try:
-                    with open(file_path, 'rb') as f:
-                        pdf_reader = PyPDF2.PdfReader(f)
-                        text = ""
-                        for page_num in range(len(pdf_reader.pages)):
-                            page_text = pdf_reader.pages[page_num].extract_text()
-                            # Clean up the extracted text
-                            page_text = clean_extracted_text(page_text)
-                            text += page_text + "\n"
-                        
-                        if text.strip():  # Only add if text was extracted
-                            pdf_contents[file] = text
-                        else:
-                            print(f"Warning: No text extracted from {file}")
-                except Exception as e:
-                    print(f"Error processing {file}: {e}")
+                pdf_files.append(os.path.join(root, file))
+    return sorted(pdf_files)
+
+def _count_pdf_pages(file_path, backend=DEFAULT_PDF_BACKEND):
+    """
+    Count the pages of a PDF (process-pool worker)
     
-    return pdf_contents
+    Args:
+        file_path: Path to the PDF file
+        backend: Name of the text-extraction backend
+        
+    Returns:
+        Number of pages
+    """
+    with get_backend(backend).open(file_path) as document:
+        return document.page_count
 
-def clean_extracted_text(text):
+def _extract_pdf_pages(file_path, start=0, end=None, backend=DEFAULT_PDF_BACKEND):
     """
-    Clean and normalize extracted text from PDFs
+    Extract and clean the text of a range of PDF pages (process-pool worker)
     
     Args:
-        text: Raw extracted text
+        file_path: Path to the PDF file
+        start: First page index
+        end: Page index to stop before (None for the last page)
+        backend: Name of the text-extraction backend
         
     Returns:
-        Cleaned text
+        List of cleaned page texts
+    """
+    return list(iter_pdf_pages(file_path, start, end, backend))
+
+def _iter_pdfs_serial(pdf_files, backend=DEFAULT_PDF_BACKEND):
     """
-    if not text:
-        return ""
+    Extract PDFs one after another in this process
     
-    # Remove excessive whitespace
-    text = re.sub(r'\s+', ' ', text)
+    Args:
+        pdf_files: Ordered list of PDF file paths
+        backend: Name of the text-extraction backend
+        
+    Yields:
+        (file_path, page_texts) tuples in input order
+    """
+    for file_path in pdf_files:
+        try:
+            pages = _extract_pdf_pages(file_path, backend=backend)
+        except Exception as e:
+            print(f"Error processing {os.path.basename(file_path)}: {e}")
+            continue
+        yield file_path, pages
+
+class ExtractionPool:
+    def __init__(self, workers):
+        """
+        Worker processes for PDF extraction, shared by every directory and
+        retry of a run
+        
+        The processes are spawned on first use rather than forked, because the
+        pipeline extracts from a thread and forking a threaded process can
+        deadlock the children. close() terminates them, which also kills a
+        worker still stuck on a PDF that timed out.
+        
+        Args:
+            workers: Number of worker processes
+        """
+        self.workers = workers
+        self._pool = None
+        self._lock = threading.Lock()
+    
+    def get(self):
+        """Return the process pool, starting it on first use"""
+        with self._lock:
+            if self._pool is None:
+                self._pool = multiprocessing.get_context("spawn").Pool(processes=self.workers)
+            return self._pool
+    
+    def close(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.terminate()
+                self._pool.join()
+                self._pool = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+
+def _iter_pdfs_parallel(pdf_files, extraction_pool, pages_per_task, file_timeout, backend=DEFAULT_PDF_BACKEND):
+    """
+    Extract PDFs in a process pool, splitting large files into page ranges
     
-    # Remove page numbers and headers/footers
-    text = re.sub(r'^\d+$', '', text, flags=re.MULTILINE)
+    Only a window of files is in flight at a time so finished pages do not
+    pile up for the whole corpus while the consumer works on earlier files.
     
-    # Clean up common PDF extraction artifacts
-    text = re.sub(r'([a-z])([A-Z])', r'\1 \2', text)  # Fix missing spaces
-    text = re.sub(r'([.!?])([A-Z])', r'\1 \2', text)  # Fix sentence boundaries
+    Args:
+        pdf_files: Ordered list of PDF file paths
+        extraction_pool: ExtractionPool whose workers extract the pages
+        pages_per_task: Maximum pages per task
+        file_timeout: Seconds to wait for a single PDF before skipping it
+        backend: Name of the text-extraction backend
+        
+    Yields:
+        (file_path, page_texts) tuples in input order
+    """
+    pool = extraction_pool.get()
+    page_counts = iter([(file_path, pool.apply_async(_count_pdf_pages, (file_path, backend)))
+                        for file_path in pdf_files])
+    in_flight = deque()
+    window = extraction_pool.workers * 2
+    
+    def submit_next_file():
+        for file_path, count_task in page_counts:
+            try:
+                page_count = count_task.get(timeout=file_timeout)
+            except multiprocessing.TimeoutError:
+                print(f"Error processing {os.path.basename(file_path)}: timed out after {file_timeout}s")
+                continue
+            except Exception as e:
+                print(f"Error processing {os.path.basename(file_path)}: {e}")
+                continue
+            
+            in_flight.append((file_path, [
+                pool.apply_async(_extract_pdf_pages,
+                                 (file_path, start, min(start + pages_per_task, page_count), backend))
+                for start in range(0, page_count, pages_per_task)
+            ]))
+            return True
+        return False
     
-    # Remove excessive line breaks
-    text = re.sub(r'\n\s*\n', '\n\n', text)
+    while len(in_flight) < window and submit_next_file():
+        pass
     
-    return text.strip()
+    # Reassemble in file and page order, bounding the wait per file
+    while in_flight:
+        file_path, file_tasks = in_flight.popleft()
+        while len(in_flight) < window and submit_next_file():
+            pass
+        
+        deadline = time.monotonic() + file_timeout if file_timeout else None
+        pages = []
+        try:
+            for task in file_tasks:
+                remaining = max(deadline - time.monotonic(), 0) if deadline else None
+                pages.extend(task.get(timeout=remaining))
+        except multiprocessing.TimeoutError:
+            print(f"Error processing {os.path.basename(file_path)}: timed out after {file_timeout}s")
+            continue
+        except Exception as e:
+            print(f"Error processing {os.path.basename(file_path)}: {e}")
+            continue
+        yield file_path, pages
 
-def split_text_into_chunks(text, chunk_size=1000, chunk_overlap=200):
+def split_text_into_chunks(text, chunk_size=1000, chunk_overlap=200, length_function=len):
     """
     Split text into smaller chunks for processing with enhanced logic
     
@@ -79,6 +466,7 @@ def split_text_into_chunks(text, chunk_size=1000, chunk_overlap=200):
         text: The text to split
         chunk_size: Maximum size of each chunk
         chunk_overlap: Overlap between chunks
+        length_function: Measures chunk size (len for characters, see tokenization for tokens)
         
     Returns:
         List of text chunks
@@ -89,7 +477,7 @@ def split_text_into_chunks(text, chunk_size=1000, chunk_overlap=200):
     text_splitter = RecursiveCharacterTextSplitter(
         chunk_size=chunk_size,
         chunk_overlap=chunk_overlap,
-        length_function=len,
+        length_function=length_function,
         separators=["\n\n", "\n", ". ", "! ", "? ", "; ", ", ", " ", ""]
     )
     
@@ -126,6 +514,9 @@ def preserve_important_sections(text):
     """
     Preserve important sections that should not be split
     
+    Runs of consecutive table-like lines (up to MAX_TABLE_GROUP_LINES) are
+    joined into one group; every line is emitted exactly once.
+    
     Args:
         text: Raw text
         
@@ -136,141 +527,68 @@ def preserve_important_sections(text):
     lines = text.split('\n')
     preserved_lines = []
     
-    for i, line in enumerate(lines):
+    i = 0
+    while i < len(lines):
         # Check if this line looks like a table header or data
-        if is_table_line(line):
-            # Try to group with next few lines if they're also table-like
-            table_group = [line]
+        if is_table_line(lines[i]):
+            # Group with the next few lines if they're also table-like
             j = i + 1
-            while j < len(lines) and j < i + 5 and is_table_line(lines[j]):
-                table_group.append(lines[j])
+            while j < len(lines) and j < i + MAX_TABLE_GROUP_LINES and is_table_line(lines[j]):
                 j += 1
             
             # Join table lines with special separator
-            preserved_lines.append(' |TABLE| '.join(table_group))
-            i = j - 1  # Skip the lines we've already processed
+            preserved_lines.append(' |TABLE| '.join(lines[i:j]))
+            i = j
         else:
-            preserved_lines.append(line)
+            preserved_lines.append(lines[i])
+            i += 1
     
     return '\n'.join(preserved_lines)
 
-def is_table_line(line):
-    """
-    Check if a line looks like table data
-    
-    Args:
-        line: Text line
-        
-    Returns:
-        True if line appears to be table data
-    """
-    # Check for common table patterns
-    patterns = [
-        r'\d+\s+\d+',  # Numbers separated by spaces
-        r'[A-Z][a-z]+\s+\d+',  # Words followed by numbers
-        r'\$\d+',  # Dollar amounts
-        r'\d+\.\d+',  # Decimal numbers
-        r'[A-Z]+\s+[A-Z]+',  # All caps words
-    ]
-    
-    for pattern in patterns:
-        if re.search(pattern, line):
-            return True
-    
-    return False
-
-def normalize_text_formatting(text):
+def extract_semantic_sections(text):
     """
-    Normalize text formatting for better chunking
+    Extract semantic sections from text for better chunking
     
     Args:
         text: Raw text
         
     Returns:
-        Normalized text
-    """
-    # Standardize bullet points
-    text = re.sub(r'[•·▪▫◦‣⁃]', '•', text)
-    
-    # Standardize numbering
-    text = re.sub(r'^\d+\.\s*', r'\g<0>', text, flags=re.MULTILINE)
-    
-    # Clean up spacing around punctuation
-    text = re.sub(r'\s+([.!?])', r'\1', text)
-    text = re.sub(r'([.!?])\s*', r'\1 ', text)
-    
-    return text
-
-def post_process_chunk(chunk):
-    """
-    Post-process individual chunks to improve quality
-    
-    Args:
-        chunk: Raw chunk text
-        
-    Returns:
-        Enhanced chunk text
+        List of semantic sections
     """
-    if not chunk or len(chunk.strip()) < 10:
-        return None
-    
-    # Clean up the chunk
-    chunk = chunk.strip()
-    
-    # Remove orphaned words at the beginning
-    chunk = re.sub(r'^[a-z]\s+', '', chunk)
-    
-    # Ensure proper sentence endings
-    if not chunk.endswith(('.', '!', '?', ':', ';')):
-        # Try to find a good ending point
-        sentences = re.split(r'[.!?]', chunk)
-        if len(sentences) > 1:
-            # Remove incomplete last sentence
-            chunk = '. '.join(sentences[:-1]) + '.'
-    
-    # Restore table formatting if present
-    if '|TABLE|' in chunk:
-        chunk = chunk.replace(' |TABLE| ', '\n')
-    
-    return chunk
+    return [section for section, _, _ in _split_sections(text.split('\n'))]
 
-def extract_semantic_sections(text):
+def _split_sections(lines):
     """
-    Extract semantic sections from text for better chunking
+    Group lines into semantic sections, keeping the line range of each section
     
     Args:
-        text: Raw text
+        lines: Text lines
         
     Returns:
-        List of semantic sections
+        List of (section_text, first_line, last_line) tuples
     """
     sections = []
-    
-    # Split by common section headers
-    section_patterns = [
-        r'(?:^|\n)([A-Z][A-Z\s]+:?)',  # ALL CAPS headers
-        r'(?:^|\n)(\d+\.\s*[A-Z][^:\n]+)',  # Numbered sections
-        r'(?:^|\n)([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*:)',  # Title case headers
-    ]
-    
     current_section = ""
-    lines = text.split('\n')
+    first_line = 0
     
-    for line in lines:
-        is_header = any(re.match(pattern, line) for pattern in section_patterns)
+    for line_idx, line in enumerate(lines):
+        # ALL CAPS, numbered and title case headers start a new section
+        is_header = is_section_header(line)
         
         if is_header and current_section:
-            sections.append(current_section.strip())
+            sections.append((current_section.strip(), first_line, line_idx - 1))
             current_section = line
+            first_line = line_idx
         else:
             current_section += "\n" + line if current_section else line
     
     if current_section:
-        sections.append(current_section.strip())
+        sections.append((current_section.strip(), first_line, len(lines) - 1))
     
-    return sections if sections else [text]
+    return sections if sections else [('\n'.join(lines), 0, len(lines) - 1)]
 
-def process_pdf_directory(directory_path, chunk_size=800, chunk_overlap=250):
+def process_pdf_directory(directory_path, chunk_size=800, chunk_overlap=250, workers=1, file_timeout=None, cache=None,
+                          chunk_unit="chars", backend=DEFAULT_PDF_BACKEND, pool=None):
     """
     Process all PDFs in a directory and return chunks with enhanced metadata
     
@@ -278,31 +596,206 @@ def process_pdf_directory(directory_path, chunk_size=800, chunk_overlap=250):
         directory_path: Path to directory with PDFs
         chunk_size: Size of each chunk
         chunk_overlap: Overlap between chunks
+        workers: Number of PDF extraction processes (1 extracts serially)
+        file_timeout: Seconds to wait for a single PDF before skipping it
+        cache: Optional ExtractionCache; unchanged files are skipped entirely
+        chunk_unit: "chars" or "tokens" (chunk_size and chunk_overlap in embedding model tokens)
+        backend: Name of the text-extraction backend (see pdf_backends)
+        pool: ExtractionPool to extract in (overrides workers; kept open for the caller)
         
     Returns:
         List of dictionaries with text chunks and metadata
     """
-    pdf_contents = load_pdfs_from_directory(directory_path)
-    all_chunks = []
+    with profile_stage("process_pdf_directory") as record:
+        chunks = list(iter_pdf_chunks(directory_path, chunk_size, chunk_overlap, workers, file_timeout, cache,
+                                      chunk_unit, backend, pool))
+        record.items = len(chunks)
+    return chunks
+
+def iter_pdf_chunks(directory_path, chunk_size=800, chunk_overlap=250, workers=1, file_timeout=None, cache=None,
+                    chunk_unit="chars", backend=DEFAULT_PDF_BACKEND, pool=None):
+    """
+    Stream chunks with enhanced metadata from the PDFs in a directory
+    
+    Only one document's text is held at a time, so memory stays bounded by
+    the largest PDF rather than the whole corpus.
+    
+    Args:
+        directory_path: Path to directory with PDFs
+        chunk_size: Size of each chunk
+        chunk_overlap: Overlap between chunks
+        workers: Number of PDF extraction processes (1 extracts serially)
+        file_timeout: Seconds to wait for a single PDF before skipping it
+        cache: Optional ExtractionCache; unchanged files are skipped entirely
+        chunk_unit: "chars" or "tokens" (chunk_size and chunk_overlap in embedding model tokens)
+        backend: Name of the text-extraction backend (see pdf_backends)
+        pool: ExtractionPool to extract in; without one, a pool of workers is
+            started on first use and shared with the retries below
+        
+    Yields:
+        Dictionaries with text chunks and metadata
+    """
+    pdf_files = _list_pdf_files(directory_path)
+    chunk_key = f"{EXTRACTION_VERSION}:{backend}:{CHUNKING_VERSION}:{chunk_size}:{chunk_overlap}:{chunk_unit}"
+    length_function = get_length_function(chunk_unit)
+    
+    cached_files = set()
+    if cache is not None:
+        cached_files = {file_path for file_path in pdf_files if cache.has_chunks(file_path, chunk_key)}
+    
+    own_pool = None
+    if pool is None and workers and workers > 1:
+        pool = own_pool = ExtractionPool(workers)
+    documents = _iter_documents([file_path for file_path in pdf_files if file_path not in cached_files],
+                                file_timeout=file_timeout, cache=cache, backend=backend, pool=pool)
+    try:
+        document = next(documents, None)
+        
+        for file_path in pdf_files:
+            if file_path in cached_files:
+                chunks = cache.get_chunks(file_path, chunk_key)
+                if chunks is not None:
+                    yield from chunks
+                    continue
+                # The entry was removed or is unreadable; extract the file again rather than drop it
+                logger.warning(f"Cached chunks of {os.path.basename(file_path)} are missing, extracting it again")
+                retry = next(_iter_documents([file_path], file_timeout=file_timeout, cache=cache, backend=backend,
+                                             pool=pool), None)
+                if retry is None:
+                    continue  # No text or extraction failed
+                pages = retry[1]
+            elif document is None or document[0] != file_path:
+                continue  # No text or extraction failed
+            else:
+                pages = document[1]
+                document = next(documents, None)
+            
+            chunks = list(iter_document_chunks(os.path.basename(file_path), pages,
+                                               chunk_size, chunk_overlap, length_function, source_path=file_path))
+            if cache is not None:
+                cache.put_chunks(file_path, chunk_key, chunks)
+            yield from chunks
+    finally:
+        documents.close()
+        if own_pool is not None:
+            own_pool.close()
+
+def iter_document_chunks(filename, pages, chunk_size=800, chunk_overlap=250, length_function=len,
+                         source_path=None, first_page=1):
+    """
+    Split a single document into chunks with enhanced metadata
+    
+    Every chunk records the span of pages it was taken from (page_start and
+    page_end, 1-based) so sources can be shown or refreshed page by page.
+    
+    Args:
+        filename: Source filename
+        pages: List of cleaned page texts
+        chunk_size: Size of each chunk
+        chunk_overlap: Overlap between chunks
+        length_function: Measures chunk size in characters or tokens
+        source_path: Path of the PDF, stored for page lookups
+        first_page: Page number of pages[0]
+        
+    Yields:
+        Dictionaries with text chunks and metadata
+    """
+    # Cleaned pages have no line breaks, but map every line to its page regardless
+    lines = []
+    line_pages = []
+    for page_idx, page_text in enumerate(pages):
+        page_lines = page_text.split('\n')
+        lines.extend(page_lines)
+        line_pages.extend([page_idx] * len(page_lines))
+    
+    # Extract semantic sections first
+    sections = _split_sections(lines)
+    
+    for section_idx, (section, first_line, last_line) in enumerate(sections):
+        section_pages = (line_pages[first_line], line_pages[last_line]) if line_pages else (0, 0)
+        locator = _PageLocator(pages, *section_pages)
+        
+        # Split sections into chunks
+        chunks = split_text_into_chunks(section, chunk_size, chunk_overlap, length_function)
+        
+        for chunk_idx, chunk in enumerate(chunks):
+            # Create enhanced metadata
+            metadata = create_enhanced_metadata(filename, section_idx, chunk_idx, chunk)
+            page_start, page_end = locator.locate(chunk)
+            metadata["page_start"] = first_page + page_start
+            metadata["page_end"] = first_page + page_end
+            if source_path:
+                metadata["source_path"] = source_path
+            
+            yield {
+                "text": chunk,
+                "metadata": metadata
+            }
+
+class _PageLocator:
+    """Finds the pages a chunk came from within a section's page range"""
+    
+    PROBE_LENGTH = 32
     
-    for filename, content in pdf_contents.items():
-        # Extract semantic sections first
-        sections = extract_semantic_sections(content)
+    def __init__(self, pages, first_page, last_page):
+        """
+        Index the alphanumeric content of a section's pages
+        
+        Chunking rewrites spacing, punctuation and table markers, so pages and
+        chunks are compared on their lowercase letters and digits only.
         
-        for section_idx, section in enumerate(sections):
-            # Split sections into chunks
-            chunks = split_text_into_chunks(section, chunk_size, chunk_overlap)
+        Args:
+            pages: List of cleaned page texts
+            first_page: Index of the section's first page
+            last_page: Index of the section's last page
+        """
+        self.first_page = first_page
+        self.last_page = last_page
+        self.page_ends = []
+        keys = []
+        length = 0
+        for page_idx in range(first_page, last_page + 1):
+            key = _alnum_key(pages[page_idx])
+            keys.append(key)
+            length += len(key)
+            self.page_ends.append(length)
+        self.key = "".join(keys)
+        self.cursor = 0
+    
+    def locate(self, chunk):
+        """
+        Locate a chunk, searching forward from the previous chunk
+        
+        Args:
+            chunk: Chunk text
             
-            for chunk_idx, chunk in enumerate(chunks):
-                # Create enhanced metadata
-                metadata = create_enhanced_metadata(filename, section_idx, chunk_idx, chunk)
-                
-                all_chunks.append({
-                    "text": chunk,
-                    "metadata": metadata
-                })
-    
-    return all_chunks
+        Returns:
+            (first_page, last_page) indexes, the whole section range if not found
+        """
+        if self.first_page == self.last_page:
+            return self.first_page, self.last_page
+        
+        chunk_key = _alnum_key(chunk.replace('|TABLE|', ''))
+        head = chunk_key[:self.PROBE_LENGTH]
+        tail = chunk_key[-self.PROBE_LENGTH:]
+        start = self.key.find(head, self.cursor) if head else -1
+        if start < 0:
+            start = self.key.find(head) if head else -1
+        if start < 0:
+            return self.first_page, self.last_page
+        
+        tail_start = self.key.find(tail, start)
+        end = tail_start + len(tail) - 1 if tail_start >= 0 else min(start + len(chunk_key), len(self.key)) - 1
+        self.cursor = start + 1
+        return self._page_at(start), self._page_at(end)
+    
+    def _page_at(self, position):
+        """Map a position in the section key to a page index"""
+        return self.first_page + min(bisect.bisect_right(self.page_ends, position), len(self.page_ends) - 1)
+
+def _alnum_key(text):
+    """Lowercase letters and digits of a text, used to match chunks to pages"""
+    return NON_ALNUM_PATTERN.sub('', text.lower())
 
 def create_enhanced_metadata(filename, section_idx, chunk_idx, chunk_text):
     """
@@ -323,39 +816,8 @@ def create_enhanced_metadata(filename, section_idx, chunk_idx, chunk_text):
         "chunk_id": chunk_idx,
         "type": "pdf",
         "chunk_length": len(chunk_text),
-        "word_count": len(chunk_text.split()),
-        "has_numbers": bool(re.search(r'\d+', chunk_text)),
-        "has_dates": bool(re.search(r'\d{1,2}[/-]\d{1,2}[/-]\d{2,4}', chunk_text)),
-        "has_currency": bool(re.search(r'\$[\d,]+', chunk_text)),
-        "has_bullet_points": '•' in chunk_text,
-        "has_table_data": '|TABLE|' in chunk_text or is_table_line(chunk_text),
-        "content_type": classify_content_type(chunk_text)
+        "word_count": len(chunk_text.split())
     }
+    metadata.update(extract_chunk_features(chunk_text))
     
     return metadata
-
-def classify_content_type(text):
-    """
-    Classify the content type of a chunk
-    
-    Args:
-        text: Chunk text
-        
-    Returns:
-        Content type classification
-    """
-    text_lower = text.lower()
-    
-    # Check for different content types
-    if re.search(r'\$\d+', text):
-        return 'financial'
-    elif re.search(r'\d{1,2}[/-]\d{1,2}[/-]\d{2,4}', text):
-        return 'temporal'
-    elif '•' in text or re.search(r'^\d+\.', text, re.MULTILINE):
-        return 'list'
-    elif is_table_line(text):
-        return 'tabular'
-    elif len(text.split('.')) > 3:
-        return 'narrative'
-    else:
-        return 'general' 
\ No newline at end of file
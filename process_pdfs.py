@@ -1,62 +1,217 @@
 import os
-from pdf_loader import process_pdf_directory
-from web_scraper import main as process_web_links
-from embeddings_manager import EmbeddingsManager
+import json
+from itertools import chain
+from pdf_loader import iter_pdf_chunks, ExtractionPool, EXTRACTION_VERSION, CHUNKING_VERSION
+from chunk_enrichment import iter_enriched_chunks, get_enricher, classify_source_type
+from ingest_pipeline import Pipeline, Stage, directory_snapshot
+from extraction_cache import ExtractionCache
+from tokenization import TOKEN_CHUNK_SIZE, TOKEN_CHUNK_OVERLAP
+from pdf_backends import DEFAULT_PDF_BACKEND
+from logging_setup import configure_logging
+from profiling import start_profiling, stop_profiling, profile_stage, compare_reports
 import logging
 
 # Set up logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Chunk length unit: "chars" (default) or "tokens" to pack chunks to the embedding model's window
+CHUNK_UNIT = os.getenv("CHUNK_UNIT", "chars")
+
+# Parallel PDF extraction settings
+PDF_WORKERS = os.cpu_count() or 1
+PDF_FILE_TIMEOUT = 300  # Skip any single PDF that takes longer than this (seconds)
+PDF_BACKEND = os.getenv("PDF_BACKEND", DEFAULT_PDF_BACKEND)  # See `python benchmark.py pdf-backends`
+
+# Web crawl settings: CRAWL_DEPTH > 0 also follows same-site links and sitemaps from Data/Links.txt
+CRAWL_DEPTH = int(os.getenv("CRAWL_DEPTH", "0"))
+CRAWL_MAX_PAGES = int(os.getenv("CRAWL_MAX_PAGES", "200"))
+
+EMBEDDING_MODEL = "BAAI/bge-base-en-v1.5"
+INDEX_PREFIX = "university_combined"
+ENRICHMENT_VERSION = "1"  # Bump when chunk_enrichment scoring changes
+
+# Processes used to score chunk metadata (scoring is vectorized, so one is enough for most knowledge bases)
+ENRICH_WORKERS = int(os.getenv("ENRICH_WORKERS", "1"))
+
+# Per-stage wall time, CPU time, peak RSS and items/sec of each run (JSON)
+PROFILE_REPORT = os.getenv("PROFILE_REPORT", os.path.join("embeddings", "profile_report.json"))
+
+# Comma-separated pipeline stages to rerun even if their inputs are unchanged
+FORCE_STAGES = [name.strip() for name in os.getenv("FORCE_STAGES", "").split(",") if name.strip()]
+
 def main():
+    """
+    Build the knowledge base and write a profiling report of the run
+    """
+    profiler = start_profiling()
+    try:
+        with profile_stage("process_pdfs"):
+            build_knowledge_base()
+    finally:
+        stop_profiling()
+        write_profile_report(profiler, PROFILE_REPORT)
+
+def write_profile_report(profiler, path):
+    """
+    Write the profiling report, warning about stages that got slower than last run
+    
+    Args:
+        profiler: StageProfiler of this run
+        path: JSON report file (the previous report is kept next to it as .previous)
+    """
+    previous = None
+    if os.path.exists(path):
+        try:
+            with open(path, "r") as f:
+                previous = json.load(f)
+            os.replace(path, f"{path}.previous")
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable profile report {path}: {e}")
+    
+    report = profiler.write_report(path)
+    print(f"\nProfile report written to {path} ({report['wall_seconds']:.1f}s, "
+          f"peak RSS {report['process_peak_rss_mb']} MB)")
+    if previous is not None:
+        for regression in compare_reports(previous, report):
+            logger.warning(f"Slower than the previous run: {regression}")
+
+def build_knowledge_base():
     """
     Process all PDFs and web links, then generate combined embeddings with enhanced chunking
+    
+    Runs as a pipeline of checkpointed stages (PDF chunks and web chunks in
+    parallel, then enrich, embed and index). A stage whose inputs are unchanged
+    since the last run reuses its saved artifact instead of running again.
+    Chunks are streamed from stage to stage through their on-disk artifacts,
+    so only the chunk list saved with the index holds the whole corpus.
     """
+    # Imported here because spawned PDF and enrichment workers re-import this
+    # module, and they need neither the web stack nor the embedding model
+    from web_scraper import iter_web_chunks
+    from embeddings_manager import EmbeddingsManager, text_key
+    
     logger.info("Starting enhanced PDF and web processing...")
     
-    # Process the main PDFs directory with optimized chunk sizes for better context
+    pipeline = Pipeline()
+    embeddings_manager = EmbeddingsManager(model_name=EMBEDDING_MODEL)
     pdf_dir = os.path.join("Data", "PDF's")
-    print(f"Processing PDFs in {pdf_dir}...")
-    # Enhanced chunk size and overlap for better context preservation and semantic understanding
-    main_chunks = process_pdf_directory(pdf_dir, chunk_size=600, chunk_overlap=250)
-    print(f"Processed {len(main_chunks)} chunks from main PDFs")
-    
-    # Process the fee structure PDFs - using optimized chunks for fee tables and financial information
     fee_dir = os.path.join("Data", "Fee_structure")
-    print(f"Processing PDFs in {fee_dir}...")
-    fee_chunks = process_pdf_directory(fee_dir, chunk_size=500, chunk_overlap=200)
-    print(f"Processed {len(fee_chunks)} chunks from fee structure PDFs")
-    
-    # Process web links - web content often needs larger chunks for better context
     links_file = os.path.join("Data", "Links.txt")
-    print(f"Processing web links from {links_file}...")
-    web_chunks = process_web_links(links_file, chunk_size=700, chunk_overlap=250)
-    print(f"Processed {len(web_chunks)} chunks from web links")
-    
-    # Enhance chunks with better metadata and semantic information
-    enhanced_chunks = enhance_chunks_with_metadata(main_chunks + fee_chunks + web_chunks)
-    
-    # Combine all chunks
-    all_chunks = enhanced_chunks
-    print(f"Total enhanced chunks: {len(all_chunks)}")
     
-    # Create embeddings with enhanced model
-    print("Creating embeddings with BGE model...")
-    embeddings_manager = EmbeddingsManager(model_name="BAAI/bge-base-en-v1.5")
-    embeddings = embeddings_manager.create_embeddings(all_chunks)
-    print(f"Created embeddings with shape: {embeddings.shape}")
-    
-    # Save embeddings
-    print("Saving enhanced embeddings...")
-    index_path, chunks_path = embeddings_manager.save_embeddings(filename_prefix="university_combined")
-    print(f"Saved index to {index_path}")
-    print(f"Saved chunks to {chunks_path}")
+    # Enhanced chunk size and overlap for better context preservation and semantic understanding;
+    # fee tables and financial information use smaller chunks
+    pdf_settings = [(pdf_dir, chunk_settings(600, 250)), (fee_dir, chunk_settings(500, 200))]
+    # Web content often needs larger chunks for better context
+    web_settings = chunk_settings(700, 250)
+    
+    def pdf_chunks():
+        # Unchanged PDFs are served from the extraction cache instead of being re-parsed
+        extraction_cache = ExtractionCache()
+        # One set of worker processes for both directories, started only if a PDF needs parsing
+        extraction_pool = ExtractionPool(PDF_WORKERS) if PDF_WORKERS > 1 else None
+        try:
+            for directory, settings in pdf_settings:
+                print(f"Processing PDFs in {directory}...")
+                count = 0
+                for chunk in iter_pdf_chunks(directory, **settings, workers=PDF_WORKERS,
+                                             file_timeout=PDF_FILE_TIMEOUT, cache=extraction_cache,
+                                             backend=PDF_BACKEND, pool=extraction_pool):
+                    count += 1
+                    yield chunk
+                print(f"Processed {count} chunks from {directory}")
+        finally:
+            if extraction_pool is not None:
+                extraction_pool.close()
+        cache_stats = extraction_cache.stats()
+        print(f"Extraction cache: {cache_stats['chunk_hits']} files reused chunks, "
+              f"{cache_stats['page_hits']} reused pages, {cache_stats['misses']} parsed")
+    
+    def web_chunks():
+        print(f"Processing web links from {links_file}...")
+        count = 0
+        for chunk in iter_web_chunks(links_file, **web_settings, crawl_depth=CRAWL_DEPTH, max_pages=CRAWL_MAX_PAGES):
+            count += 1
+            yield chunk
+        print(f"Processed {count} chunks from web links")
+    
+    def enrich(pdf, web):
+        # Enhance chunks with better metadata and semantic information
+        return iter_enhanced_chunks(chain(pdf, web))
+    
+    def embed(chunks):
+        print(f"Creating embeddings with {EMBEDDING_MODEL}...")
+        # Chunks whose text is unchanged since the last run reuse their saved vectors, as long as
+        # the same model made them; forcing the stage encodes everything again
+        reusable = None
+        if "embed" not in FORCE_STAGES:
+            previous = pipeline.load_previous("embed")
+            if previous is not None and previous.get("model") == EMBEDDING_MODEL:
+                reusable = (previous["vectors"], {key: row for row, key in enumerate(previous["text_keys"])})
+            else:
+                reusable = embeddings_manager.load_reusable_vectors(INDEX_PREFIX)
+        text_keys = []
+        
+        def texts():
+            for chunk in chunks:
+                text_keys.append(text_key(chunk["text"]))
+                yield chunk["text"]
+        
+        vectors = embeddings_manager.encode_texts(texts(), reusable=reusable)
+        print(f"Created {len(vectors)} embeddings ({embeddings_manager.reused_embeddings} reused from the previous run)")
+        return {"model": EMBEDDING_MODEL, "text_keys": text_keys, "vectors": vectors}
+    
+    def index(chunks, embeddings):
+        print("Saving enhanced embeddings...")
+        # The saved chunk store is the one full list of chunks
+        embeddings_manager.build_index(list(chunks), embeddings["vectors"])
+        index_path, chunks_path = embeddings_manager.save_embeddings(filename_prefix=INDEX_PREFIX)
+        print(f"Saved index to {index_path}")
+        print(f"Saved chunks to {chunks_path}")
+        return {"index_path": index_path, "chunks_path": chunks_path, "dimension": embeddings_manager.index.d}
+    
+    pipeline.add(Stage("pdf_chunks", pdf_chunks, stream=True, config=lambda: {
+        "inputs": {directory: directory_snapshot(directory) for directory, _ in pdf_settings},
+        "settings": [settings for _, settings in pdf_settings],
+        "backend": PDF_BACKEND,
+        "versions": [EXTRACTION_VERSION, CHUNKING_VERSION]
+    }))
+    # Pages can change without notice; the HTTP cache keeps the re-crawl cheap, and the same
+    # chunks (in whatever order the pages finish) still let every later stage skip
+    pipeline.add(Stage("web_chunks", web_chunks, always_run=True, stream=True, ordered=False,
+                       config={"settings": web_settings, "crawl_depth": CRAWL_DEPTH, "max_pages": CRAWL_MAX_PAGES}))
+    pipeline.add(Stage("enrich", enrich, deps=["pdf_chunks", "web_chunks"], stream=True,
+                       config={"version": ENRICHMENT_VERSION}))
+    pipeline.add(Stage("embed", embed, deps=["enrich"], config={"model": EMBEDDING_MODEL}))
+    pipeline.add(Stage("index", index, deps=["enrich", "embed"], outputs=[
+        os.path.join(embeddings_manager.embeddings_folder, f"{INDEX_PREFIX}_index.faiss"),
+        os.path.join(embeddings_manager.embeddings_folder, f"{INDEX_PREFIX}_chunks.pkl"),
+        os.path.join(embeddings_manager.embeddings_folder, f"{INDEX_PREFIX}_meta.json")
+    ]))
+    
+    artifacts = pipeline.run(force=FORCE_STAGES)
     
     # Print statistics about the enhanced knowledge base
-    print_chunk_statistics(all_chunks)
+    print(f"Embedding dimension {artifacts['index']()['dimension']}")
+    print_chunk_statistics(artifacts["enrich"]())
     
     print("Enhanced processing complete!")
 
+def chunk_settings(chunk_size, chunk_overlap):
+    """
+    Get chunking arguments for the configured CHUNK_UNIT
+    
+    Args:
+        chunk_size: Chunk size in characters
+        chunk_overlap: Chunk overlap in characters
+        
+    Returns:
+        Keyword arguments with chunk_size, chunk_overlap and chunk_unit
+    """
+    if CHUNK_UNIT == "tokens":
+        # Fill the embedding model's window instead of a fixed character budget
+        return {"chunk_size": TOKEN_CHUNK_SIZE, "chunk_overlap": TOKEN_CHUNK_OVERLAP, "chunk_unit": "tokens"}
+    return {"chunk_size": chunk_size, "chunk_overlap": chunk_overlap, "chunk_unit": "chars"}
+
 def enhance_chunks_with_metadata(chunks):
     """
     Enhance chunks with better metadata and semantic information
@@ -67,30 +222,20 @@ def enhance_chunks_with_metadata(chunks):
     Returns:
         List of enhanced chunks with better metadata
     """
-    enhanced_chunks = []
+    return list(iter_enhanced_chunks(chunks))
+
+def iter_enhanced_chunks(chunks, start=0):
+    """
+    Enhance a stream of chunks in batches
     
-    for i, chunk in enumerate(chunks):
-        enhanced_chunk = chunk.copy()
-        
-        # Add semantic category based on content
-        enhanced_chunk["metadata"]["semantic_category"] = classify_chunk_semantics(chunk["text"])
-        
-        # Add content quality score
-        enhanced_chunk["metadata"]["content_quality"] = assess_content_quality(chunk["text"])
-        
-        # Add chunk importance score
-        enhanced_chunk["metadata"]["importance_score"] = calculate_importance_score(chunk["text"])
-        
-        # Add enhanced source information
-        if "source" in chunk["metadata"]:
-            enhanced_chunk["metadata"]["source_type"] = classify_source_type(chunk["metadata"]["source"])
-        
-        # Add chunk ID for better tracking
-        enhanced_chunk["metadata"]["chunk_id"] = f"chunk_{i:06d}"
+    Args:
+        chunks: Iterable of raw chunks
+        start: Number of the first chunk (used for its chunk ID)
         
-        enhanced_chunks.append(enhanced_chunk)
-    
-    return enhanced_chunks
+    Yields:
+        Enhanced chunks with better metadata (the raw chunks are not modified)
+    """
+    return iter_enriched_chunks(chunks, start=start, workers=ENRICH_WORKERS)
 
 def classify_chunk_semantics(text):
     """
@@ -102,30 +247,7 @@ def classify_chunk_semantics(text):
     Returns:
         Semantic category string
     """
-    text_lower = text.lower()
-    
-    # Define semantic categories with keywords
-    categories = {
-        'academic_program': ['course', 'program', 'degree', 'major', 'minor', 'curriculum', 'syllabus'],
-        'admission_process': ['admission', 'enrollment', 'application', 'deadline', 'requirement'],
-        'financial_info': ['fee', 'tuition', 'payment', 'cost', 'scholarship', 'financial aid'],
-        'campus_facility': ['facility', 'building', 'campus', 'library', 'lab', 'classroom'],
-        'student_services': ['service', 'support', 'help', 'assistance', 'guidance'],
-        'administrative': ['procedure', 'process', 'policy', 'regulation', 'rule'],
-        'general_info': ['information', 'about', 'overview', 'introduction']
-    }
-    
-    # Count matches for each category
-    category_scores = {}
-    for category, keywords in categories.items():
-        score = sum(1 for keyword in keywords if keyword in text_lower)
-        category_scores[category] = score
-    
-    # Return the category with the highest score
-    if category_scores:
-        return max(category_scores, key=category_scores.get)
-    
-    return 'general_info'
+    return get_enricher().score([text])["semantic_category"][0]
 
 def assess_content_quality(text):
     """
@@ -137,22 +259,7 @@ def assess_content_quality(text):
     Returns:
         Quality score (0-1)
     """
-    if not text or len(text.strip()) < 10:
-        return 0.1
-    
-    # Factors that contribute to quality
-    factors = {
-        'length': min(len(text) / 500, 1.0),  # Optimal length around 500 chars
-        'structure': 1.0 if any(char in text for char in ['•', '-', '1.', '2.', '3.']) else 0.5,
-        'specificity': 1.0 if any(word in text.lower() for word in ['specific', 'detail', 'information', 'procedure']) else 0.7,
-        'completeness': 1.0 if text.count('.') >= 2 else 0.6  # Multiple sentences
-    }
-    
-    # Calculate weighted average
-    weights = {'length': 0.3, 'structure': 0.2, 'specificity': 0.3, 'completeness': 0.2}
-    quality_score = sum(factors[key] * weights[key] for key in factors)
-    
-    return min(quality_score, 1.0)
+    return get_enricher().score([text])["content_quality"][0]
 
 def calculate_importance_score(text):
     """
@@ -164,68 +271,27 @@ def calculate_importance_score(text):
     Returns:
         Importance score (0-1)
     """
-    text_lower = text.lower()
-    
-    # Important keywords that indicate high-value content
-    important_keywords = [
-        'fee', 'tuition', 'admission', 'deadline', 'requirement', 'procedure',
-        'application', 'registration', 'enrollment', 'scholarship', 'financial aid',
-        'course', 'program', 'degree', 'curriculum', 'syllabus'
-    ]
-    
-    # Calculate importance based on keyword presence
-    keyword_count = sum(1 for keyword in important_keywords if keyword in text_lower)
-    importance_score = min(keyword_count / 5, 1.0)  # Normalize to 0-1
-    
-    # Boost score for chunks with specific information
-    if any(word in text_lower for word in ['specific', 'detail', 'exact', 'precise']):
-        importance_score = min(importance_score + 0.2, 1.0)
-    
-    return importance_score
-
-def classify_source_type(source):
-    """
-    Classify the source type of the chunk
-    
-    Args:
-        source: Source information
-        
-    Returns:
-        Source type classification
-    """
-    if not source:
-        return 'unknown'
-    
-    source_lower = source.lower()
-    
-    if 'pdf' in source_lower or '.pdf' in source_lower:
-        return 'pdf_document'
-    elif 'web' in source_lower or 'http' in source_lower:
-        return 'web_content'
-    elif 'fee' in source_lower or 'payment' in source_lower:
-        return 'financial_document'
-    elif 'admission' in source_lower or 'application' in source_lower:
-        return 'admission_document'
-    else:
-        return 'general_document'
+    return get_enricher().score([text])["importance_score"][0]
 
 def print_chunk_statistics(chunks):
     """
     Print statistics about the processed chunks
     
     Args:
-        chunks: List of processed chunks
+        chunks: Iterable of processed chunks (read once)
     """
-    print("\n=== CHUNK STATISTICS ===")
-    print(f"Total chunks: {len(chunks)}")
-    
-    # Count by type
+    # Counts and score sums in one pass
+    total = 0
     type_counts = {}
     category_counts = {}
-    quality_scores = []
-    importance_scores = []
+    quality_sum = 0.0
+    importance_sum = 0.0
+    high_quality = 0
+    high_importance = 0
     
     for chunk in chunks:
+        total += 1
+        
         # Count by type
         chunk_type = chunk["metadata"].get("type", "unknown")
         type_counts[chunk_type] = type_counts.get(chunk_type, 0) + 1
@@ -234,9 +300,16 @@ def print_chunk_statistics(chunks):
         category = chunk["metadata"].get("semantic_category", "unknown")
         category_counts[category] = category_counts.get(category, 0) + 1
         
-        # Collect quality and importance scores
-        quality_scores.append(chunk["metadata"].get("content_quality", 0))
-        importance_scores.append(chunk["metadata"].get("importance_score", 0))
+        # Sum quality and importance scores
+        quality = chunk["metadata"].get("content_quality", 0)
+        importance = chunk["metadata"].get("importance_score", 0)
+        quality_sum += quality
+        importance_sum += importance
+        high_quality += quality > 0.8
+        high_importance += importance > 0.8
+    
+    print("\n=== CHUNK STATISTICS ===")
+    print(f"Total chunks: {total}")
     
     print(f"\nChunks by type:")
     for chunk_type, count in type_counts.items():
@@ -246,16 +319,16 @@ def print_chunk_statistics(chunks):
     for category, count in category_counts.items():
         print(f"  {category}: {count}")
     
-    print(f"\nQuality scores - Average: {sum(quality_scores)/len(quality_scores):.2f}")
-    print(f"Importance scores - Average: {sum(importance_scores)/len(importance_scores):.2f}")
+    if total:
+        print(f"\nQuality scores - Average: {quality_sum/total:.2f}")
+        print(f"Importance scores - Average: {importance_sum/total:.2f}")
     
     # Show high-quality chunks
-    high_quality_chunks = [chunk for chunk in chunks if chunk["metadata"].get("content_quality", 0) > 0.8]
-    print(f"\nHigh-quality chunks (>0.8): {len(high_quality_chunks)}")
+    print(f"\nHigh-quality chunks (>0.8): {high_quality}")
     
     # Show high-importance chunks
-    high_importance_chunks = [chunk for chunk in chunks if chunk["metadata"].get("importance_score", 0) > 0.8]
-    print(f"High-importance chunks (>0.8): {len(high_importance_chunks)}")
+    print(f"High-importance chunks (>0.8): {high_importance}")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    configure_logging(log_file="web_scraping.log", timings_file="web_scraping_timings.jsonl")
+    main()
\ No newline at end of file
@@ -0,0 +1,301 @@
+import os
+import sys
+import json
+import time
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+import logging
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+class StageRecord:
+    def __init__(self, name: str, parent: Optional[str] = None, items: Optional[int] = None):
+        """
+        Measurements of one run of a profiled stage
+
+        Args:
+            name: Stage name
+            parent: Name of the enclosing stage on the same thread
+            items: Number of items processed (may be set inside the stage)
+        """
+        self.name = name
+        self.parent = parent
+        self.items = items
+        self.wall_seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.rss_start = None
+        self.rss_end = None
+        self.peak_rss = None
+
+    def observe_rss(self, rss: Optional[int]):
+        """Track the highest RSS seen while the stage runs"""
+        if rss is not None and (self.peak_rss is None or rss > self.peak_rss):
+            self.peak_rss = rss
+
+    def to_dict(self) -> Dict:
+        """Return the record as JSON-serialisable values (memory in MB)"""
+        return {
+            "name": self.name,
+            "parent": self.parent,
+            "wall_seconds": round(self.wall_seconds, 4),
+            "cpu_seconds": round(self.cpu_seconds, 4),
+            "items": self.items,
+            "items_per_second": round(self.items / self.wall_seconds, 2) if self.items and self.wall_seconds else None,
+            "rss_start_mb": _to_mb(self.rss_start),
+            "rss_end_mb": _to_mb(self.rss_end),
+            "peak_rss_mb": _to_mb(self.peak_rss)
+        }
+
+class StageProfiler:
+    def __init__(self, sample_interval=0.05):
+        """
+        Record wall time, CPU time, memory and throughput of named stages
+
+        CPU time covers every thread of this process plus finished child
+        processes (e.g. PDF extraction workers), so stages running at the same
+        time share it. Peak RSS is sampled every sample_interval seconds while
+        a stage is open.
+
+        Args:
+            sample_interval: Seconds between RSS samples
+        """
+        self.sample_interval = sample_interval
+        self.records: List[StageRecord] = []
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        self._open: List[StageRecord] = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._sample, name="rss-sampler", daemon=True)
+        self._sampler.start()
+
+    @contextmanager
+    def stage(self, name: str, items: Optional[int] = None):
+        """
+        Profile a block of code
+
+        Args:
+            name: Stage name
+            items: Number of items processed (or set record.items inside the block)
+
+        Yields:
+            The StageRecord being filled in
+        """
+        stack = self._stack()
+        record = StageRecord(name, parent=stack[-1].name if stack else None, items=items)
+        record.rss_start = current_rss()
+        with self._lock:
+            self._open.append(record)
+            self._observe(record.rss_start)
+        stack.append(record)
+
+        wall_start = time.perf_counter()
+        cpu_start = _cpu_time()
+        try:
+            yield record
+        finally:
+            record.wall_seconds = time.perf_counter() - wall_start
+            record.cpu_seconds = _cpu_time() - cpu_start
+            record.rss_end = current_rss()
+            stack.pop()
+            with self._lock:
+                self._observe(record.rss_end)
+                self._open.remove(record)
+                self.records.append(record)
+            logger.info(f"Profiled {name}: {record.wall_seconds:.2f}s wall, {record.cpu_seconds:.2f}s CPU"
+                        + (f", {record.items} items" if record.items is not None else ""))
+
+    def report(self) -> Dict:
+        """
+        Build the profiling report
+
+        Returns:
+            Dictionary with run metadata, one entry per stage run and totals per stage name
+        """
+        with self._lock:
+            records = list(self.records)
+
+        totals: Dict[str, Dict] = {}
+        for record in records:
+            total = totals.setdefault(record.name, {"runs": 0, "wall_seconds": 0.0, "cpu_seconds": 0.0,
+                                                    "items": None, "peak_rss_mb": None})
+            total["runs"] += 1
+            total["wall_seconds"] = round(total["wall_seconds"] + record.wall_seconds, 4)
+            total["cpu_seconds"] = round(total["cpu_seconds"] + record.cpu_seconds, 4)
+            if record.items is not None:
+                total["items"] = (total["items"] or 0) + record.items
+            peak = _to_mb(record.peak_rss)
+            if peak is not None and (total["peak_rss_mb"] is None or peak > total["peak_rss_mb"]):
+                total["peak_rss_mb"] = peak
+        for total in totals.values():
+            total["items_per_second"] = (round(total["items"] / total["wall_seconds"], 2)
+                                         if total["items"] and total["wall_seconds"] else None)
+
+        return {
+            "started_at": self.started_at,
+            "wall_seconds": round(time.perf_counter() - self._started, 4),
+            "process_peak_rss_mb": _to_mb(process_peak_rss()),
+            "children_peak_rss_mb": _to_mb(process_peak_rss(children=True)),
+            "rss_source": "psutil" if psutil is not None else "procfs",
+            "stages": [record.to_dict() for record in records],
+            "totals": totals
+        }
+
+    def write_report(self, path: str) -> Dict:
+        """
+        Write the profiling report as JSON
+
+        Args:
+            path: Report file
+
+        Returns:
+            The report
+        """
+        report = self.report()
+        folder = os.path.dirname(path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(report, f, indent=2)
+        os.replace(tmp_path, path)
+        return report
+
+    def close(self):
+        """Stop the RSS sampler"""
+        self._stop.set()
+        self._sampler.join()
+
+    def _stack(self) -> List[StageRecord]:
+        """Stages open on the current thread, innermost last"""
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def _observe(self, rss: Optional[int]):
+        """Update the peak RSS of every open stage (call with the lock held)"""
+        for record in self._open:
+            record.observe_rss(rss)
+
+    def _sample(self):
+        """Sample RSS for the open stages until closed"""
+        while not self._stop.wait(self.sample_interval):
+            with self._lock:
+                if self._open:
+                    self._observe(current_rss())
+
+_profiler: Optional[StageProfiler] = None
+
+def start_profiling(sample_interval=0.05) -> StageProfiler:
+    """
+    Start recording profile_stage blocks (meant to be called by an entry point)
+
+    Args:
+        sample_interval: Seconds between RSS samples
+
+    Returns:
+        The active StageProfiler
+    """
+    global _profiler
+    if _profiler is None:
+        _profiler = StageProfiler(sample_interval)
+    return _profiler
+
+def stop_profiling() -> Optional[StageProfiler]:
+    """Stop recording and return the profiler that was active (or None)"""
+    global _profiler
+    profiler, _profiler = _profiler, None
+    if profiler is not None:
+        profiler.close()
+    return profiler
+
+@contextmanager
+def profile_stage(name: str, items: Optional[int] = None):
+    """
+    Profile a block with the active profiler (does nothing unless start_profiling was called)
+
+    Args:
+        name: Stage name
+        items: Number of items processed (or set record.items inside the block)
+
+    Yields:
+        The StageRecord being filled in
+    """
+    if _profiler is None:
+        yield StageRecord(name, items=items)
+        return
+    with _profiler.stage(name, items) as record:
+        yield record
+
+def compare_reports(previous: Dict, current: Dict, threshold=1.25, min_seconds=0.5) -> List[str]:
+    """
+    Find stages that got slower than in a previous report
+
+    Args:
+        previous: Earlier report from StageProfiler.report
+        current: New report
+        threshold: Slowdown factor that counts as a regression
+        min_seconds: Ignore stages faster than this in both runs
+
+    Returns:
+        Human-readable descriptions of the regressions
+    """
+    regressions = []
+    for name, total in current.get("totals", {}).items():
+        before = previous.get("totals", {}).get(name)
+        if not before or max(before["wall_seconds"], total["wall_seconds"]) < min_seconds:
+            continue
+        if total["wall_seconds"] > before["wall_seconds"] * threshold:
+            regressions.append(f"{name}: {before['wall_seconds']:.2f}s -> {total['wall_seconds']:.2f}s")
+    return regressions
+
+def current_rss() -> Optional[int]:
+    """Resident set size of this process in bytes (None if it cannot be read)"""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+def process_peak_rss(children=False) -> Optional[int]:
+    """
+    Peak resident set size in bytes since the process started
+
+    Args:
+        children: Report the largest finished child process instead
+
+    Returns:
+        Bytes, or None where the resource module is unavailable
+    """
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF)
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return usage.ru_maxrss if sys.platform == "darwin" else usage.ru_maxrss * 1024
+
+def _cpu_time() -> float:
+    """CPU seconds used by this process and its finished children"""
+    cpu = time.process_time()
+    if resource is not None:
+        children = resource.getrusage(resource.RUSAGE_CHILDREN)
+        cpu += children.ru_utime + children.ru_stime
+    return cpu
+
+def _to_mb(value: Optional[int]) -> Optional[float]:
+    """Convert bytes to megabytes"""
+    return round(value / (1024 * 1024), 1) if value is not None else None
@@ -0,0 +1,137 @@
+import re
+import time
+import threading
+from typing import Dict, Mapping, Optional
+import logging
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+DURATION_PATTERN = re.compile(r'(\d+(?:\.\d+)?)(ms|h|m|s)')
+DURATION_UNITS = {'h': 3600.0, 'm': 60.0, 's': 1.0, 'ms': 0.001}
+
+class _HeaderBucket:
+    """Token bucket whose level and refill rate come from rate-limit response headers"""
+
+    def __init__(self):
+        self.capacity = None  # Unknown until a response reports the limit
+        self.tokens = 0.0
+        self.rate = 0.0  # Tokens per second
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        if self.capacity is not None:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def update(self, limit: float, remaining: float, reset_seconds: Optional[float], now: float):
+        # The server refills the window to the limit by the reset time
+        self.capacity = limit
+        self.tokens = remaining
+        used = max(limit - remaining, 1.0)
+        self.rate = used / reset_seconds if reset_seconds else limit
+        self.updated = now
+
+    def wait_time(self, cost: float) -> float:
+        if self.capacity is None or self.tokens >= min(cost, self.capacity):
+            return 0.0
+        if self.rate <= 0:
+            return float("inf")
+        return (min(cost, self.capacity) - self.tokens) / self.rate
+
+class HeaderRateLimiter:
+    def __init__(self, max_wait=30.0):
+        """
+        Client-side rate limiter driven by x-ratelimit-* response headers
+
+        Keeps one token bucket for requests and one for tokens. Each response
+        resets a bucket to the remaining quota it reports and sets its refill
+        rate so it is full again at the reported reset time. Requests take
+        from the buckets before they are sent, so a burst waits briefly for
+        quota instead of being rejected with 429.
+
+        Args:
+            max_wait: Longest a request waits for quota before it is sent anyway (seconds)
+        """
+        self.max_wait = max_wait
+        self.waited = 0.0
+        self._buckets = {"requests": _HeaderBucket(), "tokens": _HeaderBucket()}
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: int = 0) -> float:
+        """
+        Wait until the quota allows one request using an estimated number of tokens
+
+        Args:
+            tokens: Estimated tokens the request will use
+
+        Returns:
+            Seconds spent waiting
+        """
+        costs = {"requests": 1, "tokens": tokens}
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                for bucket in self._buckets.values():
+                    bucket.refill(now)
+                wait = max(bucket.wait_time(costs[name]) for name, bucket in self._buckets.items())
+                if wait <= 0 or waited + wait > self.max_wait:
+                    if wait > 0:
+                        logger.warning(f"Rate limit quota exhausted for {wait:.1f}s more; sending the request anyway")
+                    for name, bucket in self._buckets.items():
+                        if bucket.capacity is not None:
+                            bucket.tokens -= costs[name]
+                    self.waited += waited
+                    return waited
+            time.sleep(wait)
+            waited += wait
+
+    def update(self, headers: Mapping[str, str]):
+        """
+        Update the buckets from the rate-limit headers of a response
+
+        Args:
+            headers: Response headers (x-ratelimit-limit-requests, x-ratelimit-remaining-tokens, ...)
+        """
+        now = time.monotonic()
+        with self._lock:
+            for name, bucket in self._buckets.items():
+                try:
+                    limit = float(headers[f"x-ratelimit-limit-{name}"])
+                    remaining = float(headers[f"x-ratelimit-remaining-{name}"])
+                except (KeyError, TypeError, ValueError):
+                    continue
+                bucket.update(limit, remaining, parse_duration(headers.get(f"x-ratelimit-reset-{name}")), now)
+
+    def snapshot(self) -> Dict[str, Optional[float]]:
+        """Return the estimated remaining requests and tokens (None while unknown)"""
+        with self._lock:
+            now = time.monotonic()
+            result = {}
+            for name, bucket in self._buckets.items():
+                bucket.refill(now)
+                result[name] = bucket.tokens if bucket.capacity is not None else None
+            return result
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a rate-limit reset duration such as "7.66s", "2m59.56s" or "120ms"
+
+    Args:
+        value: Header value (plain numbers are seconds)
+
+    Returns:
+        Seconds, or None if the value is missing or unreadable
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = DURATION_PATTERN.findall(value)
+    if not parts or ''.join(number + unit for number, unit in parts) != value:
+        return None
+    return sum(float(number) * DURATION_UNITS[unit] for number, unit in parts)
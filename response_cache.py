@@ -0,0 +1,335 @@
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+import faiss
+import numpy as np
+import logging
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+QUESTION_NOISE_PATTERN = re.compile(r'[^\w\s]')
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+def normalize_question(question: str) -> str:
+    """
+    Normalize a question so that trivially different spellings share a cache entry
+
+    Lowercases, drops punctuation and collapses whitespace.
+
+    Args:
+        question: User's question
+
+    Returns:
+        Normalized question
+    """
+    return WHITESPACE_PATTERN.sub(' ', QUESTION_NOISE_PATTERN.sub(' ', question.lower())).strip()
+
+def chunk_ids(context: List[Dict]) -> List[str]:
+    """
+    Identify the chunks of a retrieved context by content
+
+    Chunk IDs assigned at ingestion are positional and get reused after a
+    rebuild, so the text is hashed instead.
+
+    Args:
+        context: Context chunks
+
+    Returns:
+        Hex digests of the chunk texts, in context order
+    """
+    return [hashlib.sha256(chunk["text"].encode("utf-8")).hexdigest()[:16] for chunk in context]
+
+class ResponseCache:
+    def __init__(self, max_entries=1000, ttl=6 * 3600, path=None):
+        """
+        Exact-match cache of generated answers
+
+        Entries are keyed by the normalized question, the retrieved chunks, the
+        model parameters and the conversation history, expire after ttl seconds
+        and are evicted least recently used first beyond max_entries.
+
+        Args:
+            max_entries: Maximum number of cached answers
+            ttl: Seconds an answer stays valid
+            path: Optional JSON file the cache is loaded from and saved to
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        if self.path:
+            self._load()
+
+    def make_key(self, question: str, context: List[Dict], model_params: Dict,
+                 query_history: Optional[List[str]] = None) -> str:
+        """
+        Build the cache key of a question
+
+        Args:
+            question: User's question
+            context: Context chunks the answer is generated from
+            model_params: Model name and sampling parameters
+            query_history: Previous user queries included in the prompt
+
+        Returns:
+            Hex digest key
+        """
+        key = json.dumps({
+            "question": normalize_question(question),
+            "chunks": chunk_ids(context),
+            "model": model_params,
+            "history": query_history or []
+        }, sort_keys=True)
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Look up a cached answer
+
+        Args:
+            key: Key from make_key
+
+        Returns:
+            The answer, or None on a miss or if it expired
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry["expires_at"] < time.time():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry["answer"]
+
+    def put(self, key: str, answer: str):
+        """
+        Store an answer
+
+        Args:
+            key: Key from make_key
+            answer: Final answer text
+        """
+        with self._lock:
+            self._entries[key] = {"answer": answer, "expires_at": time.time() + self.ttl}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            if self.path:
+                self._save()
+
+    def clear(self):
+        """Drop every entry"""
+        with self._lock:
+            self._entries.clear()
+            if self.path:
+                self._save()
+
+    def stats(self) -> Dict[str, int]:
+        """Return the number of entries, hits and misses"""
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+    def _load(self):
+        """Load unexpired entries from disk (least recently used first)"""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r") as f:
+                entries = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable response cache {self.path}: {e}")
+            return
+        now = time.time()
+        for key, entry in entries:
+            if entry["expires_at"] >= now:
+                self._entries[key] = entry
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _save(self):
+        """Atomically write the entries (call with the lock held)"""
+        folder = os.path.dirname(self.path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(list(self._entries.items()), f)
+        os.replace(tmp_path, self.path)
+
+class SemanticResponseCache:
+    def __init__(self, similarity_threshold=0.9, min_chunk_overlap=0.5, max_entries=1000, ttl=6 * 3600):
+        """
+        Cache of generated answers matched by question meaning
+
+        Each answered question's embedding is kept in a small FAISS inner-product
+        index. A new question is answered from the cache when a cached question
+        is at least similarity_threshold similar, was asked with the same model
+        parameters and conversation history, and its retrieved chunks overlap
+        the new ones by at least min_chunk_overlap (Jaccard). The cache is
+        cleared whenever the knowledge-base version it is attached to changes.
+
+        Args:
+            similarity_threshold: Minimum cosine similarity between the questions
+            min_chunk_overlap: Minimum Jaccard overlap of the retrieved chunk sets
+            max_entries: Maximum number of cached answers
+            ttl: Seconds an answer stays valid
+        """
+        self.similarity_threshold = similarity_threshold
+        self.min_chunk_overlap = min_chunk_overlap
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.kb_version = None
+        self.hits = 0
+        self.misses = 0
+        self._encoder: Optional[Callable[[str], np.ndarray]] = None
+        self._entries: List[Dict] = []  # One per index row
+        self._index = None
+        self._lock = threading.Lock()
+
+    def attach(self, encoder: Callable[[str], np.ndarray], kb_version: Optional[str]):
+        """
+        Set the question encoder and knowledge-base version, dropping every entry if the version changed
+
+        Args:
+            encoder: Function returning the normalized embedding of a question
+            kb_version: Version of the knowledge base answers are generated from
+        """
+        with self._lock:
+            self._encoder = encoder
+            if kb_version != self.kb_version:
+                if self._entries:
+                    logger.info(f"Knowledge base changed ({self.kb_version} -> {kb_version}); clearing the semantic cache")
+                self.kb_version = kb_version
+                self._reset()
+
+    def embed(self, question: str) -> Optional[np.ndarray]:
+        """
+        Encode a question for get and put
+
+        Args:
+            question: User's question
+
+        Returns:
+            Normalized float32 embedding, or None while no encoder is attached
+        """
+        encoder = self._encoder
+        if encoder is None:
+            return None
+        return np.asarray(encoder(question), dtype=np.float32).reshape(-1)
+
+    def get(self, embedding: np.ndarray, context: List[Dict], model_params: Dict,
+            query_history: Optional[List[str]] = None) -> Optional[str]:
+        """
+        Look up the answer of the most similar compatible cached question
+
+        Args:
+            embedding: Question embedding from embed
+            context: Context chunks retrieved for the question
+            model_params: Model name and sampling parameters
+            query_history: Previous user queries included in the prompt
+
+        Returns:
+            The answer, or None on a miss
+        """
+        scope = self._scope(model_params, query_history)
+        chunks = set(chunk_ids(context))
+        now = time.time()
+        with self._lock:
+            if self._index is None or self._index.ntotal == 0 or embedding.shape[0] != self._index.d:
+                self.misses += 1
+                return None
+            scores, rows = self._index.search(embedding.reshape(1, -1), min(8, self._index.ntotal))
+            # Results come most similar first
+            for score, row in zip(scores[0], rows[0]):
+                if row < 0 or score < self.similarity_threshold:
+                    break
+                entry = self._entries[row]
+                if entry["expires_at"] < now or entry["scope"] != scope:
+                    continue
+                if _jaccard(chunks, entry["chunks"]) >= self.min_chunk_overlap:
+                    entry["last_used"] = now
+                    self.hits += 1
+                    logger.info(f"Semantic cache hit ({score:.3f}) for a paraphrase of: {entry['question']}")
+                    return entry["answer"]
+            self.misses += 1
+            return None
+
+    def put(self, embedding: np.ndarray, question: str, context: List[Dict], model_params: Dict,
+            query_history: Optional[List[str]], answer: str):
+        """
+        Store an answer
+
+        Args:
+            embedding: Question embedding from embed
+            question: User's question
+            context: Context chunks the answer was generated from
+            model_params: Model name and sampling parameters
+            query_history: Previous user queries included in the prompt
+            answer: Final answer text
+        """
+        now = time.time()
+        vector = np.ascontiguousarray(embedding, dtype=np.float32).reshape(1, -1)
+        with self._lock:
+            if self._index is None or self._index.d != vector.shape[1]:
+                self._reset(vector.shape[1])
+            self._entries.append({
+                "question": question,
+                "vector": vector[0],
+                "chunks": set(chunk_ids(context)),
+                "scope": self._scope(model_params, query_history),
+                "answer": answer,
+                "expires_at": now + self.ttl,
+                "last_used": now
+            })
+            self._index.add(vector)
+            if len(self._entries) > self.max_entries:
+                self._evict(now)
+
+    def clear(self):
+        """Drop every entry"""
+        with self._lock:
+            self._reset()
+
+    def stats(self) -> Dict[str, int]:
+        """Return the number of entries, hits and misses"""
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+    def _scope(self, model_params: Dict, query_history: Optional[List[str]]) -> str:
+        """Digest of what besides the question and chunks shapes an answer"""
+        scope = json.dumps({"model": model_params, "history": query_history or []}, sort_keys=True)
+        return hashlib.sha256(scope.encode("utf-8")).hexdigest()
+
+    def _reset(self, dimension: Optional[int] = None):
+        """Drop every entry, starting an index of the given dimension (call with the lock held)"""
+        self._entries = []
+        self._index = faiss.IndexFlatIP(dimension) if dimension else None
+
+    def _evict(self, now: float):
+        """Drop expired entries, then the least recently used, and rebuild the index (call with the lock held)"""
+        # Evicting down to 90% of the limit keeps the O(n) rebuild off most puts
+        keep = [entry for entry in self._entries if entry["expires_at"] >= now]
+        keep.sort(key=lambda entry: entry["last_used"])
+        keep = keep[-max(int(self.max_entries * 0.9), 1):]
+        self._index.reset()
+        self._entries = keep
+        if keep:
+            self._index.add(np.vstack([entry["vector"] for entry in keep]))
+
+def _jaccard(a: set, b: set) -> float:
+    """Jaccard overlap of two sets (1.0 when both are empty)"""
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
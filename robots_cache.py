@@ -0,0 +1,201 @@
+import os
+import re
+import math
+import json
+import time
+import hashlib
+import threading
+from urllib.parse import urlsplit
+from urllib.robotparser import RobotFileParser
+from typing import Dict, List, Optional
+import logging
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+CRAWL_DELAY_PATTERN = re.compile(r'^\s*crawl-delay\s*:\s*(\d*\.\d+)\s*(?:#.*)?$', re.IGNORECASE)
+
+class RobotsCache:
+    def __init__(self, cache_folder=os.path.join("embeddings", "robots_cache"), ttl=24 * 3600, timeout=15):
+        """
+        Per-site cache of parsed robots.txt files
+
+        Each site's robots.txt is fetched at most once per crawl and kept on disk
+        for ttl seconds, so later crawls skip the request entirely.
+
+        Args:
+            cache_folder: Folder where fetched robots.txt files are stored (None keeps them in memory only)
+            ttl: Seconds a stored robots.txt stays valid
+            timeout: Timeout for fetching robots.txt (seconds)
+        """
+        self.cache_folder = cache_folder
+        self.ttl = ttl
+        self.timeout = timeout
+        self.fetches = 0
+        self._parsers: Dict[str, RobotFileParser] = {}
+        self._fetch_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+        if self.cache_folder and not os.path.exists(self.cache_folder):
+            os.makedirs(self.cache_folder)
+
+    def can_fetch(self, url: str, session, user_agent: str = "*") -> bool:
+        """
+        Check whether robots.txt allows fetching a URL
+
+        Args:
+            url: URL to check
+            session: requests.Session used if robots.txt must be fetched
+            user_agent: User agent the rules are matched against
+
+        Returns:
+            True if the URL may be fetched
+        """
+        return self.get_parser(url, session).can_fetch(user_agent, url)
+
+    def crawl_delay(self, url: str, session, user_agent: str = "*") -> Optional[float]:
+        """
+        Get the delay between requests a site asks for
+
+        Uses Crawl-delay, or the interval implied by Request-rate.
+
+        Args:
+            url: Any URL of the site
+            session: requests.Session used if robots.txt must be fetched
+            user_agent: User agent the rules are matched against
+
+        Returns:
+            Seconds between requests, or None if the site does not say
+        """
+        parser = self.get_parser(url, session)
+        delay = parser.crawl_delay(user_agent)
+        if delay is not None:
+            return float(delay)
+        rate = parser.request_rate(user_agent)
+        if rate is not None and rate.requests:
+            return rate.seconds / rate.requests
+        return None
+
+    def sitemaps(self, url: str, session) -> List[str]:
+        """Return the Sitemap URLs listed in a site's robots.txt"""
+        return self.get_parser(url, session).site_maps() or []
+
+    def get_parser(self, url: str, session) -> RobotFileParser:
+        """
+        Get the parsed robots.txt of a URL's site, loading or fetching it once
+
+        Args:
+            url: Any URL of the site
+            session: requests.Session used if robots.txt must be fetched
+
+        Returns:
+            RobotFileParser for the site
+        """
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc}"
+
+        with self._lock:
+            parser = self._parsers.get(origin)
+            if parser is not None:
+                return parser
+            fetch_lock = self._fetch_locks.setdefault(origin, threading.Lock())
+
+        # One thread fetches a site's robots.txt while the others wait for it
+        with fetch_lock:
+            with self._lock:
+                parser = self._parsers.get(origin)
+            if parser is None:
+                parser = self._load(origin) or self._fetch(origin, session)
+                with self._lock:
+                    self._parsers[origin] = parser
+        return parser
+
+    def _fetch(self, origin: str, session) -> RobotFileParser:
+        """
+        Download and parse a site's robots.txt
+
+        Follows urllib.robotparser: 401/403 disallow everything, other 4xx allow
+        everything. Server and network errors disallow everything for this
+        crawl, as the site's rules are unknown, but are not stored, so the next
+        crawl asks again.
+        """
+        robots_url = f"{origin}/robots.txt"
+        self.fetches += 1
+        try:
+            response = session.get(robots_url, timeout=self.timeout)
+        except Exception as e:
+            logger.warning(f"Could not fetch {robots_url}: {e}")
+            return _make_parser(robots_url, disallow_all=True)
+
+        if response.status_code in (401, 403):
+            state = {"disallow_all": True}
+        elif 400 <= response.status_code < 500:
+            state = {"allow_all": True}
+        elif response.status_code >= 500:
+            logger.warning(f"Could not fetch {robots_url}: HTTP {response.status_code}")
+            return _make_parser(robots_url, disallow_all=True)
+        else:
+            state = {"lines": response.text.splitlines()}
+
+        state["fetched_at"] = time.time()
+        self._store(origin, state)
+        return _make_parser(robots_url, **_parser_args(state))
+
+    def _load(self, origin: str) -> Optional[RobotFileParser]:
+        """Load a stored robots.txt that has not expired"""
+        path = self._entry_path(origin)
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r") as f:
+                state = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable robots cache entry for {origin}: {e}")
+            return None
+        if time.time() - state.get("fetched_at", 0) > self.ttl:
+            return None
+        return _make_parser(f"{origin}/robots.txt", **_parser_args(state))
+
+    def _store(self, origin: str, state: Dict):
+        """Atomically write a site's robots.txt state"""
+        path = self._entry_path(origin)
+        if not path:
+            return
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, path)
+
+    def _entry_path(self, origin: str) -> Optional[str]:
+        """Build the on-disk path of a site's entry"""
+        if not self.cache_folder:
+            return None
+        return os.path.join(self.cache_folder, f"{hashlib.sha256(origin.encode('utf-8')).hexdigest()[:32]}.json")
+
+def _parser_args(state: Dict) -> Dict:
+    """Map a stored robots.txt state to _make_parser arguments"""
+    return {
+        "lines": state.get("lines"),
+        "allow_all": state.get("allow_all", False),
+        "disallow_all": state.get("disallow_all", False)
+    }
+
+def _make_parser(robots_url: str, lines=None, allow_all=False, disallow_all=False) -> RobotFileParser:
+    """Build a RobotFileParser from robots.txt lines or a blanket rule"""
+    parser = RobotFileParser(robots_url)
+    parser.allow_all = allow_all
+    parser.disallow_all = disallow_all
+    parser.parse([_round_up_crawl_delay(line) for line in lines or []])
+    return parser
+
+def _round_up_crawl_delay(line: str) -> str:
+    """
+    Round a fractional Crawl-delay up to whole seconds
+
+    urllib.robotparser ignores delays that are not integers, which would drop
+    common values such as 0.5 entirely.
+    """
+    match = CRAWL_DELAY_PATTERN.match(line)
+    if not match:
+        return line
+    return f"Crawl-delay: {math.ceil(float(match.group(1)))}"
@@ -0,0 +1,313 @@
+import os
+import json
+import hashlib
+import xml.etree.ElementTree as ET
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode, urljoin
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import logging
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Query parameters that only track the visitor and never change the page
+TRACKING_PARAMS = {'gclid', 'fbclid', 'msclkid', 'mc_cid', 'mc_eid', '_ga', 'ref', 'ref_src'}
+TRACKING_PREFIXES = ('utm_',)
+
+# Links to files that cannot be extracted (HTML and PDF links are followed)
+SKIPPED_EXTENSIONS = (
+    '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx', '.zip', '.rar', '.gz',
+    '.jpg', '.jpeg', '.png', '.gif', '.svg', '.webp', '.ico', '.mp3', '.mp4', '.avi', '.css', '.js'
+)
+
+MAX_SITEMAPS = 20  # Sitemaps fetched per site, including those listed by a sitemap index
+
+def normalize_url(url: str) -> Optional[str]:
+    """
+    Normalize a URL so that equivalent spellings compare equal
+
+    Lowercases the scheme and host, drops default ports, fragments and tracking
+    parameters, and removes trailing slashes from non-root paths.
+
+    Args:
+        url: Absolute URL
+
+    Returns:
+        Normalized URL, or None if it is not an http(s) URL
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    if scheme not in ('http', 'https') or not parts.hostname:
+        return None
+
+    host = parts.hostname.lower()
+    if parts.port and not (scheme == 'http' and parts.port == 80 or scheme == 'https' and parts.port == 443):
+        host = f"{host}:{parts.port}"
+
+    path = parts.path or '/'
+    if len(path) > 1:
+        path = path.rstrip('/') or '/'
+
+    query = [(key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+             if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)]
+
+    return urlunsplit((scheme, host, path, urlencode(query), ''))
+
+def site_key(url: str) -> str:
+    """Return the host of a URL without a leading www. (pages of one site share it)"""
+    host = urlsplit(url).netloc.lower()
+    return host[4:] if host.startswith('www.') else host
+
+def content_hash(result: Dict) -> str:
+    """
+    Hash the extracted text of a scraped page
+
+    The page's own URL is removed first so the same content served under
+    different URLs hashes identically.
+
+    Args:
+        result: Result dictionary from WebScraper.scrape_url
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    text = result["text"].replace(result["url"], "")
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+class SiteCrawler:
+    def __init__(self, scraper, max_depth=2, max_pages=200, frontier_path=None, use_sitemaps=True):
+        """
+        Bounded breadth-first crawler that follows links within the seed sites
+
+        Args:
+            scraper: WebScraper used to fetch pages (its scheduler and HTTP cache apply)
+            max_depth: Link hops followed from the seed URLs (0 fetches only the seeds)
+            max_pages: Maximum number of distinct pages to return
+            frontier_path: JSON file where the crawl state is saved so an
+                interrupted crawl resumes where it stopped
+            use_sitemaps: Seed each site with the URLs listed in its sitemap.xml
+        """
+        self.scraper = scraper
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.frontier_path = frontier_path
+        self.use_sitemaps = use_sitemaps
+        self.sites = set()
+        self.seen = set()  # Normalized URLs queued or fetched
+        self.content_hashes = set()
+        self.done: Dict[str, Tuple[str, int]] = {}  # url -> (content hash, depth) of each page returned, in order
+        self.queue: deque = deque()  # (url, depth) still to fetch, in breadth-first order
+        self.in_flight: Dict[str, int] = {}  # url -> depth of the batch being fetched
+        self.duplicates = 0
+
+    def crawl(self, seed_urls: Iterable[str]) -> Iterator[Dict]:
+        """
+        Crawl from the seed URLs, yielding each new page as it is scraped
+
+        Args:
+            seed_urls: Starting URLs; their sites bound the crawl
+
+        Yields:
+            Dictionaries with url and extracted text, one per distinct page
+        """
+        seeds = [url for url in (normalize_url(url) for url in seed_urls) if url]
+        self.sites.update(site_key(url) for url in seeds)
+
+        resumed = self._load_frontier()
+        if resumed:
+            logger.info(f"Resuming crawl: {len(self.done)} pages done, {len(self.queue)} queued")
+            yield from self._replay_done_pages()
+        else:
+            self._enqueue(seeds, 0)
+            if self.use_sitemaps:
+                for site_url in sorted({urlunsplit(urlsplit(url)[:2] + ('/', '', '')) for url in seeds}):
+                    self._enqueue(self._sitemap_urls(site_url), 0)
+
+        try:
+            while self.queue and len(self.done) < self.max_pages:
+                # Fetch one depth at a time, in batches no larger than the remaining page budget
+                depth = self.queue[0][1]
+                while self.queue and self.queue[0][1] == depth and len(self.in_flight) < self.max_pages - len(self.done):
+                    url, _ = self.queue.popleft()
+                    self.in_flight[url] = depth
+
+                for result in self.scraper.scrape_scheduled(list(self.in_flight), extract_links=True):
+                    if result:
+                        self.in_flight.pop(result["url"], None)
+                    page = self._accept(result, depth)
+                    if page is not None:
+                        yield page
+                self.in_flight.clear()
+                self._save_frontier()
+        finally:
+            # Keep unfinished URLs so an interrupted crawl fetches them on resume
+            self.queue.extendleft((url, depth) for url, depth in reversed(list(self.in_flight.items())))
+            self.in_flight.clear()
+            if not self.queue and self.frontier_path and os.path.exists(self.frontier_path):
+                # A finished crawl starts from scratch next time (unchanged pages hit the HTTP cache)
+                os.remove(self.frontier_path)
+            else:
+                self._save_frontier()
+
+        logger.info(f"Crawl finished: {len(self.done)} pages, {self.duplicates} duplicates skipped")
+
+    def _accept(self, result: Optional[Dict], depth: int) -> Optional[Dict]:
+        """
+        Record a scraped page, queue its links and filter duplicates
+
+        Args:
+            result: Result of scrape_url (or None)
+            depth: Link depth of the page
+
+        Returns:
+            The page to yield, or None if it failed, is a duplicate or is over budget
+        """
+        if not result or result["status"] != "success":
+            return None
+
+        final_url = normalize_url(result.get("final_url") or result["url"])
+        if final_url:
+            self.seen.add(final_url)
+
+        if depth < self.max_depth:
+            self._enqueue((urljoin(result["url"], link) for link in result.get("links", [])), depth + 1)
+
+        digest = content_hash(result)
+        if digest in self.content_hashes or len(self.done) >= self.max_pages:
+            self.duplicates += digest in self.content_hashes
+            return None
+        self.content_hashes.add(digest)
+        self.done[result["url"]] = (digest, depth)
+
+        page = dict(result)
+        page.pop("links", None)
+        page.pop("final_url", None)
+        page["depth"] = depth
+        return page
+
+    def _enqueue(self, urls: Iterable[str], depth: int):
+        """Queue unseen same-site URLs at a depth"""
+        for url in urls:
+            url = normalize_url(url)
+            if not url or url in self.seen or site_key(url) not in self.sites:
+                continue
+            if urlsplit(url).path.lower().endswith(SKIPPED_EXTENSIONS):
+                continue
+            self.seen.add(url)
+            self.queue.append((url, depth))
+
+    def _sitemap_urls(self, site_url: str) -> List[str]:
+        """
+        Read the page URLs listed in a site's sitemaps (following sitemap indexes)
+
+        The sitemaps named in robots.txt are used, or /sitemap.xml if it names none.
+
+        Args:
+            site_url: Root URL of the site
+
+        Returns:
+            List of page URLs (empty if the site has no readable sitemap)
+        """
+        robots_cache = self.scraper.robots_cache
+        pending = robots_cache.sitemaps(site_url, self.scraper.get_session()) if robots_cache else []
+        pending = pending or [urljoin(site_url, '/sitemap.xml')]
+        fetched = set()
+        urls = []
+
+        while pending and len(fetched) < MAX_SITEMAPS:
+            sitemap_url = pending.pop(0)
+            if sitemap_url in fetched:
+                continue
+            fetched.add(sitemap_url)
+
+            try:
+                self.scraper.wait_for_domain(sitemap_url)
+                response = self.scraper.get_session().get(sitemap_url, timeout=30)
+                if response.status_code != 200:
+                    continue
+                root = ET.fromstring(response.content)
+            except Exception as e:
+                logger.info(f"No usable sitemap at {sitemap_url}: {e}")
+                continue
+
+            locations = [element.text.strip() for element in root.iter()
+                         if element.tag.rsplit('}', 1)[-1] == 'loc' and element.text]
+            if root.tag.rsplit('}', 1)[-1] == 'sitemapindex':
+                pending.extend(locations)
+            else:
+                urls.extend(locations)
+
+        logger.info(f"Found {len(urls)} URLs in the sitemaps of {site_url}")
+        return urls
+
+    def _replay_done_pages(self) -> Iterator[Dict]:
+        """
+        Yield the pages finished before the crawl was interrupted
+
+        Pages are served from the scraper's HTTP cache; pages missing from it (or
+        extracted by another extractor version) are queued to be fetched again at
+        their depth, and their content hash is released so the fetched page is
+        not taken for a duplicate of itself.
+        """
+        http_cache = self.scraper.http_cache
+        done, self.done = self.done, {}
+        refetch = []
+        for url, (digest, depth) in done.items():
+            entry = http_cache.get(url) if http_cache else None
+            if entry is None or entry.get("extraction_version") != self.scraper.extraction_version:
+                self.content_hashes.discard(digest)
+                refetch.append((url, depth))
+                continue
+            self.done[url] = (digest, depth)
+            page = {"url": url, "text": entry["text"], "status": "success", "changed": False,
+                    "format": entry.get("format", "html"), "depth": depth}
+            if entry.get("pages") is not None:
+                page["pages"] = entry["pages"]
+            yield page
+        # Done pages were fetched before anything still queued, so they go first in breadth-first order
+        self.queue.extendleft(reversed(refetch))
+
+    def _load_frontier(self) -> bool:
+        """
+        Restore a saved crawl state
+
+        Returns:
+            True if an interrupted crawl was restored
+        """
+        if not self.frontier_path or not os.path.exists(self.frontier_path):
+            return False
+        try:
+            with open(self.frontier_path, "r") as f:
+                state = json.load(f)
+            # Frontiers written before page hashes were saved no longer load and start a fresh crawl
+            done = {url: (digest, depth) for url, digest, depth in state.get("done", [])}
+            queue = deque((url, depth) for url, depth in state.get("queue", []))
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable crawl frontier {self.frontier_path}: {e}")
+            return False
+
+        self.sites.update(state.get("sites", []))
+        self.seen = set(state.get("seen", []))
+        self.content_hashes = set(state.get("content_hashes", []))
+        self.done = done
+        self.queue = queue
+        return True
+
+    def _save_frontier(self):
+        """Atomically write the crawl state"""
+        if not self.frontier_path:
+            return
+        state = {
+            "sites": sorted(self.sites),
+            "seen": sorted(self.seen),
+            "content_hashes": sorted(self.content_hashes),
+            "done": [[url, digest, depth] for url, (digest, depth) in self.done.items()],
+            "queue": list(self.queue) + list(self.in_flight.items())
+        }
+        folder = os.path.dirname(self.frontier_path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        tmp_path = f"{self.frontier_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.frontier_path)
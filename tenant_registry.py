@@ -0,0 +1,170 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+import logging
+
+from sentence_transformers import SentenceTransformer
+from embeddings_manager import EmbeddingsManager
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+class TenantRegistry:
+    def __init__(self, model_name="BAAI/bge-base-en-v1.5", max_memory_bytes=2 * 1024 ** 3, model=None):
+        """
+        Registry of per-university knowledge bases sharing one embedding model
+
+        Indexes and chunk stores are loaded on first use and the least recently
+        used tenants are unloaded whenever the resident total exceeds max_memory_bytes.
+        Loading from disk happens outside the registry lock, so a cold tenant
+        does not hold up lookups of the others.
+
+        Args:
+            model_name: Name of the sentence transformer model shared by all tenants
+            max_memory_bytes: Memory cap for the resident indexes and chunks
+            model: Already loaded SentenceTransformer to share instead of loading model_name
+        """
+        self.model_name = model_name
+        self.max_memory_bytes = max_memory_bytes
+        self._model = model
+        self._model_lock = threading.Lock()
+        self._tenants: Dict[str, Dict[str, str]] = {}
+        self._resident: "OrderedDict[str, EmbeddingsManager]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._load_locks: Dict[str, threading.Lock] = {}  # One per tenant, held while it loads
+        self._lock = threading.RLock()
+
+    @property
+    def model(self):
+        """The shared SentenceTransformer, loaded on first access"""
+        with self._model_lock:
+            if self._model is None:
+                self._model = SentenceTransformer(self.model_name)
+            return self._model
+
+    def register_tenant(self, tenant_id: str, embeddings_folder: str, filename_prefix: str = "university_combined"):
+        """
+        Register a tenant's knowledge base location without loading it
+
+        Args:
+            tenant_id: Unique tenant (university) identifier
+            embeddings_folder: Folder holding the tenant's index and chunks
+            filename_prefix: Prefix of the tenant's saved files
+        """
+        with self._lock:
+            if tenant_id in self._resident:
+                self._evict(tenant_id)
+            self._tenants[tenant_id] = {
+                "embeddings_folder": embeddings_folder,
+                "filename_prefix": filename_prefix
+            }
+
+    def list_tenants(self) -> List[str]:
+        """Return the ids of all registered tenants"""
+        with self._lock:
+            return list(self._tenants)
+
+    def get_manager(self, tenant_id: str) -> EmbeddingsManager:
+        """
+        Get the loaded embeddings manager for a tenant, loading it if needed
+
+        Args:
+            tenant_id: Registered tenant identifier
+
+        Returns:
+            EmbeddingsManager with the tenant's index and chunks loaded
+        """
+        while True:
+            manager = self._get_resident(tenant_id)
+            if manager is not None:
+                return manager
+
+            # Concurrent requests for the same cold tenant wait for a single load
+            with self._lock:
+                load_lock = self._load_locks.setdefault(tenant_id, threading.Lock())
+            with load_lock:
+                manager = self._get_resident(tenant_id)
+                if manager is not None:
+                    return manager
+
+                with self._lock:
+                    config = self._tenants[tenant_id]
+                manager = EmbeddingsManager(
+                    model_name=self.model_name,
+                    model=self.model,
+                    embeddings_folder=config["embeddings_folder"]
+                )
+                if not manager.load_embeddings(filename_prefix=config["filename_prefix"]):
+                    raise ValueError(f"No knowledge base found for tenant {tenant_id} in {config['embeddings_folder']}")
+                size = manager.memory_usage_bytes()
+
+                with self._lock:
+                    if self._tenants.get(tenant_id) is not config:
+                        # Re-registered while loading; load the new location instead
+                        continue
+                    self._resident[tenant_id] = manager
+                    self._sizes[tenant_id] = size
+                    logger.info(f"Loaded tenant {tenant_id} ({size / 1024 ** 2:.1f} MB)")
+
+                    self._enforce_memory_cap(keep=tenant_id)
+                    return manager
+
+    def search_similar_chunks(self, tenant_id: str, query: str, k: int = 20) -> List[Dict]:
+        """
+        Search a tenant's knowledge base
+
+        Args:
+            tenant_id: Registered tenant identifier
+            query: Query text
+            k: Number of results to return
+
+        Returns:
+            List of relevant chunks with their metadata
+        """
+        return self.get_manager(tenant_id).search_similar_chunks(query, k=k)
+
+    def resident_tenants(self) -> List[str]:
+        """Return the currently loaded tenants, least recently used first"""
+        with self._lock:
+            return list(self._resident)
+
+    def resident_memory_bytes(self) -> int:
+        """Return the estimated memory held by the loaded tenants"""
+        with self._lock:
+            return sum(self._sizes.values())
+
+    def unload_tenant(self, tenant_id: str):
+        """
+        Unload a tenant's index and chunks if resident
+
+        Args:
+            tenant_id: Registered tenant identifier
+        """
+        with self._lock:
+            if tenant_id in self._resident:
+                self._evict(tenant_id)
+
+    def _get_resident(self, tenant_id: str) -> Optional[EmbeddingsManager]:
+        """Return a resident tenant's manager, marking it most recently used (None if not loaded)"""
+        with self._lock:
+            if tenant_id not in self._tenants:
+                raise KeyError(f"Unknown tenant: {tenant_id}")
+            manager = self._resident.get(tenant_id)
+            if manager is not None:
+                self._resident.move_to_end(tenant_id)
+            return manager
+
+    def _evict(self, tenant_id: str):
+        """Drop a resident tenant so its index is freed once in-flight searches finish"""
+        self._resident.pop(tenant_id)
+        self._sizes.pop(tenant_id, None)
+        logger.info(f"Evicted tenant {tenant_id}")
+
+    def _enforce_memory_cap(self, keep: Optional[str] = None):
+        """Evict least recently used tenants until the memory cap is respected"""
+        while self.resident_memory_bytes() > self.max_memory_bytes:
+            candidates = [tenant for tenant in self._resident if tenant != keep]
+            if not candidates:
+                logger.warning(f"Tenant {keep} alone exceeds the memory cap of {self.max_memory_bytes} bytes")
+                break
+            self._evict(candidates[0])
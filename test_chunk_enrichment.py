@@ -0,0 +1,76 @@
+"""
+Tests for batched chunk enrichment against the original per-chunk scoring
+"""
+
+from benchmark import _legacy_enrich
+from chunk_enrichment import get_enricher, iter_enriched_chunks
+
+TEXTS = [
+    "",
+    "Too short",
+    "Tuition fees are 1000 euro per term. Payment is due before the deadline. A scholarship may help.",
+    "Admission requirements: 1. School diploma 2. Language certificate 3. Application form.",
+    "The library building on campus has a lab and classroom for every programme.",
+    "Student services offer guidance and support. Specific details are on the website.",
+    "Information about the university: an overview and introduction for new students.",
+    "Course syllabus for the computer science degree. The curriculum covers every major and minor.",
+    "Registration procedure: follow the exact policy and regulation for enrollment in each program.",
+    "Plain text without any keywords at all but long enough to count as a chunk of text. " * 8,
+    "FEE • TUITION • ADMISSION • DEADLINE • REQUIREMENT • PROCEDURE • Precise numbers.",
+    "multiprocessing support-lab building-free text. with periods.",
+]
+
+def enrich(texts, **kwargs):
+    chunks = ({"text": text, "metadata": {"source": "fees.pdf"}} for text in texts)
+    return [(chunk["metadata"]["semantic_category"], chunk["metadata"]["content_quality"],
+             chunk["metadata"]["importance_score"]) for chunk in iter_enriched_chunks(chunks, **kwargs)]
+
+def test_batched_scores_match_the_original_scoring():
+    assert enrich(TEXTS) == _legacy_enrich(TEXTS)
+    assert enrich(TEXTS, batch_size=3) == _legacy_enrich(TEXTS)
+
+def test_parallel_scoring_matches_serial_and_keeps_order():
+    assert enrich(TEXTS * 5, batch_size=4, workers=2) == enrich(TEXTS * 5)
+
+def test_metadata_is_added_to_copies():
+    chunks = [{"text": TEXTS[2], "metadata": {"source": "http://uni.edu/fees"}},
+              {"text": TEXTS[3], "metadata": {"source": "handbook.pdf"}}]
+    enriched = list(iter_enriched_chunks(chunks, start=10))
+    assert [chunk["metadata"]["chunk_id"] for chunk in enriched] == ["chunk_000010", "chunk_000011"]
+    assert [chunk["metadata"]["source_type"] for chunk in enriched] == ["web_content", "pdf_document"]
+    assert enriched[0]["metadata"]["semantic_category"] == "financial_info"
+    assert chunks[0]["metadata"] == {"source": "http://uni.edu/fees"}
+
+def test_parallel_scoring_reads_the_input_lazily():
+    read = []
+
+    def chunks():
+        for i in range(1000):
+            read.append(i)
+            yield {"text": TEXTS[i % len(TEXTS)], "metadata": {}}
+
+    enriched = iter_enriched_chunks(chunks(), workers=2, batch_size=10)
+    first = next(enriched)
+    assert first["metadata"]["chunk_id"] == "chunk_000000"
+    # At most a window of batches (2 per worker) is read ahead of the consumer
+    assert len(read) <= 2 * 2 * 10 + 1
+    enriched.close()
+
+def test_substring_matching_is_kept():
+    # Keywords count inside longer words, as the per-chunk functions did
+    presence = get_enricher().keyword_matrix(["Prefees and subprograms"])[0]
+    vocabulary = get_enricher().vocabulary
+    assert presence[vocabulary.index("fee")] and presence[vocabulary.index("program")]
+
+def test_worker_processes_are_spawned(monkeypatch):
+    import chunk_enrichment
+    contexts = []
+    original = chunk_enrichment.ProcessPoolExecutor
+
+    def recording_executor(*args, **kwargs):
+        contexts.append(kwargs.get("mp_context"))
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(chunk_enrichment, "ProcessPoolExecutor", recording_executor)
+    assert enrich(TEXTS, workers=2, batch_size=4) == enrich(TEXTS)
+    assert [context.get_start_method() for context in contexts] == ["spawn"]
@@ -0,0 +1,66 @@
+"""
+Tests for the per-domain token-bucket scheduler and how the scraper dispatches through it
+"""
+
+import time
+from domain_scheduler import DomainScheduler
+from web_scraper import WebScraper
+
+def test_requests_to_one_domain_are_spaced_by_the_delay():
+    scheduler = DomainScheduler(delay=10.0)
+    assert scheduler.try_acquire("a.edu") == 0.0
+    wait = scheduler.try_acquire("a.edu")
+    assert 9.9 < wait <= 10.0
+
+def test_domains_do_not_wait_for_each_other():
+    scheduler = DomainScheduler(delay=10.0)
+    assert scheduler.try_acquire("a.edu") == 0.0
+    assert scheduler.try_acquire("b.edu") == 0.0
+    assert scheduler.try_acquire("a.edu") > 0
+
+def test_burst_allows_back_to_back_requests_after_idling():
+    scheduler = DomainScheduler(delay=10.0, burst=3)
+    assert [scheduler.try_acquire("a.edu") for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert scheduler.try_acquire("a.edu") > 0
+
+def test_zero_delay_never_waits():
+    scheduler = DomainScheduler(delay=0)
+    assert all(scheduler.try_acquire("a.edu") == 0.0 for _ in range(100))
+
+def test_per_domain_delay_override():
+    scheduler = DomainScheduler(delay=0.01)
+    scheduler.set_delay("slow.edu", 30.0)
+    assert scheduler.get_delay("slow.edu") == 30.0
+    assert scheduler.get_delay("fast.edu") == 0.01
+    scheduler.try_acquire("slow.edu")
+    assert scheduler.try_acquire("slow.edu") > 29
+
+def test_acquire_waits_for_the_refill_and_honours_timeout():
+    scheduler = DomainScheduler(delay=0.05)
+    assert scheduler.acquire("a.edu")
+    started = time.monotonic()
+    assert scheduler.acquire("a.edu", timeout=1.0)
+    assert time.monotonic() - started >= 0.04
+
+    scheduler.set_delay("a.edu", 60.0)
+    assert not scheduler.acquire("a.edu", timeout=0.05)
+
+def test_visited_and_repeated_urls_take_no_rate_limit_slot(monkeypatch):
+    scraper = WebScraper(max_threads=2, delay=0, respect_robots=False)
+    scraper.visited_urls.add("http://a.edu/seen")
+    acquired = []
+    original_try_acquire = scraper.scheduler.try_acquire
+
+    def counting_try_acquire(domain):
+        wait = original_try_acquire(domain)
+        if wait == 0:
+            acquired.append(domain)
+        return wait
+
+    monkeypatch.setattr(scraper.scheduler, "try_acquire", counting_try_acquire)
+    monkeypatch.setattr(scraper, "scrape_url", lambda url, wait_for_slot=True, extract_links=False: {
+        "url": url, "text": url, "status": "success"})
+
+    results = list(scraper.scrape_scheduled(["http://a.edu/seen", "http://a.edu/new", "http://a.edu/new"]))
+    assert [result["url"] for result in results] == ["http://a.edu/new"]
+    assert acquired == ["a.edu"]
@@ -0,0 +1,50 @@
+"""
+Tests for reusing saved embeddings between knowledge-base builds
+"""
+
+import os
+import numpy as np
+from embeddings_manager import EmbeddingsManager
+
+class FakeModel:
+    """Encodes each text as a fixed vector and records what it encoded"""
+
+    def __init__(self, dimension=4, offset=0.0):
+        self.dimension = dimension
+        self.offset = offset
+        self.encoded = []
+
+    def encode(self, texts, normalize_embeddings=True):
+        self.encoded.extend(texts)
+        return np.array([[len(text) + self.offset] + [1.0] * (self.dimension - 1) for text in texts],
+                        dtype=np.float32)
+
+def build(folder, model_name, model, texts):
+    manager = EmbeddingsManager(model_name=model_name, model=model, embeddings_folder=str(folder))
+    manager.build_index([{"text": text, "metadata": {}} for text in texts], manager.encode_texts(texts))
+    manager.save_embeddings()
+    return manager
+
+def test_same_model_reuses_vectors_of_unchanged_texts(tmp_path):
+    build(tmp_path, "model-a", FakeModel(), ["tuition", "housing"])
+    model = FakeModel()
+    manager = EmbeddingsManager(model_name="model-a", model=model, embeddings_folder=str(tmp_path))
+    assert manager.saved_model_name() == "model-a"
+
+    vectors = manager.encode_texts(["housing", "deadlines"], reusable=manager.load_reusable_vectors("university_combined"))
+    assert model.encoded == ["deadlines"]
+    assert manager.reused_embeddings == 1
+    assert vectors[:, 0].tolist() == [len("housing"), len("deadlines")]
+
+def test_other_model_does_not_reuse_vectors(tmp_path):
+    build(tmp_path, "model-a", FakeModel(), ["tuition", "housing"])
+    manager = EmbeddingsManager(model_name="model-b", model=FakeModel(dimension=6), embeddings_folder=str(tmp_path))
+    assert manager.load_reusable_vectors("university_combined") is None
+    assert manager.encode_texts(["housing"], reusable=None).shape == (1, 6)
+
+def test_index_without_a_recorded_model_is_not_reused(tmp_path):
+    build(tmp_path, "model-a", FakeModel(), ["tuition"])
+    os.remove(tmp_path / "university_combined_meta.json")
+    manager = EmbeddingsManager(model_name="model-a", model=FakeModel(), embeddings_folder=str(tmp_path))
+    assert manager.saved_model_name() is None
+    assert manager.load_reusable_vectors("university_combined") is None
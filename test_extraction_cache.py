@@ -0,0 +1,80 @@
+"""
+Tests for the per-file PDF extraction cache
+"""
+
+import os
+from reportlab.pdfgen import canvas
+from extraction_cache import ExtractionCache
+from pdf_loader import iter_pdf_chunks
+
+def write_pdf(path, pages):
+    """Write a PDF with one line of text per page"""
+    pdf = canvas.Canvas(str(path))
+    for text in pages:
+        pdf.drawString(72, 720, text)
+        pdf.showPage()
+    pdf.save()
+
+def test_fingerprint_survives_touch_and_tracks_content(tmp_path):
+    path = tmp_path / "fees.pdf"
+    path.write_bytes(b"first version")
+    cache = ExtractionCache(cache_folder=str(tmp_path / "cache"))
+    cache.put_pages(str(path), "1:pypdf2", ["page one"])
+
+    # Same content with a new mtime is recognised after re-hashing
+    os.utime(path, ns=(1, 1))
+    assert ExtractionCache(cache_folder=str(tmp_path / "cache")).get_pages(str(path), "1:pypdf2") == ["page one"]
+
+    path.write_bytes(b"second version")
+    assert ExtractionCache(cache_folder=str(tmp_path / "cache")).get_pages(str(path), "1:pypdf2") is None
+
+def test_entries_are_keyed_by_configuration(tmp_path):
+    path = tmp_path / "fees.pdf"
+    path.write_bytes(b"content")
+    cache = ExtractionCache(cache_folder=str(tmp_path / "cache"))
+    cache.put_chunks(str(path), "600:250:chars", [{"text": "a", "metadata": {}}])
+
+    assert cache.has_chunks(str(path), "600:250:chars")
+    assert not cache.has_chunks(str(path), "500:200:chars")
+    assert cache.get_chunks(str(path), "600:250:chars") == [{"text": "a", "metadata": {}}]
+    assert cache.stats()["chunk_hits"] == 1
+
+def test_corrupt_entry_is_a_miss(tmp_path):
+    path = tmp_path / "fees.pdf"
+    path.write_bytes(b"content")
+    cache = ExtractionCache(cache_folder=str(tmp_path / "cache"))
+    cache.put_pages(str(path), "1:pypdf2", ["page"])
+    with open(cache._entry_path(str(path), "pages", "1:pypdf2"), "wb") as f:
+        f.write(b"\x80\x04truncated")
+    assert cache.get_pages(str(path), "1:pypdf2") is None
+
+def test_unchanged_files_are_not_parsed_again(tmp_path):
+    pdf_dir = tmp_path / "pdfs"
+    pdf_dir.mkdir()
+    write_pdf(pdf_dir / "a.pdf", ["Admission requirements include a school diploma and a language certificate."])
+    write_pdf(pdf_dir / "b.pdf", ["Tuition is 1000 euro per term for every bachelor and master programme."])
+
+    first_cache = ExtractionCache(cache_folder=str(tmp_path / "cache"))
+    first = list(iter_pdf_chunks(str(pdf_dir), cache=first_cache))
+    assert len(first) == 2
+    assert first_cache.stats() == {"page_hits": 0, "chunk_hits": 0, "misses": 2}
+
+    second_cache = ExtractionCache(cache_folder=str(tmp_path / "cache"))
+    assert list(iter_pdf_chunks(str(pdf_dir), cache=second_cache)) == first
+    assert second_cache.stats() == {"page_hits": 0, "chunk_hits": 2, "misses": 0}
+
+def test_vanished_chunk_entry_falls_back_to_extraction(tmp_path, monkeypatch):
+    pdf_dir = tmp_path / "pdfs"
+    pdf_dir.mkdir()
+    write_pdf(pdf_dir / "a.pdf", ["Admission requirements include a school diploma and a language certificate."])
+    write_pdf(pdf_dir / "b.pdf", ["Tuition is 1000 euro per term for every bachelor and master programme."])
+    first = list(iter_pdf_chunks(str(pdf_dir), cache=ExtractionCache(cache_folder=str(tmp_path / "cache"))))
+    assert [chunk["metadata"]["source"] for chunk in first] == ["a.pdf", "b.pdf"]
+
+    # has_chunks still reports the entries, but one cannot be read any more
+    cache = ExtractionCache(cache_folder=str(tmp_path / "cache"))
+    original_get_chunks = cache.get_chunks
+    monkeypatch.setattr(cache, "get_chunks", lambda file_path, chunk_key: (
+        None if file_path.endswith("a.pdf") else original_get_chunks(file_path, chunk_key)))
+
+    assert list(iter_pdf_chunks(str(pdf_dir), cache=cache)) == first
@@ -0,0 +1,192 @@
+"""
+Tests for the chat API client: streamed responses and retries
+"""
+
+import json
+import datetime
+from email.utils import format_datetime
+import pytest
+import requests
+import gemini_api
+from gemini_api import MAX_BACKOFF, GeminiAPI, StreamedResponse, _iter_sse_deltas, _retry_after
+from response_cache import ResponseCache
+
+QUESTION = "How much is tuition per term?"
+CONTEXT = [{"text": "Tuition is 1000 euro per term.", "metadata": {"relevance_score": 0.9}}]
+
+class FakeRaw:
+    """Hands a response body over in fixed byte chunks, as a chunked stream does"""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    def stream(self, chunk_size, decode_content=True):
+        yield from self.chunks
+
+    def close(self):
+        pass
+
+def streamed(chunks, status_code=200):
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers["Content-Type"] = "text/event-stream"
+    response.raw = FakeRaw(chunks)
+    return response
+
+def event(content):
+    return f"data: {json.dumps({'choices': [{'delta': {'content': content}}]}, ensure_ascii=False)}\n\n".encode()
+
+DONE = b"data: [DONE]\n\n"
+
+class FakeSession:
+    """Answers each post with the next response, raising it if it is an exception"""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def post(self, url, json=None, timeout=None, stream=False):
+        self.requests.append({"json": json, "stream": stream})
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setenv("GROQ_API_KEY", "test-key")
+    monkeypatch.setattr(gemini_api.random, "choice", lambda options: options[0])
+    return GeminiAPI(max_retries=0, response_cache=ResponseCache())
+
+def test_sse_deltas_skip_keep_alives_and_stop_at_done():
+    role_only = b'data: {"choices": [{"delta": {"role": "assistant"}}]}\n\n'
+    response = streamed([b": keep-alive\n\n", role_only, event("Tuition is "), b"\n",
+                         event("1000 euro."), DONE, event("after the end")])
+    assert list(_iter_sse_deltas(response)) == ["Tuition is ", "1000 euro."]
+
+def test_sse_multibyte_characters_split_across_chunks():
+    body = event("Gebühr: 1000 €") + DONE
+    umlaut = body.index("ü".encode()) + 1
+    euro = body.index("€".encode()) + 2
+    response = streamed([body[:umlaut], body[umlaut:euro], body[euro:]])
+    assert list(_iter_sse_deltas(response)) == ["Gebühr: 1000 €"]
+
+def test_sse_error_event_raises():
+    deltas = _iter_sse_deltas(streamed([event("Tuition is "), b'data: {"error": {"message": "overloaded"}}\n\n']))
+    assert next(deltas) == "Tuition is "
+    with pytest.raises(RuntimeError, match="overloaded"):
+        next(deltas)
+
+def test_streamed_response_finishes_after_the_last_delta():
+    response = StreamedResponse(iter(["a", "b"]), str.upper)
+    assert response.text is None
+    assert list(response) == ["a", "b"]
+    assert response.streamed_text == "ab" and response.text == "AB"
+
+def test_complete_answer_is_cached(client):
+    client.session = FakeSession(streamed([event("Tuition is "), event("1000 euro."), DONE]))
+    response = client.generate_response_stream(QUESTION, CONTEXT)
+    assert list(response) == ["Tuition is ", "1000 euro."]
+    assert response.text == response.streamed_text == "Tuition is 1000 euro."
+    assert client.session.requests[0]["stream"] and client.session.requests[0]["json"]["stream"]
+
+    again = client.generate_response_stream(QUESTION, CONTEXT)
+    assert list(again) == ["Tuition is 1000 euro."] and again.text == "Tuition is 1000 euro."
+    assert len(client.session.requests) == 1
+
+def response_context(client):
+    """The context the client asks the model with"""
+    return client._enhance_context_with_general_knowledge(QUESTION, CONTEXT)
+
+def test_model_output_is_post_processed(client):
+    client.session = FakeSession(streamed([event("I don't have enough information."), DONE]))
+    response = client.generate_response_stream(QUESTION, CONTEXT)
+    list(response)
+    assert response.streamed_text == "I don't have enough information."
+    assert response.text.startswith(client.university_domains["financial"]["general_responses"][0])
+    assert client.response_cache.get(client._cache_key(QUESTION, response_context(client))) == response.text
+
+def test_errors_fallbacks_and_cut_off_answers_are_shown_but_not_cached(client):
+    fallback = client._generate_dynamic_response(QUESTION, response_context(client))
+    cases = [
+        (streamed([b'{"error": "bad request"}'], status_code=400), ['Error: HTTP 400 - {"error": "bad request"}']),
+        (requests.ConnectionError("down"), [fallback]),
+        (streamed([event("Tuition is "), b'data: {"error": {"message": "overloaded"}}\n\n']), ["Tuition is "]),
+    ]
+    for answer, expected in cases:
+        client.session = FakeSession(answer)
+        response = client.generate_response_stream(QUESTION, CONTEXT)
+        assert list(response) == expected
+        assert response.text == response.streamed_text
+    assert client.response_cache.stats()["entries"] == 0
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = requests.structures.CaseInsensitiveDict(headers or {})
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+@pytest.fixture
+def slept(monkeypatch):
+    slept = []
+    monkeypatch.setattr(gemini_api.time, "sleep", slept.append)
+    # The longest delay the jitter allows
+    monkeypatch.setattr(gemini_api.random, "uniform", lambda low, high: high)
+    return slept
+
+def retrying_client(monkeypatch, *responses, max_retries=3, backoff_factor=0.5):
+    monkeypatch.setenv("GROQ_API_KEY", "test-key")
+    client = GeminiAPI(max_retries=max_retries, backoff_factor=backoff_factor, response_cache=ResponseCache())
+    client.session = FakeSession(*responses)
+    return client
+
+def test_rate_limits_and_server_errors_are_retried(monkeypatch, slept):
+    failed = [FakeResponse(429), FakeResponse(503)]
+    client = retrying_client(monkeypatch, *failed, FakeResponse(200))
+    assert client._post(client._chat_payload("prompt")).status_code == 200
+    assert slept == [0.5, 1.0]
+    assert all(response.closed for response in failed)
+
+def test_last_response_is_returned_when_retries_run_out(monkeypatch, slept):
+    client = retrying_client(monkeypatch, *[FakeResponse(500) for _ in range(3)], max_retries=2)
+    response = client._post(client._chat_payload("prompt"))
+    assert response.status_code == 500 and not response.closed
+    assert len(client.session.requests) == 3 and len(slept) == 2
+
+    # Other errors are not retried
+    client = retrying_client(monkeypatch, FakeResponse(400), FakeResponse(200))
+    assert client._post(client._chat_payload("prompt")).status_code == 400
+
+def test_connection_errors_are_retried_then_raised(monkeypatch, slept):
+    client = retrying_client(monkeypatch, requests.ConnectionError("reset"), FakeResponse(200))
+    assert client._post(client._chat_payload("prompt")).status_code == 200
+    assert slept == [0.5]
+
+    client = retrying_client(monkeypatch, *[requests.Timeout("slow") for _ in range(3)], max_retries=2)
+    with pytest.raises(requests.Timeout):
+        client._post(client._chat_payload("prompt"))
+    assert len(client.session.requests) == 3
+
+def test_delays_follow_retry_after_and_are_capped(monkeypatch, slept):
+    client = retrying_client(monkeypatch, FakeResponse(429, {"Retry-After": "3"}),
+                             FakeResponse(429, {"Retry-After": "120"}), FakeResponse(503), FakeResponse(200),
+                             backoff_factor=100)
+    assert client._post(client._chat_payload("prompt")).status_code == 200
+    assert slept == [3.0, MAX_BACKOFF, MAX_BACKOFF]
+
+def test_retry_after_seconds_or_http_date(monkeypatch):
+    now = 1_700_000_000.0
+    monkeypatch.setattr(gemini_api.time, "time", lambda: now)
+
+    def http_date(seconds):
+        return format_datetime(datetime.datetime.fromtimestamp(now + seconds, datetime.timezone.utc), usegmt=True)
+
+    assert _retry_after("2.5") == 2.5
+    assert _retry_after("-1") == 0.0
+    assert _retry_after(http_date(30)) == pytest.approx(30.0)
+    assert _retry_after(http_date(-30)) == 0.0
+    for value in (None, "", "soon"):
+        assert _retry_after(value) is None
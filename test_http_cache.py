@@ -0,0 +1,101 @@
+"""
+Tests for conditional re-crawls through the HTTP cache
+"""
+
+import datetime
+from http_cache import HTTPCache
+from web_scraper import WebScraper
+
+PAGE = "<html><body><main><p>Tuition is 1000 euro per term.</p></main></body></html>"
+
+class FakeResponse:
+    def __init__(self, status_code, body=b"", headers=None, url="http://uni.edu/fees"):
+        self.status_code = status_code
+        self.body = body
+        self.headers = headers or {}
+        self.url = url
+        self.encoding = "utf-8"
+        self.elapsed = datetime.timedelta(milliseconds=5)
+
+    def iter_content(self, chunk_size=1):
+        yield self.body
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+class FakeServer:
+    """Answers 304 to a matching If-None-Match, else the page with its ETag"""
+
+    def __init__(self, body=PAGE.encode("utf-8"), etag='"v1"'):
+        self.body = body
+        self.etag = etag
+        self.requests = []
+
+    def get(self, url, headers=None, **kwargs):
+        self.requests.append(dict(headers or {}))
+        if (headers or {}).get("If-None-Match") == self.etag:
+            return FakeResponse(304)
+        return FakeResponse(200, self.body, {"Content-Type": "text/html", "ETag": self.etag}, url)
+
+def scraper_for(server, cache, extraction_version=None):
+    scraper = WebScraper(delay=0, http_cache=cache, respect_robots=False)
+    scraper.get_session = lambda: server
+    if extraction_version:
+        scraper.extraction_version = extraction_version
+    return scraper
+
+def test_conditional_headers(tmp_path):
+    cache = HTTPCache(cache_folder=str(tmp_path))
+    entry = {"etag": '"v1"', "last_modified": "Wed, 01 Jan 2025 00:00:00 GMT", "extraction_version": "2"}
+    assert cache.conditional_headers(None, "2") == {}
+    assert cache.conditional_headers(entry, "2") == {
+        "If-None-Match": '"v1"', "If-Modified-Since": "Wed, 01 Jan 2025 00:00:00 GMT"}
+    assert cache.conditional_headers({**entry, "etag": None}, "2") == {
+        "If-Modified-Since": "Wed, 01 Jan 2025 00:00:00 GMT"}
+    # Text from another extractor version is not revalidated
+    assert cache.conditional_headers(entry, "3") == {}
+
+def test_not_modified_page_is_served_from_the_cache(tmp_path):
+    cache = HTTPCache(cache_folder=str(tmp_path))
+    server = FakeServer()
+    first = scraper_for(server, cache).scrape_url("http://uni.edu/fees")
+    assert first["changed"] and "1000 euro" in first["text"]
+
+    second = scraper_for(server, cache).scrape_url("http://uni.edu/fees", extract_links=True)
+    assert server.requests[-1]["If-None-Match"] == '"v1"'
+    assert second["text"] == first["text"] and not second["changed"]
+    assert second["links"] == []
+    assert cache.stats() == {"not_modified": 1, "unchanged": 0, "changed": 1}
+
+def test_new_validators_with_the_same_text_keep_the_chunks(tmp_path):
+    cache = HTTPCache(cache_folder=str(tmp_path))
+    scraper_for(FakeServer(etag='"v1"'), cache).scrape_url("http://uni.edu/fees")
+    cache.put_chunks("http://uni.edu/fees", "key", [{"text": "chunk", "metadata": {}}])
+
+    result = scraper_for(FakeServer(etag='"v2"'), cache).scrape_url("http://uni.edu/fees")
+    assert not result["changed"]
+    assert cache.get_chunks("http://uni.edu/fees", "key") == [{"text": "chunk", "metadata": {}}]
+
+    changed = scraper_for(FakeServer(body=PAGE.replace("1000", "1200").encode(), etag='"v3"'), cache)
+    assert changed.scrape_url("http://uni.edu/fees")["changed"]
+    assert cache.get_chunks("http://uni.edu/fees", "key") is None
+    assert cache.stats() == {"not_modified": 0, "unchanged": 1, "changed": 2}
+
+def test_new_extractor_version_downloads_and_extracts_again(tmp_path):
+    cache = HTTPCache(cache_folder=str(tmp_path))
+    server = FakeServer()
+    scraper_for(server, cache, extraction_version="old").scrape_url("http://uni.edu/fees")
+    cache.put_chunks("http://uni.edu/fees", "key", [{"text": "stale", "metadata": {}}])
+    entry = cache.get("http://uni.edu/fees")
+    entry["text"] = "Text from the old extractor"
+    cache._store("http://uni.edu/fees", entry)
+
+    result = scraper_for(server, cache, extraction_version="new").scrape_url("http://uni.edu/fees")
+    assert "If-None-Match" not in server.requests[-1]
+    assert "1000 euro" in result["text"] and result["changed"]
+    assert cache.get("http://uni.edu/fees")["extraction_version"] == "new"
+    assert cache.get_chunks("http://uni.edu/fees", "key") is None
+    assert cache.not_modified == 0
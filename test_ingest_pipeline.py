@@ -0,0 +1,167 @@
+"""
+Tests for the fingerprinted ingestion pipeline: skipping, forcing and streaming stages
+"""
+
+import random
+import time
+import pytest
+from ingest_pipeline import Pipeline, Stage, _iter_records, artifact_digest
+from web_scraper import WebScraper
+
+def build(folder, calls, source=lambda: [1, 2, 3], config=None, always_run=False, stream=False, outputs=()):
+    """Pipeline of source -> double -> total that records which stages ran"""
+    def run_source():
+        calls.append("source")
+        return source()
+
+    def double(items):
+        calls.append("double")
+        return [item * 2 for item in items]
+
+    def total(items):
+        calls.append("total")
+        return sum(items)
+
+    pipeline = Pipeline(artifacts_folder=str(folder))
+    pipeline.add(Stage("source", run_source, config=config, always_run=always_run, stream=stream, outputs=outputs))
+    pipeline.add(Stage("double", double, deps=["source"], stream=stream))
+    pipeline.add(Stage("total", total, deps=["double"]))
+    return pipeline
+
+def test_second_run_reuses_every_artifact(tmp_path):
+    calls = []
+    assert build(tmp_path, calls).run()["total"]() == 12
+    assert calls == ["source", "double", "total"]
+
+    calls.clear()
+    assert build(tmp_path, calls).run()["total"]() == 12
+    assert calls == []
+
+def test_force_reruns_a_stage_and_only_changed_downstream(tmp_path):
+    calls = []
+    build(tmp_path, calls).run()
+    calls.clear()
+    build(tmp_path, calls).run(force=["source"])
+    # The forced stage produced the same artifact, so nothing downstream reruns
+    assert calls == ["source"]
+
+def test_config_change_reruns_the_stage_and_its_dependents(tmp_path):
+    calls = []
+    build(tmp_path, calls, config={"chunk_size": 600}).run()
+    calls.clear()
+    result = build(tmp_path, calls, source=lambda: [5], config={"chunk_size": 800}).run()
+    assert calls == ["source", "double", "total"]
+    assert result["total"]() == 10
+
+def test_always_run_stage_with_identical_output_skips_downstream(tmp_path):
+    calls = []
+    build(tmp_path, calls, always_run=True).run()
+    calls.clear()
+    build(tmp_path, calls, always_run=True).run()
+    assert calls == ["source"]
+
+    calls.clear()
+    assert build(tmp_path, calls, source=lambda: [1], always_run=True).run()["total"]() == 2
+    assert calls == ["source", "double", "total"]
+
+def test_missing_output_file_reruns_the_stage(tmp_path):
+    output = tmp_path / "index.faiss"
+    calls = []
+    build(tmp_path / "pipeline", calls, outputs=[str(output)]).run()
+    output.write_bytes(b"index")
+    calls.clear()
+    build(tmp_path / "pipeline", calls, outputs=[str(output)]).run()
+    assert calls == []
+
+    output.unlink()
+    build(tmp_path / "pipeline", calls, outputs=[str(output)]).run()
+    assert calls == ["source"]
+
+def test_streaming_stages_match_list_stages(tmp_path):
+    items = list(range(5))
+    calls = []
+    pipeline = build(tmp_path, calls, source=lambda: iter(items), stream=True)
+    artifacts = pipeline.run()
+
+    # Each call gives a fresh pass over the records written to disk
+    assert list(artifacts["source"]()) == items
+    assert list(artifacts["source"]()) == items
+    assert list(_iter_records(str(tmp_path / "source.pkl"))) == items
+    assert pipeline._manifest["source"]["digest"] == artifact_digest(items)
+    assert list(pipeline.load_previous("double")) == [item * 2 for item in items]
+
+    calls.clear()
+    build(tmp_path, calls, source=lambda: iter(items), stream=True).run()
+    assert calls == []
+
+def test_switching_to_streaming_rewrites_the_artifact(tmp_path):
+    calls = []
+    build(tmp_path, calls, always_run=True).run()
+    calls.clear()
+    # Same items and digest, but the saved list cannot be read as a record stream
+    result = build(tmp_path, calls, source=lambda: iter([1, 2, 3]), always_run=True, stream=True).run()
+    # total's input digest is unchanged, so its saved list artifact is still valid
+    assert calls == ["source", "double"]
+    assert result["total"]() == 12
+
+def test_unordered_stage_keeps_its_saved_order_when_items_are_unchanged(tmp_path):
+    def run(items):
+        calls = []
+
+        def source():
+            calls.append("source")
+            return iter(items)
+
+        def total(records):
+            calls.append("total")
+            return list(records)
+
+        pipeline = Pipeline(artifacts_folder=str(tmp_path))
+        pipeline.add(Stage("source", source, always_run=True, stream=True, ordered=False))
+        pipeline.add(Stage("total", total, deps=["source"]))
+        artifacts = pipeline.run()
+        return calls, list(artifacts["source"]()), artifacts["total"]()
+
+    assert run([1, 2, 3]) == (["source", "total"], [1, 2, 3], [1, 2, 3])
+    # Same items in another order: the saved records and downstream artifacts stay consistent
+    assert run([3, 1, 2]) == (["source"], [1, 2, 3], [1, 2, 3])
+    assert run([3, 1]) == (["source", "total"], [3, 1], [3, 1])
+
+def test_only_streaming_stages_can_be_unordered():
+    with pytest.raises(ValueError):
+        Stage("source", list, ordered=False)
+
+def test_rescraping_the_same_site_skips_downstream_stages(tmp_path, monkeypatch):
+    """Pages finishing in a different order must not rerun the stages after the web stage"""
+    links = tmp_path / "Links.txt"
+    urls = [f"http://site{i % 3}.edu/page{i}" for i in range(9)]
+    links.write_text("\n".join(urls))
+
+    def run(seed):
+        rng = random.Random(seed)
+        delays = {url: rng.uniform(0, 0.02) for url in urls}
+
+        def scrape_url(url, wait_for_slot=True, extract_links=False):
+            time.sleep(delays[url])
+            return {"url": url, "text": f"Admissions information for {url}. " * 5, "status": "success"}
+
+        def web_chunks():
+            scraper = WebScraper(max_threads=4, delay=0, respect_robots=False)
+            monkeypatch.setattr(scraper, "scrape_url", scrape_url)
+            yield from scraper.iter_chunks(scraper.iter_scrape_urls(str(links)), chunk_size=120, chunk_overlap=0)
+
+        def embed(chunks):
+            calls.append("embed")
+            return [len(chunk["text"]) for chunk in chunks]
+
+        pipeline = Pipeline(artifacts_folder=str(tmp_path / "pipeline"))
+        pipeline.add(Stage("web_chunks", web_chunks, always_run=True, stream=True, ordered=False))
+        pipeline.add(Stage("embed", embed, deps=["web_chunks"]))
+        pipeline.run()
+
+    calls = []
+    run(seed=1)
+    assert calls == ["embed"]
+    calls.clear()
+    run(seed=2)
+    assert calls == []
@@ -0,0 +1,153 @@
+"""
+Tests for PDF extraction: process-pool mode, ordering, per-file failures and page lookups
+"""
+
+import pytest
+from reportlab.pdfgen import canvas
+import pdf_loader
+from extraction_cache import ExtractionCache
+from pdf_loader import (MAX_TABLE_GROUP_LINES, ExtractionPool, PageExtractor, _PageLocator, _alnum_key,
+                        iter_document_chunks, iter_pdf_chunks, iter_pdf_documents, preserve_important_sections,
+                        process_pdf_directory)
+
+def write_pdf(path, pages):
+    """Write a PDF with one line of text per page"""
+    pdf = canvas.Canvas(str(path))
+    for text in pages:
+        pdf.drawString(72, 720, text)
+        pdf.showPage()
+    pdf.save()
+
+@pytest.fixture
+def pdf_dir(tmp_path):
+    write_pdf(tmp_path / "b_fees.pdf", [f"Fee schedule page {i}. Tuition is {i}00 euro." for i in range(1, 6)])
+    write_pdf(tmp_path / "a_handbook.pdf", [f"Handbook page {i}. Admission requirements." for i in range(1, 4)])
+    (tmp_path / "sub").mkdir()
+    write_pdf(tmp_path / "sub" / "c_courses.pdf", ["Course catalogue. Computer science degree."])
+    return tmp_path
+
+def test_parallel_extraction_matches_serial_order(pdf_dir):
+    serial = list(iter_pdf_documents(str(pdf_dir), workers=1))
+    # Page ranges of one page force the large files to be split across workers
+    parallel = list(iter_pdf_documents(str(pdf_dir), workers=3, pages_per_task=1, file_timeout=60))
+
+    assert [path for path, _ in serial] == sorted(path for path, _ in serial)
+    assert parallel == serial
+    pages = dict(serial)[str(pdf_dir / "b_fees.pdf")]
+    assert len(pages) == 5 and "page 1" in pages[0] and "page 5" in pages[4]
+
+def test_broken_file_is_skipped_without_stopping_the_build(pdf_dir):
+    (pdf_dir / "broken.pdf").write_bytes(b"%PDF-1.4 not really a pdf")
+    for workers in (1, 2):
+        paths = [path for path, _ in iter_pdf_documents(str(pdf_dir), workers=workers, file_timeout=60)]
+        assert str(pdf_dir / "broken.pdf") not in paths
+        assert len(paths) == 3
+
+def test_chunks_are_identical_in_both_modes(pdf_dir):
+    serial = process_pdf_directory(str(pdf_dir), chunk_size=200, chunk_overlap=20)
+    parallel = process_pdf_directory(str(pdf_dir), chunk_size=200, chunk_overlap=20, workers=2, file_timeout=60)
+    assert serial and parallel == serial
+
+class CountingPool(ExtractionPool):
+    """Counts how often the worker processes are started"""
+
+    starts = 0
+
+    def get(self):
+        if self._pool is None:
+            self.starts += 1
+        return super().get()
+
+def test_one_pool_serves_every_directory_and_retry(pdf_dir, tmp_path_factory, monkeypatch):
+    cache = ExtractionCache(cache_folder=str(tmp_path_factory.mktemp("cache")))
+    expected = list(iter_pdf_chunks(str(pdf_dir / "sub"), cache=cache))
+
+    with CountingPool(2) as pool:
+        # Everything is cached, so no worker is started
+        assert list(iter_pdf_chunks(str(pdf_dir / "sub"), cache=cache, pool=pool)) == expected
+        assert pool.starts == 0
+
+        # A vanished cache entry and a new directory reuse the same workers
+        monkeypatch.setattr(cache, "get_chunks", lambda file_path, chunk_key: None)
+        monkeypatch.setattr(cache, "get_pages", lambda file_path, pages_key: None)
+        assert list(iter_pdf_chunks(str(pdf_dir / "sub"), cache=cache, pool=pool, file_timeout=60)) == expected
+        assert len(list(iter_pdf_chunks(str(pdf_dir), cache=cache, pool=pool, file_timeout=60))) > len(expected)
+        assert pool.starts == 1
+    assert pool._pool is None
+
+PAGES = [
+    "Admission requires a school diploma. Applicants also submit a language certificate.",
+    "Tuition is 1000 euro per term. Fees are paid before the term starts.",
+    "Housing is offered in three student residences near the campus.",
+]
+
+def test_locator_finds_chunks_within_and_across_pages():
+    locator = _PageLocator(PAGES, 0, 2)
+    assert locator.locate("Applicants also submit a language certificate. Tuition is 1000 euro") == (0, 1)
+    assert locator.locate("Housing is offered in three student residences") == (2, 2)
+    # Spacing and punctuation are ignored; an unknown chunk gets the whole range
+    assert locator.locate("tuition   IS 1000-euro per term") == (1, 1)
+    assert locator.locate("Library opening hours are not on any page") == (0, 2)
+    assert _PageLocator(PAGES, 1, 1).locate("anything") == (1, 1)
+
+def test_chunks_record_every_page_they_span():
+    chunks = list(iter_document_chunks("guide.pdf", PAGES, chunk_size=120, chunk_overlap=0, first_page=5))
+    spans = [(chunk["metadata"]["page_start"], chunk["metadata"]["page_end"]) for chunk in chunks]
+    assert spans == [(5, 5), (6, 7)]
+    for chunk, (start, end) in zip(chunks, spans):
+        assert _alnum_key(chunk["text"]) in _alnum_key(" ".join(PAGES[start - 5:end - 4]))
+
+def test_get_pages_checks_the_range(tmp_path):
+    write_pdf(tmp_path / "fees.pdf", [f"Fee schedule page {i}." for i in range(1, 4)])
+    with PageExtractor() as extractor:
+        path = str(tmp_path / "fees.pdf")
+        pages = extractor.get_pages(path, 2, 3)
+        assert len(pages) == 2 and "page 2" in pages[0] and "page 3" in pages[1]
+        assert "page 1" in extractor.get_page(path, 1)
+        for start, end in ((0, 1), (3, 4), (3, 2)):
+            with pytest.raises(IndexError):
+                extractor.get_pages(path, start, end)
+
+class FakeDocument:
+    page_count = 1
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.closed = False
+
+    def extract_page(self, page_index):
+        return f"Text of {self.file_path}"
+
+    def close(self):
+        self.closed = True
+
+class FakeBackend:
+    def __init__(self):
+        self.opened = []
+
+    def open(self, file_path):
+        self.opened.append(FakeDocument(file_path))
+        return self.opened[-1]
+
+def test_least_recently_used_reader_is_closed(monkeypatch):
+    backend = FakeBackend()
+    monkeypatch.setattr(pdf_loader, "get_backend", lambda name: backend)
+    extractor = PageExtractor(max_open=2)
+    for path in ("a.pdf", "b.pdf", "a.pdf", "c.pdf"):
+        extractor.get_page(path, 1)
+    a, b, c = backend.opened
+    assert [a.closed, b.closed, c.closed] == [False, True, False]
+
+    extractor.get_page("b.pdf", 1)  # Opened again, evicting a
+    assert a.closed and len(backend.opened) == 4
+    extractor.close()
+    assert all(document.closed for document in backend.opened)
+
+def test_every_table_line_is_kept_once_in_order():
+    table = [f"Semester {i} fee 1{i}00.50" for i in range(1, MAX_TABLE_GROUP_LINES + 3)]
+    lines = ["Fee schedule for bachelor programmes"] + table + ["fees are due before enrolment", "Housing 300"]
+    groups = preserve_important_sections("\n".join(lines)).split("\n")
+    assert [line for group in groups for line in group.split(" |TABLE| ")] == lines
+    # A long table is grouped in runs of at most MAX_TABLE_GROUP_LINES lines
+    assert groups[1] == " |TABLE| ".join(table[:MAX_TABLE_GROUP_LINES])
+    assert groups[2] == " |TABLE| ".join(table[MAX_TABLE_GROUP_LINES:])
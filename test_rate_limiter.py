@@ -0,0 +1,104 @@
+"""
+Tests for the header-driven client-side rate limiter
+"""
+
+import pytest
+import rate_limiter
+from rate_limiter import HeaderRateLimiter, _HeaderBucket, parse_duration
+
+class FakeClock:
+    """Stands in for time.monotonic and time.sleep"""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter.time, "monotonic", clock.monotonic)
+    monkeypatch.setattr(rate_limiter.time, "sleep", clock.sleep)
+    return clock
+
+def headers(requests=(60, 60, "1s"), tokens=(1000, 1000, "1s")):
+    result = {}
+    for name, (limit, remaining, reset) in (("requests", requests), ("tokens", tokens)):
+        result[f"x-ratelimit-limit-{name}"] = str(limit)
+        result[f"x-ratelimit-remaining-{name}"] = str(remaining)
+        result[f"x-ratelimit-reset-{name}"] = reset
+    return result
+
+@pytest.mark.parametrize("value, seconds", [
+    ("7.66s", 7.66),
+    ("2m59.56s", 179.56),
+    ("120ms", 0.12),
+    ("1h2m3s", 3723.0),
+    ("1m500ms", 60.5),
+    ("12", 12.0),
+    (" 0.5 ", 0.5),
+])
+def test_parse_duration(value, seconds):
+    assert parse_duration(value) == pytest.approx(seconds)
+
+@pytest.mark.parametrize("value", [None, "", "soon", "5x", "2m 3s", "s", "3s later"])
+def test_parse_duration_rejects_unreadable_values(value):
+    assert parse_duration(value) is None
+
+def test_bucket_refills_to_the_limit_by_the_reset_time():
+    bucket = _HeaderBucket()
+    bucket.update(limit=100, remaining=40, reset_seconds=6.0, now=0.0)
+    assert bucket.rate == pytest.approx(10.0)
+    bucket.refill(3.0)
+    assert bucket.tokens == pytest.approx(70.0)
+    bucket.refill(60.0)
+    assert bucket.tokens == 100
+
+def test_bucket_wait_time():
+    bucket = _HeaderBucket()
+    assert bucket.wait_time(50) == 0.0  # Nothing known yet
+    bucket.update(limit=100, remaining=0, reset_seconds=10.0, now=0.0)
+    assert bucket.wait_time(20) == pytest.approx(2.0)
+    # A request larger than the whole limit only waits for a full bucket
+    assert bucket.wait_time(500) == pytest.approx(10.0)
+    bucket.update(limit=100, remaining=100, reset_seconds=None, now=0.0)
+    assert bucket.wait_time(100) == 0.0
+
+def test_unknown_quota_never_waits(clock):
+    limiter = HeaderRateLimiter()
+    assert limiter.acquire(tokens=10_000) == 0.0
+    assert limiter.snapshot() == {"requests": None, "tokens": None}
+
+def test_acquire_takes_from_both_buckets(clock):
+    limiter = HeaderRateLimiter()
+    limiter.update(headers(requests=(60, 10, "1s"), tokens=(1000, 800, "1s")))
+    assert limiter.acquire(tokens=300) == 0.0
+    assert limiter.snapshot() == {"requests": 9, "tokens": 500}
+
+def test_acquire_waits_for_the_scarcer_quota(clock):
+    limiter = HeaderRateLimiter()
+    # Requests are plentiful; tokens refill at 1000 per 10s
+    limiter.update(headers(requests=(60, 60, "1s"), tokens=(1000, 0, "10s")))
+    waited = limiter.acquire(tokens=250)
+    assert waited == pytest.approx(2.5)
+    assert clock.slept == [pytest.approx(2.5)]
+    assert limiter.waited == pytest.approx(2.5)
+
+def test_acquire_gives_up_after_max_wait(clock):
+    limiter = HeaderRateLimiter(max_wait=1.0)
+    limiter.update(headers(tokens=(1000, 0, "1m")))
+    assert limiter.acquire(tokens=500) == 0.0
+    assert clock.slept == []
+    assert limiter.snapshot()["tokens"] == -500
+
+def test_partial_or_unreadable_headers_are_ignored(clock):
+    limiter = HeaderRateLimiter()
+    limiter.update({"x-ratelimit-limit-requests": "60", "x-ratelimit-remaining-requests": "many",
+                    "x-ratelimit-limit-tokens": "1000", "x-ratelimit-remaining-tokens": "900"})
+    assert limiter.snapshot() == {"requests": None, "tokens": 900}
@@ -0,0 +1,169 @@
+"""
+Tests for the answer caches
+"""
+
+import json
+import numpy as np
+import pytest
+import response_cache
+from response_cache import ResponseCache, SemanticResponseCache, _jaccard, chunk_ids, normalize_question
+
+CONTEXT = [{"text": "Tuition is 1000 euro per term.", "metadata": {"chunk_id": "chunk_000001"}},
+           {"text": "The deadline is 15 July.", "metadata": {"chunk_id": "chunk_000002"}}]
+PARAMS = {"model": "llama3-8b-8192", "temperature": 0.2}
+
+class FakeClock:
+    """Stands in for time.time"""
+
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(response_cache.time, "time", clock.time)
+    return clock
+
+def test_normalize_question():
+    assert normalize_question("  What are the FEES?? ") == "what are the fees"
+    assert normalize_question("What are the fees") == normalize_question("what are\tthe fees!")
+
+def test_chunk_ids_hash_the_text_not_the_position():
+    renumbered = [{"text": chunk["text"], "metadata": {"chunk_id": "chunk_000099"}} for chunk in CONTEXT]
+    assert chunk_ids(renumbered) == chunk_ids(CONTEXT)
+    assert chunk_ids(CONTEXT[::-1]) == chunk_ids(CONTEXT)[::-1]
+
+def test_key_normalizes_the_question_and_covers_everything_else():
+    cache = ResponseCache()
+    key = cache.make_key("What are the fees?", CONTEXT, PARAMS)
+    assert cache.make_key("what are the   FEES", CONTEXT, PARAMS) == key
+    assert cache.make_key("What are the fees?", CONTEXT, dict(reversed(list(PARAMS.items())))) == key
+    assert cache.make_key("What are the fees?", CONTEXT, PARAMS, query_history=[]) == key
+
+    assert cache.make_key("What are the deadlines?", CONTEXT, PARAMS) != key
+    assert cache.make_key("What are the fees?", CONTEXT[:1], PARAMS) != key
+    assert cache.make_key("What are the fees?", CONTEXT, {**PARAMS, "temperature": 0.7}) != key
+    assert cache.make_key("What are the fees?", CONTEXT, PARAMS, query_history=["Hi"]) != key
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = ResponseCache(ttl=60)
+    cache.put("key", "1000 euro")
+    clock.now += 60
+    assert cache.get("key") == "1000 euro"
+    clock.now += 1
+    assert cache.get("key") is None
+    assert cache.stats() == {"entries": 0, "hits": 1, "misses": 1}
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = ResponseCache(max_entries=2)
+    cache.put("a", "A")
+    cache.put("b", "B")
+    assert cache.get("a") == "A"  # b is now the least recently used
+    cache.put("c", "C")
+    assert cache.get("b") is None
+    assert cache.get("a") == "A" and cache.get("c") == "C"
+
+def test_entries_survive_a_restart(tmp_path, clock):
+    path = str(tmp_path / "cache" / "responses.json")
+    cache = ResponseCache(max_entries=3, ttl=60, path=path)
+    for key in "abc":
+        cache.put(key, key.upper())
+
+    clock.now += 30
+    reloaded = ResponseCache(max_entries=2, ttl=60, path=path)
+    # The limit is applied to the stored order, dropping the oldest entry
+    assert reloaded.get("a") is None
+    assert reloaded.get("b") == "B" and reloaded.get("c") == "C"
+
+    clock.now += 31
+    assert ResponseCache(path=path).stats()["entries"] == 0
+
+def test_unreadable_file_starts_empty(tmp_path):
+    path = tmp_path / "responses.json"
+    path.write_text("{not json")
+    cache = ResponseCache(path=str(path))
+    assert cache.stats()["entries"] == 0
+    cache.put("a", "A")
+    assert json.loads(path.read_text())[0][0] == "a"
+
+def vector(*values):
+    """Unit-length float32 embedding"""
+    array = np.array(values, dtype=np.float32)
+    return array / np.linalg.norm(array)
+
+QUESTIONS = {
+    "What are the fees?": vector(1, 0, 0),
+    "How much is tuition?": vector(0.95, 0.31, 0),  # Cosine 0.95 with the first
+    "When is the deadline?": vector(0, 0, 1),
+}
+
+def semantic_cache(**kwargs):
+    cache = SemanticResponseCache(**kwargs)
+    cache.attach(QUESTIONS.__getitem__, kb_version="v1")
+    return cache
+
+def test_jaccard():
+    assert _jaccard(set(), set()) == 1.0
+    assert _jaccard({"a"}, set()) == 0.0
+    assert _jaccard({"a", "b"}, {"b", "c"}) == pytest.approx(1 / 3)
+
+def test_paraphrase_above_the_threshold_is_a_hit():
+    cache = semantic_cache(similarity_threshold=0.9)
+    cache.put(cache.embed("What are the fees?"), "What are the fees?", CONTEXT, PARAMS, None, "1000 euro")
+    assert cache.get(cache.embed("How much is tuition?"), CONTEXT, PARAMS) == "1000 euro"
+    assert cache.get(cache.embed("When is the deadline?"), CONTEXT, PARAMS) is None
+
+    strict = semantic_cache(similarity_threshold=0.99)
+    strict.put(strict.embed("What are the fees?"), "What are the fees?", CONTEXT, PARAMS, None, "1000 euro")
+    assert strict.get(strict.embed("How much is tuition?"), CONTEXT, PARAMS) is None
+    assert strict.stats() == {"entries": 1, "hits": 0, "misses": 1}
+
+def test_retrieved_chunks_must_overlap():
+    cache = semantic_cache(min_chunk_overlap=0.5)
+    embedding = cache.embed("What are the fees?")
+    cache.put(embedding, "What are the fees?", CONTEXT, PARAMS, None, "1000 euro")
+    # One of two chunks shared: Jaccard 0.5
+    assert cache.get(embedding, CONTEXT[:1], PARAMS) == "1000 euro"
+    other = [{"text": "Scholarships are available.", "metadata": {}}]
+    assert cache.get(embedding, CONTEXT[:1] + other, PARAMS) is None
+
+def test_model_parameters_and_history_scope_the_answer():
+    cache = semantic_cache()
+    embedding = cache.embed("What are the fees?")
+    cache.put(embedding, "What are the fees?", CONTEXT, PARAMS, ["Hi"], "1000 euro")
+    assert cache.get(embedding, CONTEXT, PARAMS, ["Hi"]) == "1000 euro"
+    assert cache.get(embedding, CONTEXT, PARAMS) is None
+    assert cache.get(embedding, CONTEXT, {**PARAMS, "temperature": 0.7}, ["Hi"]) is None
+
+def test_knowledge_base_change_clears_the_cache():
+    cache = semantic_cache()
+    embedding = cache.embed("What are the fees?")
+    cache.put(embedding, "What are the fees?", CONTEXT, PARAMS, None, "1000 euro")
+    cache.attach(QUESTIONS.__getitem__, kb_version="v1")
+    assert cache.get(embedding, CONTEXT, PARAMS) == "1000 euro"
+
+    cache.attach(QUESTIONS.__getitem__, kb_version="v2")
+    assert cache.stats()["entries"] == 0
+    assert cache.get(embedding, CONTEXT, PARAMS) is None
+
+def test_no_encoder_or_other_dimension_is_a_miss():
+    assert SemanticResponseCache().embed("What are the fees?") is None
+    cache = semantic_cache()
+    cache.put(cache.embed("What are the fees?"), "What are the fees?", CONTEXT, PARAMS, None, "1000 euro")
+    assert cache.get(vector(1, 0), CONTEXT, PARAMS) is None
+
+def test_expired_and_least_recently_used_entries_are_evicted(clock):
+    cache = semantic_cache(max_entries=2, ttl=60)
+    for question in QUESTIONS:
+        clock.now += 1
+        cache.put(cache.embed(question), question, [{"text": question, "metadata": {}}], PARAMS, None, question)
+    # Over the limit: evicted down to 90% of it, keeping the most recently used
+    assert cache.stats()["entries"] == 1
+    latest = "When is the deadline?"
+    assert cache.get(cache.embed(latest), [{"text": latest, "metadata": {}}], PARAMS) == latest
+
+    clock.now += 61
+    assert cache.get(cache.embed(latest), [{"text": latest, "metadata": {}}], PARAMS) is None
@@ -0,0 +1,105 @@
+"""
+Tests for the per-site robots.txt cache
+"""
+
+import json
+import os
+import threading
+import time
+import requests
+from robots_cache import RobotsCache
+
+ROBOTS = """User-agent: *
+Disallow: /private/
+Crawl-delay: 0.5
+Sitemap: https://uni.edu/sitemap.xml
+"""
+
+class FakeResponse:
+    def __init__(self, status_code, text=""):
+        self.status_code = status_code
+        self.text = text
+
+class FakeSession:
+    """Answers every robots.txt request with a fixed response or exception"""
+
+    def __init__(self, status_code=200, text=ROBOTS, error=None):
+        self.response = FakeResponse(status_code, text)
+        self.error = error
+        self.requested = []
+        self._lock = threading.Lock()
+
+    def get(self, url, timeout=None):
+        with self._lock:
+            self.requested.append(url)
+        time.sleep(0.01)
+        if self.error:
+            raise self.error
+        return self.response
+
+def test_rules_delay_and_sitemaps_come_from_robots_txt(tmp_path):
+    cache = RobotsCache(cache_folder=str(tmp_path))
+    session = FakeSession()
+    assert cache.can_fetch("https://uni.edu/fees", session)
+    assert not cache.can_fetch("https://uni.edu/private/grades", session)
+    # Fractional delays are rounded up rather than ignored
+    assert cache.crawl_delay("https://uni.edu/", session) == 1.0
+    assert cache.sitemaps("https://uni.edu/", session) == ["https://uni.edu/sitemap.xml"]
+    assert session.requested == ["https://uni.edu/robots.txt"]
+
+def test_request_rate_is_used_without_crawl_delay():
+    cache = RobotsCache(cache_folder=None)
+    session = FakeSession(text="User-agent: *\nRequest-rate: 2/10\n")
+    assert cache.crawl_delay("https://uni.edu/", session) == 5.0
+    assert cache.crawl_delay("https://other.edu/", FakeSession(text="")) is None
+
+def test_each_site_is_fetched_once_across_threads():
+    cache = RobotsCache(cache_folder=None)
+    session = FakeSession()
+    threads = [threading.Thread(target=cache.can_fetch, args=(f"https://uni.edu/page{i}", session)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    cache.can_fetch("http://uni.edu/", session)
+    assert sorted(session.requested) == ["http://uni.edu/robots.txt", "https://uni.edu/robots.txt"]
+    assert cache.fetches == 2
+
+def test_stored_entries_are_reused_until_they_expire(tmp_path):
+    RobotsCache(cache_folder=str(tmp_path)).can_fetch("https://uni.edu/", FakeSession())
+
+    session = FakeSession()
+    assert not RobotsCache(cache_folder=str(tmp_path)).can_fetch("https://uni.edu/private/", session)
+    assert session.requested == []
+
+    expired = RobotsCache(cache_folder=str(tmp_path), ttl=0)
+    for name in os.listdir(tmp_path):
+        with open(tmp_path / name) as f:
+            state = json.load(f)
+        state["fetched_at"] -= 10
+        with open(tmp_path / name, "w") as f:
+            json.dump(state, f)
+    expired.can_fetch("https://uni.edu/", session)
+    assert session.requested == ["https://uni.edu/robots.txt"]
+
+def test_status_codes_follow_robotparser(tmp_path):
+    assert not RobotsCache(cache_folder=None).can_fetch("https://uni.edu/", FakeSession(status_code=403))
+    assert RobotsCache(cache_folder=None).can_fetch("https://uni.edu/private/", FakeSession(status_code=404))
+
+def test_server_and_network_errors_disallow_but_are_not_stored(tmp_path):
+    for session in (FakeSession(status_code=503), FakeSession(error=requests.ConnectionError("down"))):
+        assert not RobotsCache(cache_folder=str(tmp_path)).can_fetch("https://uni.edu/fees", session)
+    assert os.listdir(tmp_path) == []
+
+    # The next crawl asks again and follows the rules it gets
+    session = FakeSession()
+    assert RobotsCache(cache_folder=str(tmp_path)).can_fetch("https://uni.edu/fees", session)
+    assert session.requested == ["https://uni.edu/robots.txt"]
+
+def test_unreadable_entry_is_fetched_again(tmp_path):
+    RobotsCache(cache_folder=str(tmp_path)).can_fetch("https://uni.edu/", FakeSession())
+    for name in os.listdir(tmp_path):
+        (tmp_path / name).write_text("{not json")
+    session = FakeSession()
+    assert not RobotsCache(cache_folder=str(tmp_path)).can_fetch("https://uni.edu/private/", session)
+    assert session.requested == ["https://uni.edu/robots.txt"]
@@ -0,0 +1,114 @@
+"""
+Tests for URL normalization and the bounded same-site crawler
+"""
+
+from site_crawler import SiteCrawler, content_hash, normalize_url, site_key
+
+def test_normalize_url_equivalent_spellings():
+    assert normalize_url("HTTPS://Www.Uni.EDU:443/Admissions/#apply") == "https://www.uni.edu/Admissions"
+    assert normalize_url("http://uni.edu:80") == "http://uni.edu/"
+    assert normalize_url("http://uni.edu/fees/") == normalize_url("http://uni.edu/fees")
+    assert normalize_url("http://uni.edu:8080/") == "http://uni.edu:8080/"
+
+def test_normalize_url_drops_tracking_parameters_only():
+    url = "https://uni.edu/courses?utm_source=mail&gclid=x&page=2&UTM_Campaign=y&ref=home&q="
+    assert normalize_url(url) == "https://uni.edu/courses?page=2&q="
+
+def test_normalize_url_rejects_other_schemes():
+    assert normalize_url("mailto:office@uni.edu") is None
+    assert normalize_url("javascript:void(0)") is None
+    assert normalize_url("/relative/path") is None
+
+def test_site_key_ignores_www():
+    assert site_key("https://www.uni.edu/a") == site_key("http://uni.edu/b") == "uni.edu"
+
+def test_content_hash_ignores_the_page_url():
+    first = {"url": "https://uni.edu/a", "text": "Fees https://uni.edu/a"}
+    second = {"url": "https://uni.edu/b", "text": "Fees https://uni.edu/b"}
+    assert content_hash(first) == content_hash(second)
+
+class FakeScraper:
+    """Serves pages from a dict of url -> (text, links)"""
+
+    robots_cache = None
+    http_cache = None
+    extraction_version = "1"
+
+    def __init__(self, site):
+        self.site = site
+        self.fetched = []
+
+    def scrape_scheduled(self, urls, extract_links=False):
+        for url in urls:
+            self.fetched.append(url)
+            if url not in self.site:
+                yield {"url": url, "text": "Not found", "status": "error"}
+                continue
+            text, links = self.site[url]
+            yield {"url": url, "text": text, "status": "success", "final_url": url, "links": links}
+
+SITE = {
+    "https://uni.edu/": ("Home", ["/fees", "/fees/#top", "/courses?utm_source=x", "https://other.org/", "/logo.png"]),
+    "https://uni.edu/fees": ("Tuition fees", ["/fees/2024"]),
+    "https://uni.edu/courses": ("Home", ["/courses/cs"]),  # Same content as the home page
+    "https://uni.edu/fees/2024": ("Fees 2024", ["/deep"]),
+    "https://uni.edu/deep": ("Too deep", []),
+}
+
+def crawl(max_depth=2, max_pages=200):
+    scraper = FakeScraper(SITE)
+    crawler = SiteCrawler(scraper, max_depth=max_depth, max_pages=max_pages, use_sitemaps=False)
+    return [page["url"] for page in crawler.crawl(["https://uni.edu"])], scraper, crawler
+
+def test_crawl_stays_on_site_within_depth_and_skips_duplicates():
+    pages, scraper, crawler = crawl(max_depth=2)
+    assert pages == ["https://uni.edu/", "https://uni.edu/fees", "https://uni.edu/fees/2024"]
+    # Each normalized URL is fetched once; other sites and images never are
+    assert len(scraper.fetched) == len(set(scraper.fetched))
+    assert "https://other.org/" not in scraper.fetched
+    assert "https://uni.edu/logo.png" not in scraper.fetched
+    assert "https://uni.edu/deep" not in scraper.fetched
+    assert crawler.duplicates == 1
+
+def test_crawl_respects_the_page_budget():
+    pages, _, _ = crawl(max_depth=5, max_pages=2)
+    assert pages == ["https://uni.edu/", "https://uni.edu/fees"]
+
+def test_crawl_resumes_from_the_frontier(tmp_path):
+    frontier = str(tmp_path / "frontier.json")
+    scraper = FakeScraper(SITE)
+    crawler = SiteCrawler(scraper, max_depth=2, frontier_path=frontier, use_sitemaps=False)
+    pages = crawler.crawl(["https://uni.edu"])
+    assert next(pages)["url"] == "https://uni.edu/"
+    pages.close()  # Interrupted after the first page
+
+    resumed_scraper = FakeScraper(SITE)
+    resumed = SiteCrawler(resumed_scraper, max_depth=2, frontier_path=frontier, use_sitemaps=False)
+    urls = [page["url"] for page in resumed.crawl(["https://uni.edu"])]
+    # Without an HTTP cache the finished page is fetched again and kept; nothing else is repeated
+    assert urls == ["https://uni.edu/", "https://uni.edu/fees", "https://uni.edu/fees/2024"]
+    assert resumed.duplicates == 1
+    assert len(resumed_scraper.fetched) == len(set(resumed_scraper.fetched))
+
+class FakeHTTPCache:
+    def __init__(self, entries):
+        self.entries = entries
+
+    def get(self, url):
+        return self.entries.get(url)
+
+def test_resume_replays_cached_pages_and_refetches_the_rest_at_their_depth(tmp_path):
+    frontier = str(tmp_path / "frontier.json")
+    pages = SiteCrawler(FakeScraper(SITE), max_depth=2, frontier_path=frontier, use_sitemaps=False).crawl(
+        ["https://uni.edu"])
+    assert [next(pages)["url"] for _ in range(2)] == ["https://uni.edu/", "https://uni.edu/fees"]
+    pages.close()
+
+    scraper = FakeScraper(SITE)
+    scraper.http_cache = FakeHTTPCache({"https://uni.edu/": {"text": "Home", "extraction_version": "1"}})
+    resumed = SiteCrawler(scraper, max_depth=2, frontier_path=frontier, use_sitemaps=False)
+    pages = list(resumed.crawl(["https://uni.edu"]))
+    assert [(page["url"], page["depth"]) for page in pages] == [
+        ("https://uni.edu/", 0), ("https://uni.edu/fees", 1), ("https://uni.edu/fees/2024", 2)]
+    assert "https://uni.edu/" not in scraper.fetched
+    assert "https://uni.edu/deep" not in scraper.fetched
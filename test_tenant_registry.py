@@ -0,0 +1,83 @@
+"""
+Tests for the multi-tenant registry (loading, LRU eviction and lock scope)
+"""
+
+import threading
+import numpy as np
+import pytest
+from embeddings_manager import EmbeddingsManager
+from tenant_registry import TenantRegistry
+
+def make_tenant(folder, texts, dimension=8):
+    """Save a small index and chunk store to folder"""
+    manager = EmbeddingsManager(model=object(), embeddings_folder=str(folder))
+    vectors = np.random.RandomState(len(texts)).rand(len(texts), dimension).astype(np.float32)
+    manager.build_index([{"text": text, "metadata": {}} for text in texts], vectors)
+    manager.save_embeddings()
+    return str(folder)
+
+def test_loads_on_demand_and_shares_the_model(tmp_path):
+    model = object()
+    registry = TenantRegistry(model=model)
+    registry.register_tenant("a", make_tenant(tmp_path / "a", ["tuition", "housing"]))
+    assert registry.resident_tenants() == []
+
+    manager = registry.get_manager("a")
+    assert [chunk["text"] for chunk in manager.chunks] == ["tuition", "housing"]
+    assert manager.model is model
+    assert registry.get_manager("a") is manager
+
+def test_unknown_and_missing_tenants(tmp_path):
+    registry = TenantRegistry(model=object())
+    with pytest.raises(KeyError):
+        registry.get_manager("nobody")
+    registry.register_tenant("empty", str(tmp_path / "empty"))
+    with pytest.raises(ValueError):
+        registry.get_manager("empty")
+
+def test_evicts_least_recently_used_over_the_cap(tmp_path):
+    registry = TenantRegistry(model=object())
+    for name in ["a", "b", "c"]:
+        registry.register_tenant(name, make_tenant(tmp_path / name, [name * 100] * 50))
+    registry.get_manager("a")
+    one_tenant = registry.resident_memory_bytes()
+    registry.max_memory_bytes = 2 * one_tenant
+
+    registry.get_manager("b")
+    registry.get_manager("a")  # b is now least recently used
+    registry.get_manager("c")
+    assert registry.resident_tenants() == ["a", "c"]
+    assert registry.resident_memory_bytes() <= registry.max_memory_bytes
+
+def test_a_cold_load_does_not_block_resident_tenants(tmp_path, monkeypatch):
+    registry = TenantRegistry(model=object())
+    registry.register_tenant("warm", make_tenant(tmp_path / "warm", ["warm"]))
+    registry.register_tenant("cold", make_tenant(tmp_path / "cold", ["cold"]))
+    warm = registry.get_manager("warm")
+
+    loading = threading.Event()
+    release = threading.Event()
+    original_load = EmbeddingsManager.load_embeddings
+
+    def slow_load(self, filename_prefix="university_combined"):
+        if self.embeddings_folder.endswith("cold"):
+            loading.set()
+            release.wait(5)
+        return original_load(self, filename_prefix)
+
+    monkeypatch.setattr(EmbeddingsManager, "load_embeddings", slow_load)
+    results = []
+    loaders = [threading.Thread(target=lambda: results.append(registry.get_manager("cold"))) for _ in range(2)]
+    for loader in loaders:
+        loader.start()
+    assert loading.wait(5)
+
+    # The registry lock is free while the cold tenant reads its files
+    assert registry.get_manager("warm") is warm
+    assert registry.resident_tenants() == ["warm"]
+
+    release.set()
+    for loader in loaders:
+        loader.join(5)
+    assert len(results) == 2 and results[0] is results[1]
+    assert registry.resident_tenants() == ["warm", "cold"]
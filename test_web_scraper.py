@@ -0,0 +1,48 @@
+"""
+Tests for scheduled scraping and streaming chunking
+"""
+
+import random
+import time
+from web_scraper import WebScraper
+
+def fake_scrape(delays):
+    """scrape_url stand-in that takes a per-URL time to finish"""
+    def scrape_url(url, wait_for_slot=True, extract_links=False):
+        time.sleep(delays.get(url, 0))
+        return {"url": url, "text": f"Content of {url}. " * 10, "status": "success", "changed": True}
+    return scrape_url
+
+def test_a_slow_page_does_not_hold_back_the_others(monkeypatch):
+    urls = [f"http://site{i % 3}.edu/page{i}" for i in range(6)]
+    delays = {urls[0]: 0.3}  # The first URL finishes last
+
+    scraper = WebScraper(max_threads=4, delay=0, respect_robots=False)
+    monkeypatch.setattr(scraper, "scrape_url", fake_scrape(delays))
+    started = time.monotonic()
+    results = scraper.scrape_scheduled(urls)
+    first = next(results)
+    assert first["url"] != urls[0]
+    assert time.monotonic() - started < 0.2
+    rest = [result["url"] for result in results]
+    assert rest[-1] == urls[0]
+    assert sorted([first["url"], *rest]) == sorted(urls)
+
+def test_runs_chunk_the_same_pages_identically(monkeypatch, tmp_path):
+    links = tmp_path / "Links.txt"
+    urls = [f"http://site{i % 2}.edu/page{i}" for i in range(6)]
+    links.write_text("\n".join(urls))
+
+    runs = []
+    for seed in (1, 2):
+        rng = random.Random(seed)
+        scraper = WebScraper(max_threads=3, delay=0, respect_robots=False)
+        monkeypatch.setattr(scraper, "scrape_url", fake_scrape({url: rng.uniform(0, 0.02) for url in urls}))
+        runs.append(list(scraper.iter_chunks(scraper.iter_scrape_urls(str(links)), chunk_size=80, chunk_overlap=0)))
+
+    # Pages arrive in completion order, but each page's chunks stay together and in order
+    key = lambda chunk: (chunk["metadata"]["source"], chunk["metadata"]["chunk_id"])
+    assert sorted(runs[0], key=key) == sorted(runs[1], key=key)
+    for run in runs:
+        sources = [chunk["metadata"]["source"] for chunk in run]
+        assert sources == sorted(sources, key=sources.index)
@@ -0,0 +1,185 @@
+import re
+from typing import Dict
+
+# Precompiled patterns shared by the PDF cleaning, chunking and metadata passes
+WHITESPACE_PATTERN = re.compile(r'\s+')
+MISSING_SPACE_PATTERN = re.compile(r'([a-z.!?])([A-Z])')  # Missing spaces and sentence boundaries
+SPACE_BEFORE_PUNCTUATION_PATTERN = re.compile(r'\s+([.!?])')
+SPACE_AFTER_PUNCTUATION_PATTERN = re.compile(r'([.!?])\s*')
+ORPHAN_WORD_PATTERN = re.compile(r'^[a-z]\s+')
+SENTENCE_SPLIT_PATTERN = re.compile(r'[.!?]')
+SECTION_HEADER_PATTERN = re.compile(
+    r'(?:^|\n)(?:'
+    r'[A-Z][A-Z\s]+:?'  # ALL CAPS headers
+    r'|\d+\.\s*[A-Z][^:\n]+'  # Numbered sections
+    r'|[A-Z][a-z]+(?:\s+[A-Z][a-z]+)*:'  # Title case headers
+    r')'
+)
+
+# Common table patterns: numbers separated by spaces, words followed by numbers,
+# dollar amounts, decimal numbers and all caps words
+TABLE_LINE_PATTERN = re.compile(r'\d+\s+\d+|[A-Z][a-z]+\s+\d+|\$\d+|\d+\.\d+|[A-Z]+\s+[A-Z]+')
+
+DIGIT_PATTERN = re.compile(r'\d')
+DATE_PATTERN = re.compile(r'\d{1,2}[/-]\d{1,2}[/-]\d{2,4}')
+CURRENCY_PATTERN = re.compile(r'\$[\d,]+')
+DOLLAR_AMOUNT_PATTERN = re.compile(r'\$\d')
+NUMBERED_LINE_PATTERN = re.compile(r'^\d+\.', re.MULTILINE)
+
+BULLET_VARIANTS = '·▪▫◦‣⁃'
+
+def clean_extracted_text(text):
+    """
+    Clean and normalize extracted text from PDFs
+
+    Args:
+        text: Raw extracted text
+
+    Returns:
+        Cleaned text
+    """
+    if not text:
+        return ""
+
+    # Remove excessive whitespace (this also removes every line break)
+    text = WHITESPACE_PATTERN.sub(' ', text)
+
+    # A page that is only a number is a page number
+    if text.isdecimal():
+        return ""
+
+    # Fix missing spaces and sentence boundaries left by PDF extraction
+    text = MISSING_SPACE_PATTERN.sub(r'\1 \2', text)
+
+    return text.strip()
+
+def normalize_text_formatting(text):
+    """
+    Normalize text formatting for better chunking
+
+    Args:
+        text: Raw text
+
+    Returns:
+        Normalized text
+    """
+    # Standardize bullet points (str.replace is much faster than a regex or translate here)
+    for bullet in BULLET_VARIANTS:
+        if bullet in text:
+            text = text.replace(bullet, '•')
+
+    # Clean up spacing around punctuation: no space before, exactly one after.
+    # Two passes beat one combined pattern, whose leading \s* is retried at every space.
+    text = SPACE_BEFORE_PUNCTUATION_PATTERN.sub(r'\1', text)
+    return SPACE_AFTER_PUNCTUATION_PATTERN.sub(r'\1 ', text)
+
+def post_process_chunk(chunk):
+    """
+    Post-process individual chunks to improve quality
+
+    Args:
+        chunk: Raw chunk text
+
+    Returns:
+        Enhanced chunk text
+    """
+    if not chunk or len(chunk.strip()) < 10:
+        return None
+
+    # Clean up the chunk
+    chunk = chunk.strip()
+
+    # Remove orphaned words at the beginning
+    chunk = ORPHAN_WORD_PATTERN.sub('', chunk)
+
+    # Ensure proper sentence endings
+    if not chunk.endswith(('.', '!', '?', ':', ';')):
+        # Try to find a good ending point
+        sentences = SENTENCE_SPLIT_PATTERN.split(chunk)
+        if len(sentences) > 1:
+            # Remove incomplete last sentence
+            chunk = '. '.join(sentences[:-1]) + '.'
+
+    # Restore table formatting if present
+    if '|TABLE|' in chunk:
+        chunk = chunk.replace(' |TABLE| ', '\n')
+
+    return chunk
+
+def is_section_header(line):
+    """
+    Check if a line starts a new semantic section
+
+    Args:
+        line: Text line
+
+    Returns:
+        True if the line looks like a section header
+    """
+    return SECTION_HEADER_PATTERN.match(line) is not None
+
+def is_table_line(line):
+    """
+    Check if a line looks like table data
+
+    Args:
+        line: Text line
+
+    Returns:
+        True if line appears to be table data
+    """
+    return TABLE_LINE_PATTERN.search(line) is not None
+
+def extract_chunk_features(text) -> Dict:
+    """
+    Compute every content flag of a chunk in a single call
+
+    Each pattern runs at most once, and patterns whose trigger character
+    (a digit or '$') is absent are skipped.
+
+    Args:
+        text: Chunk text
+
+    Returns:
+        Dictionary with the has_* flags and the content_type classification
+    """
+    has_numbers = DIGIT_PATTERN.search(text) is not None
+    has_dollar = '$' in text
+    has_currency = has_dollar and CURRENCY_PATTERN.search(text) is not None
+    has_bullet_points = '•' in text
+    is_table = is_table_line(text)
+    has_dates = has_numbers and DATE_PATTERN.search(text) is not None
+
+    if has_currency and has_numbers and DOLLAR_AMOUNT_PATTERN.search(text):
+        content_type = 'financial'
+    elif has_dates:
+        content_type = 'temporal'
+    elif has_bullet_points or (has_numbers and NUMBERED_LINE_PATTERN.search(text)):
+        content_type = 'list'
+    elif is_table:
+        content_type = 'tabular'
+    elif text.count('.') >= 3:
+        content_type = 'narrative'
+    else:
+        content_type = 'general'
+
+    return {
+        "has_numbers": has_numbers,
+        "has_dates": has_dates,
+        "has_currency": has_currency,
+        "has_bullet_points": has_bullet_points,
+        "has_table_data": '|TABLE|' in text or is_table,
+        "content_type": content_type
+    }
+
+def classify_content_type(text):
+    """
+    Classify the content type of a chunk
+
+    Args:
+        text: Chunk text
+
+    Returns:
+        Content type classification
+    """
+    return extract_chunk_features(text)["content_type"]
@@ -0,0 +1,63 @@
+import functools
+from typing import Callable
+
+DEFAULT_TOKENIZER_MODEL = "BAAI/bge-base-en-v1.5"
+
+# Chunk sizes used when chunks are measured in tokens. bge-base truncates at
+# 512 tokens including [CLS]/[SEP]; the headroom covers post-processing.
+TOKEN_CHUNK_SIZE = 480
+TOKEN_CHUNK_OVERLAP = 64
+
+@functools.lru_cache(maxsize=4)
+def get_tokenizer(model_name=DEFAULT_TOKENIZER_MODEL):
+    """
+    Load (once) the tokenizer of an embedding model
+
+    Args:
+        model_name: Hugging Face model name
+
+    Returns:
+        The model's tokenizer
+    """
+    from transformers import AutoTokenizer
+    return AutoTokenizer.from_pretrained(model_name)
+
+@functools.lru_cache(maxsize=4)
+def get_token_length_function(model_name=DEFAULT_TOKENIZER_MODEL, cache_size=65536) -> Callable[[str], int]:
+    """
+    Build a cached function that counts the tokens of a text
+
+    Text splitters measure the same pieces repeatedly while merging, so
+    lengths are memoised.
+
+    Args:
+        model_name: Hugging Face model name
+        cache_size: Number of texts whose length is memoised
+
+    Returns:
+        Function mapping text to its token count (without special tokens)
+    """
+    tokenizer = get_tokenizer(model_name)
+
+    @functools.lru_cache(maxsize=cache_size)
+    def token_length(text: str) -> int:
+        return len(tokenizer.encode(text, add_special_tokens=False))
+
+    return token_length
+
+def get_length_function(chunk_unit="chars", model_name=DEFAULT_TOKENIZER_MODEL) -> Callable[[str], int]:
+    """
+    Resolve the length function for a chunk size unit
+
+    Args:
+        chunk_unit: "chars" to measure characters or "tokens" to measure model tokens
+        model_name: Model whose tokenizer is used for "tokens"
+
+    Returns:
+        Function mapping text to its length in the requested unit
+    """
+    if chunk_unit == "chars":
+        return len
+    if chunk_unit == "tokens":
+        return get_token_length_function(model_name)
+    raise ValueError(f"Unknown chunk unit: {chunk_unit}")
@@ -6,35 +6,97 @@ import re
 import logging
 from urllib.parse import urlparse, urljoin
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from concurrent.futures import ThreadPoolExecutor
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from tokenization import get_length_function
+from domain_scheduler import DomainScheduler
+from http_cache import HTTPCache
+from site_crawler import SiteCrawler
+from robots_cache import RobotsCache
+from logging_setup import configure_logging, log_timing
+from profiling import profile_stage
+from pdf_loader import extract_pdf_bytes, iter_document_chunks, join_pages, CHUNKING_VERSION, EXTRACTION_VERSION
 import urllib3
 
+try:
+    import lxml.html
+    from lxml import etree
+except ImportError:  # BeautifulSoup's html.parser is used instead
+    lxml = None
+
 # Disable SSL warnings when we bypass certificate verification
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
-# Set up logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("web_scraping.log"),
-        logging.StreamHandler()
-    ]
+# Tags whose content is boilerplate, and the main content regions looked up in
+# their place (the same regions as the BeautifulSoup path's CSS selector)
+BOILERPLATE_TAGS = ('script', 'style', 'header', 'footer', 'nav')
+CONTENT_SELECTOR = "main, article, #content, .content, #main, .main, .post, .entry, .page, .article"
+
+
+def _class_test(name):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+CONTENT_XPATH = (
+    "//main | //article | //*[@id='content'] | //*[" + _class_test("content") + "] | //*[@id='main']"
+    " | //*[" + " or ".join(_class_test(name) for name in ("main", "post", "entry", "page", "article")) + "]"
 )
 
+CRAWL_FRONTIER_PATH = os.path.join("embeddings", "crawl_frontier.json")
+
+# Bump when HTML text extraction changes so cached pages are downloaded and extracted again
+# instead of being revalidated (linked PDFs follow pdf_loader's EXTRACTION_VERSION)
+WEB_EXTRACTION_VERSION = "1"
+
+# Bump when page splitting changes so cached chunks of unchanged pages are rebuilt
+# (linked PDFs are split by pdf_loader and follow its CHUNKING_VERSION)
+WEB_CHUNKING_VERSION = "1"
+
+# Response types that are downloaded; anything else is skipped before its body is read
+HTML_CONTENT_TYPES = ('text/html', 'application/xhtml+xml')
+PDF_CONTENT_TYPES = ('application/pdf', 'application/x-pdf')
+MAX_BODY_BYTES = 25 * 1024 * 1024
+
+# Set up logging (handlers are configured by the entry point, see logging_setup)
+logger = logging.getLogger(__name__)
+
 class WebScraper:
-    def __init__(self, max_threads=5, delay=1.0):
+    def __init__(self, max_threads=5, delay=1.0, max_retries=3, backoff_factor=0.5, http_cache=None,
+                 max_body_bytes=MAX_BODY_BYTES, robots_cache=None, respect_robots=True):
         """
         Initialize the web scraper
         
         Args:
             max_threads: Maximum number of concurrent threads for scraping
             delay: Delay between requests to the same domain (in seconds)
+            max_retries: Retries for connection errors and 429/5xx responses
+            backoff_factor: Exponential backoff base between retries (in seconds)
+            http_cache: Optional HTTPCache used to revalidate previously scraped pages
+            max_body_bytes: Responses larger than this are skipped
+            robots_cache: RobotsCache to share (an in-memory one is created if omitted)
+            respect_robots: Skip URLs disallowed by robots.txt and honour its Crawl-delay
         """
         self.max_threads = max_threads
         self.delay = delay
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.http_cache = http_cache
+        self.max_body_bytes = max_body_bytes
+        if respect_robots and robots_cache is None:
+            robots_cache = RobotsCache(cache_folder=None)
+        self.robots_cache = robots_cache if respect_robots else None
+        self._robots_delays_applied = set()
+        self._thread_local = threading.local()
+        self._sessions = []
+        self._sessions_lock = threading.Lock()
         self.visited_urls = set()
-        self.last_request_time = {}
+        self._visited_lock = threading.Lock()
+        self.scheduler = DomainScheduler(delay=delay)
+        # Cached text from another extractor or version is never served on a 304
+        self.extraction_version = f"{WEB_EXTRACTION_VERSION}:{'lxml' if lxml is not None else 'bs4'}:{EXTRACTION_VERSION}"
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
@@ -43,32 +105,86 @@ class WebScraper:
             'Upgrade-Insecure-Requests': '1'
         }
     
+    def get_session(self):
+        """
+        Get this thread's HTTP session, creating it on first use
+        
+        Each worker thread keeps one session so connections (and TLS sessions)
+        to the same host are reused across pages.
+        
+        Returns:
+            requests.Session with a pooled, retrying adapter
+        """
+        session = getattr(self._thread_local, "session", None)
+        if session is None:
+            retry = Retry(
+                total=self.max_retries,
+                backoff_factor=self.backoff_factor,
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=frozenset(["GET", "HEAD"]),
+                respect_retry_after_header=True,
+                raise_on_status=False
+            )
+            adapter = HTTPAdapter(pool_connections=self.max_threads, pool_maxsize=self.max_threads, max_retries=retry)
+            
+            session = requests.Session()
+            session.headers.update(self.headers)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            
+            self._thread_local.session = session
+            with self._sessions_lock:
+                self._sessions.append(session)
+        return session
+    
+    def close(self):
+        """Close every pooled HTTP session"""
+        with self._sessions_lock:
+            for session in self._sessions:
+                session.close()
+            self._sessions = []
+        self._thread_local = threading.local()
+    
     def _respect_robots_txt(self, url):
         """
         Check if the URL is allowed by robots.txt
-        Basic implementation - could be expanded
+        
+        The site's robots.txt is fetched once (through the pooled session) and
+        its Crawl-delay, when longer than ours, becomes the domain's delay.
         
         Returns True if allowed, False if not
         """
-        # This is a simplified check
-        return True
+        if self.robots_cache is None:
+            return True
+        
+        session = self.get_session()
+        user_agent = self.headers['User-Agent']
+        try:
+            domain = self._get_domain(url)
+            if domain not in self._robots_delays_applied:
+                crawl_delay = self.robots_cache.crawl_delay(url, session, user_agent)
+                if crawl_delay and crawl_delay > self.scheduler.get_delay(domain):
+                    logger.info(f"Using robots.txt crawl-delay of {crawl_delay}s for {domain}")
+                    self.scheduler.set_delay(domain, crawl_delay)
+                self._robots_delays_applied.add(domain)
+            return self.robots_cache.can_fetch(url, session, user_agent)
+        except Exception as e:
+            logger.warning(f"Could not check robots.txt for {url}: {e}")
+            return True
     
     def _get_domain(self, url):
         """Extract domain from URL"""
         parsed_url = urlparse(url)
         return parsed_url.netloc
     
-    def _should_delay_request(self, url):
-        """Check if we need to delay the request to respect rate limiting"""
-        domain = self._get_domain(url)
-        current_time = time.time()
-        
-        if domain in self.last_request_time:
-            elapsed = current_time - self.last_request_time[domain]
-            if elapsed < self.delay:
-                time.sleep(self.delay - elapsed)
+    def wait_for_domain(self, url):
+        """
+        Block until the URL's domain may be requested again and take its slot
         
-        self.last_request_time[domain] = time.time()
+        Args:
+            url: URL about to be requested
+        """
+        self.scheduler.acquire(self._get_domain(url))
     
     def _clean_text(self, text):
         """Clean and normalize extracted text"""
@@ -79,13 +195,80 @@ class WebScraper:
         # Trim whitespace
         return text.strip()
     
-    def _extract_text_from_html(self, html_content, url):
+    def _extract_text_from_html(self, html_content, url, links=None):
         """
         Extract clean text content from HTML
         
+        Uses lxml when it is installed and falls back to BeautifulSoup if lxml
+        is missing or cannot parse the page.
+        
+        Args:
+            html_content: Raw HTML content
+            url: Source URL for reference
+            links: Optional list that receives the href of every link on the page
+            
+        Returns:
+            Clean text extracted from HTML
+        """
+        if lxml is not None:
+            try:
+                return self._extract_text_with_lxml(html_content, url, links)
+            except Exception as e:
+                logger.warning(f"lxml could not parse {url}, falling back to BeautifulSoup: {e}")
+        return self._extract_text_with_bs4(html_content, url, links)
+    
+    def _extract_text_with_lxml(self, html_content, url, links=None):
+        """
+        Extract clean text content from HTML with lxml
+        
+        The tree is built by libxml2, boilerplate is stripped in C and only the
+        content regions matched by CONTENT_XPATH are walked for text.
+        
+        Args:
+            html_content: Raw HTML content
+            url: Source URL for reference
+            links: Optional list that receives the href of every link on the page
+            
+        Returns:
+            Clean text extracted from HTML
+        """
+        if isinstance(html_content, str):
+            # lxml rejects str input that carries an XML encoding declaration
+            html_content = html_content.encode('utf-8')
+        document = lxml.html.document_fromstring(html_content, parser=_get_lxml_parser())
+        
+        # Collect links before navigation is stripped
+        if links is not None:
+            links.extend(document.xpath('//a/@href'))
+        
+        # Remove script, style and navigation elements, keeping the text that follows them
+        etree.strip_elements(document, *BOILERPLATE_TAGS, with_tail=False)
+        
+        # Try to find main content areas, falling back to the body
+        content_elements = document.xpath(CONTENT_XPATH)
+        if not content_elements:
+            content_elements = [document.body]
+        
+        main_content = "\n\n".join(_element_text(element) for element in content_elements)
+        
+        # Try to get the title
+        title = ""
+        title_element = document.find('.//title')
+        if title_element is not None:
+            title = title_element.text
+        
+        # Combine with title and clean
+        full_text = f"Title: {title}\nURL: {url}\n\n{main_content}"
+        return self._clean_text(full_text)
+    
+    def _extract_text_with_bs4(self, html_content, url, links=None):
+        """
+        Extract clean text content from HTML with BeautifulSoup
+        
         Args:
             html_content: Raw HTML content
             url: Source URL for reference
+            links: Optional list that receives the href of every link on the page
             
         Returns:
             Clean text extracted from HTML
@@ -93,15 +276,19 @@ class WebScraper:
         try:
             soup = BeautifulSoup(html_content, 'html.parser')
             
+            # Collect links before navigation is removed
+            if links is not None:
+                links.extend(anchor['href'] for anchor in soup.find_all('a', href=True))
+            
             # Remove script and style elements
-            for script_or_style in soup(['script', 'style', 'header', 'footer', 'nav']):
+            for script_or_style in soup(list(BOILERPLATE_TAGS)):
                 script_or_style.decompose()
             
             # Extract text from main content areas
             main_content = ""
             
             # Try to find main content area
-            content_elements = soup.select("main, article, #content, .content, #main, .main, .post, .entry, .page, .article")
+            content_elements = soup.select(CONTENT_SELECTOR)
             
             if content_elements:
                 # Use content from identified content areas
@@ -121,69 +308,208 @@ class WebScraper:
             return self._clean_text(full_text)
             
         except Exception as e:
-            logging.error(f"Error extracting text from {url}: {e}")
+            logger.error(f"Error extracting text from {url}: {e}")
             return f"Error processing {url}: {str(e)}"
     
-    def scrape_url(self, url):
+    def _content_kind(self, response):
         """
-        Scrape content from a single URL
+        Classify a response by its Content-Type header
         
         Args:
-            url: URL to scrape
+            response: Streamed response
+            
+        Returns:
+            "html", "pdf", or None for content that cannot be used
+        """
+        content_type = response.headers.get("Content-Type", "").split(";")[0].strip().lower()
+        if not content_type or content_type in HTML_CONTENT_TYPES:
+            return "html"
+        if content_type in PDF_CONTENT_TYPES:
+            return "pdf"
+        if content_type == "application/octet-stream" and urlparse(response.url).path.lower().endswith(".pdf"):
+            return "pdf"
+        return None
+    
+    def _read_body(self, response):
+        """
+        Read a streamed response body, stopping at max_body_bytes
+        
+        Args:
+            response: Streamed response
             
         Returns:
-            Dictionary with url and extracted text
+            Body bytes, or None if the body is larger than max_body_bytes
         """
-        # Skip if already visited
-        if url in self.visited_urls:
+        content_length = response.headers.get("Content-Length")
+        if content_length and content_length.isdigit() and int(content_length) > self.max_body_bytes:
             return None
         
-        # Mark as visited
-        self.visited_urls.add(url)
+        body = bytearray()
+        for block in response.iter_content(chunk_size=64 * 1024):
+            body.extend(block)
+            if len(body) > self.max_body_bytes:
+                return None
+        return bytes(body)
+    
+    def scrape_url(self, url, wait_for_slot=True, extract_links=False):
+        """
+        Scrape content from a single URL
+        
+        HTML pages are parsed for text and PDFs are extracted with pdf_loader;
+        other content types and oversized bodies are skipped without being
+        downloaded.
+        
+        Args:
+            url: URL to scrape
+            wait_for_slot: Wait for the domain's rate limit; False when the
+                caller already took a slot from the scheduler
+            extract_links: Also return the absolute URLs the page links to
+            
+        Returns:
+            Dictionary with url, extracted text, status ("success", "skipped" or
+            "error") and whether the text changed since the cached copy, plus
+            format ("html" or "pdf"), the page texts of PDFs, and final_url and
+            links when extract_links is set
+        """
+        # Skip if already visited, otherwise mark as visited
+        with self._visited_lock:
+            if url in self.visited_urls:
+                return None
+            self.visited_urls.add(url)
         
         # Check robots.txt
         if not self._respect_robots_txt(url):
-            logging.info(f"Skipping {url} - disallowed by robots.txt")
+            logger.info(f"Skipping {url} - disallowed by robots.txt")
             return None
         
         # Respect rate limiting
-        self._should_delay_request(url)
+        if wait_for_slot:
+            self.wait_for_domain(url)
         
+        # Per-URL timings: time to response headers (includes DNS and connect on
+        # a new connection), body download, text extraction and the whole fetch
+        timing = {"url": url}
+        started = time.perf_counter()
         try:
-            logging.info(f"Scraping {url}")
+            logger.info(f"Scraping {url}")
+            
+            session = self.get_session()
             
-            # Try with SSL verification first
+            # Revalidate a cached copy instead of downloading it again
+            cached = self.http_cache.get(url) if self.http_cache else None
+            request_headers = (self.http_cache.conditional_headers(cached, self.extraction_version)
+                               if self.http_cache else {})
+            
+            # Try with SSL verification first; only the headers are read until the body is wanted
             try:
-                response = requests.get(url, headers=self.headers, timeout=30, verify=True)
+                response = session.get(url, headers=request_headers, timeout=30, verify=True, stream=True)
             except requests.exceptions.SSLError as ssl_error:
-                logging.warning(f"SSL verification failed for {url}: {ssl_error}")
-                logging.info(f"Retrying {url} without SSL verification...")
+                logger.warning(f"SSL verification failed for {url}: {ssl_error}")
+                logger.info(f"Retrying {url} without SSL verification...")
                 
                 # Retry without SSL verification for problematic certificates
-                response = requests.get(url, headers=self.headers, timeout=30, verify=False)
+                response = session.get(url, headers=request_headers, timeout=30, verify=False, stream=True)
+            
+            timing["http_status"] = response.status_code
+            timing["headers_s"] = round(response.elapsed.total_seconds(), 4)
+            timing["request_s"] = round(time.perf_counter() - started, 4)
+            
+            with response:
+                if response.status_code == 304 and request_headers:
+                    logger.info(f"Not modified: {url}")
+                    self.http_cache.record_not_modified(url)
+                    result = {
+                        "url": url,
+                        "text": cached["text"],
+                        "status": "success",
+                        "changed": False,
+                        "format": cached.get("format", "html")
+                    }
+                    if cached.get("pages") is not None:
+                        result["pages"] = cached["pages"]
+                    if extract_links:
+                        result["final_url"] = url
+                        result["links"] = cached.get("links", [])
+                    return result
+                elif response.status_code != 200:
+                    logger.warning(f"Failed to retrieve {url}: HTTP {response.status_code}")
+                    return {
+                        "url": url,
+                        "text": f"Failed to retrieve content: HTTP {response.status_code}",
+                        "status": "error"
+                    }
                 
-            if response.status_code == 200:
-                text_content = self._extract_text_from_html(response.text, url)
-                return {
-                    "url": url,
-                    "text": text_content,
-                    "status": "success"
-                }
+                # Decide from the headers whether the body is worth downloading
+                content_kind = self._content_kind(response)
+                timing["format"] = content_kind
+                download_started = time.perf_counter()
+                body = self._read_body(response) if content_kind else None
+                timing["download_s"] = round(time.perf_counter() - download_started, 4)
+                if body is None:
+                    reason = (f"body larger than {self.max_body_bytes} bytes" if content_kind
+                              else f"unsupported content type {response.headers.get('Content-Type')}")
+                    logger.info(f"Skipping {url}: {reason}")
+                    return {
+                        "url": url,
+                        "text": f"Skipped: {reason}",
+                        "status": "skipped"
+                    }
+                encoding = response.encoding or 'utf-8'
+                final_url = response.url
+                etag = response.headers.get("ETag")
+                last_modified = response.headers.get("Last-Modified")
+                timing["bytes"] = len(body)
+            
+            parse_started = time.perf_counter()
+            pages = None
+            links = [] if extract_links else None
+            if content_kind == "pdf":
+                pages = extract_pdf_bytes(body)
+                text_content = join_pages(pages).strip()
+                if not text_content:
+                    logger.warning(f"No text extracted from PDF {url}")
+                    return {
+                        "url": url,
+                        "text": "No text extracted from PDF",
+                        "status": "error"
+                    }
             else:
-                logging.warning(f"Failed to retrieve {url}: HTTP {response.status_code}")
-                return {
-                    "url": url,
-                    "text": f"Failed to retrieve content: HTTP {response.status_code}",
-                    "status": "error"
-                }
-                
+                hrefs = [] if extract_links else None
+                text_content = self._extract_text_from_html(body.decode(encoding, errors='replace'), url, hrefs)
+                if extract_links:
+                    links = [urljoin(final_url, href) for href in hrefs]
+            timing["parse_s"] = round(time.perf_counter() - parse_started, 4)
+            
+            changed = True
+            if self.http_cache:
+                changed = self.http_cache.put(url, text_content, etag=etag, last_modified=last_modified,
+                                              previous=cached, links=links, content_format=content_kind, pages=pages,
+                                              extraction_version=self.extraction_version)
+            result = {
+                "url": url,
+                "text": text_content,
+                "status": "success",
+                "changed": changed,
+                "format": content_kind
+            }
+            if pages is not None:
+                result["pages"] = pages
+            if extract_links:
+                result["final_url"] = final_url
+                result["links"] = links
+            return result
+            
         except Exception as e:
-            logging.error(f"Error scraping {url}: {e}")
+            logger.error(f"Error scraping {url}: {e}")
+            timing["error"] = str(e)
             return {
                 "url": url,
                 "text": f"Error scraping content: {str(e)}",
                 "status": "error"
             }
+        finally:
+            timing["total_s"] = round(time.perf_counter() - started, 4)
+            log_timing("fetch", **timing)
     
     def scrape_urls_from_file(self, file_path):
         """
@@ -195,70 +521,216 @@ class WebScraper:
         Returns:
             List of dictionaries with url and extracted text
         """
+        with profile_stage("scrape_urls_from_file") as record:
+            results = list(self.iter_scrape_urls(file_path))
+            record.items = len(results)
+        return results
+    
+    def read_urls(self, file_path):
+        """
+        Read the distinct URLs listed in a file
+        
+        Args:
+            file_path: Path to file containing URLs (one per line)
+            
+        Returns:
+            List of URLs in file order (empty if the file is missing)
+        """
         if not os.path.exists(file_path):
-            logging.error(f"File not found: {file_path}")
+            logger.error(f"File not found: {file_path}")
             return []
         
         # Read URLs from file
         with open(file_path, 'r') as f:
             urls = [line.strip() for line in f.readlines() if line.strip()]
         
-        logging.info(f"Found {len(urls)} URLs in {file_path}")
+        logger.info(f"Found {len(urls)} URLs in {file_path}")
         
         # Remove duplicates
-        unique_urls = list(set(urls))
+        return list(dict.fromkeys(urls))
+    
+    def iter_scrape_urls(self, file_path):
+        """
+        Scrape URLs listed in a file, yielding each page as soon as it is scraped
+        
+        Args:
+            file_path: Path to file containing URLs (one per line)
+            
+        Yields:
+            Dictionaries with url and extracted text of successfully scraped pages,
+            in completion order
+        """
+        unique_urls = self.read_urls(file_path)
         
         # Scrape URLs in parallel
-        results = []
-        with ThreadPoolExecutor(max_workers=self.max_threads) as executor:
-            futures = {executor.submit(self.scrape_url, url): url for url in unique_urls}
+        scraped = 0
+        for result in self.scrape_scheduled(unique_urls):
+            if result and result["status"] == "success":
+                scraped += 1
+                yield result
+        
+        logger.info(f"Successfully scraped {scraped} out of {len(unique_urls)} URLs")
+    
+    def scrape_scheduled(self, urls, extract_links=False):
+        """
+        Scrape URLs in parallel, dispatching each one only when its domain is ready
+        
+        Workers never sleep for rate limiting: URLs are queued per domain and
+        handed to the pool as soon as the domain's token bucket allows, so a
+        slow domain's backlog does not hold up the others. Each result is
+        yielded as soon as it is done, so a slow page never holds back the
+        chunking of pages that finished after it.
+        
+        Args:
+            urls: URLs to scrape
+            extract_links: Also return the links found on each page
             
-            for future in futures:
-                result = future.result()
-                if result and result["status"] == "success":
-                    results.append(result)
+        Yields:
+            Result of scrape_url for each URL, in completion order
+        """
+        with self._visited_lock:
+            seen = set(self.visited_urls)
+        pending = OrderedDict()
+        for url in urls:
+            # Visited, repeated and disallowed URLs are dropped before they take a rate-limit slot or a worker
+            if url in seen:
+                continue
+            seen.add(url)
+            if not self._respect_robots_txt(url):
+                logger.info(f"Skipping {url} - disallowed by robots.txt")
+                continue
+            pending.setdefault(self._get_domain(url), deque()).append(url)
         
-        logging.info(f"Successfully scraped {len(results)} out of {len(unique_urls)} URLs")
-        return results
+        in_flight = set()
+        with ThreadPoolExecutor(max_workers=self.max_threads) as executor:
+            while pending or in_flight:
+                # Hand out one URL per ready domain until every worker is busy
+                next_ready = None
+                for domain in list(pending):
+                    if len(in_flight) >= self.max_threads:
+                        break
+                    ready_in = self.scheduler.try_acquire(domain)
+                    if ready_in > 0:
+                        next_ready = ready_in if next_ready is None else min(next_ready, ready_in)
+                        continue
+                    
+                    queue = pending.pop(domain)
+                    in_flight.add(executor.submit(self.scrape_url, queue.popleft(), False, extract_links))
+                    if queue:
+                        # Move the domain to the back so domains take turns
+                        pending[domain] = queue
+                
+                if in_flight:
+                    # Wake up when a worker finishes or the next domain becomes ready
+                    timeout = next_ready if len(in_flight) < self.max_threads else None
+                    done, in_flight = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield future.result()
+                elif next_ready:
+                    time.sleep(next_ready)
     
-    def split_into_chunks(self, scraped_data, chunk_size=600, chunk_overlap=200):
+    def split_into_chunks(self, scraped_data, chunk_size=600, chunk_overlap=200, chunk_unit="chars"):
         """
         Split scraped text into chunks for embedding
         
+        Pages whose text is unchanged since the cached copy reuse their cached
+        chunks instead of being split again.
+        
         Args:
             scraped_data: List of dictionaries with url and text
             chunk_size: Maximum size of each chunk
             chunk_overlap: Overlap between chunks
+            chunk_unit: "chars" or "tokens" (sizes in embedding model tokens)
             
         Returns:
             List of dictionaries with text chunks and metadata
         """
+        return list(self.iter_chunks(scraped_data, chunk_size, chunk_overlap, chunk_unit))
+    
+    def iter_chunks(self, scraped_data, chunk_size=600, chunk_overlap=200, chunk_unit="chars"):
+        """
+        Split scraped pages into chunks one page at a time
+        
+        Consumes scraped_data lazily, so pages from iter_scrape_urls are chunked
+        while the rest of the crawl is still in flight.
+        
+        Args:
+            scraped_data: Iterable of dictionaries with url and text
+            chunk_size: Maximum size of each chunk
+            chunk_overlap: Overlap between chunks
+            chunk_unit: "chars" or "tokens" (sizes in embedding model tokens)
+            
+        Yields:
+            Dictionaries with text chunks and metadata
+        """
+        length_function = get_length_function(chunk_unit)
         text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=chunk_size,
             chunk_overlap=chunk_overlap,
-            length_function=len
+            length_function=length_function
         )
         
-        all_chunks = []
+        chunk_key = f"{WEB_CHUNKING_VERSION}:{CHUNKING_VERSION}:{chunk_size}:{chunk_overlap}:{chunk_unit}"
         
         for item in scraped_data:
             if item["status"] == "success":
-                chunks = text_splitter.split_text(item["text"])
+                chunk_started = time.perf_counter()
+                if self.http_cache and not item.get("changed", True):
+                    cached_chunks = self.http_cache.get_chunks(item["url"], chunk_key)
+                    if cached_chunks is not None:
+                        log_timing("chunk", url=item["url"], chunks=len(cached_chunks), cached=True,
+                                   chunk_s=round(time.perf_counter() - chunk_started, 4))
+                        yield from cached_chunks
+                        continue
+                
+                page_chunks = []
+                if item.get("pages") is not None:
+                    # Linked PDFs go through the PDF chunker, keeping section and page metadata
+                    for chunk in iter_document_chunks(item["url"], item["pages"], chunk_size, chunk_overlap,
+                                                      length_function):
+                        chunk["metadata"]["type"] = "web"
+                        chunk["metadata"]["format"] = "pdf"
+                        page_chunks.append(chunk)
+                else:
+                    for i, chunk in enumerate(text_splitter.split_text(item["text"])):
+                        page_chunks.append({
+                            "text": chunk,
+                            "metadata": {
+                                "source": item["url"],
+                                "chunk_id": i,
+                                "type": "web"
+                            }
+                        })
                 
-                for i, chunk in enumerate(chunks):
-                    all_chunks.append({
-                        "text": chunk,
-                        "metadata": {
-                            "source": item["url"],
-                            "chunk_id": i,
-                            "type": "web"
-                        }
-                    })
-        
-        return all_chunks
+                if self.http_cache:
+                    self.http_cache.put_chunks(item["url"], chunk_key, page_chunks)
+                log_timing("chunk", url=item["url"], chunks=len(page_chunks), cached=False,
+                           chunk_s=round(time.perf_counter() - chunk_started, 4))
+                yield from page_chunks
+
+
+_lxml_parsers = threading.local()
 
 
-def main(links_file="Data/Links.txt", chunk_size=600, chunk_overlap=200):
+def _get_lxml_parser():
+    """Get this thread's lxml HTML parser (parsers are not thread-safe)"""
+    parser = getattr(_lxml_parsers, "parser", None)
+    if parser is None:
+        parser = lxml.html.HTMLParser(encoding='utf-8', remove_comments=True, remove_pis=True)
+        _lxml_parsers.parser = parser
+    return parser
+
+
+def _element_text(element):
+    """
+    Join an element's non-blank text pieces with single spaces
+    
+    Matches BeautifulSoup's get_text(separator=' ', strip=True).
+    """
+    return ' '.join(piece for piece in (text.strip() for text in element.itertext()) if piece)
+
+
+def main(links_file="Data/Links.txt", chunk_size=600, chunk_overlap=200, chunk_unit="chars", use_http_cache=True):
     """
     Process web data from links file
     
@@ -266,22 +738,63 @@ def main(links_file="Data/Links.txt", chunk_size=600, chunk_overlap=200):
         links_file: Path to file containing URLs
         chunk_size: Size of chunks for processing
         chunk_overlap: Overlap between chunks
+        chunk_unit: "chars" or "tokens" (sizes in embedding model tokens)
+        use_http_cache: Revalidate pages scraped on earlier runs instead of downloading them again
     
     Returns:
         List of chunks with metadata
     """
+    web_chunks = list(iter_web_chunks(links_file, chunk_size, chunk_overlap, chunk_unit, use_http_cache))
+    
+    print(f"Created {len(web_chunks)} chunks from web data")
+    return web_chunks
+
+def iter_web_chunks(links_file="Data/Links.txt", chunk_size=600, chunk_overlap=200, chunk_unit="chars", use_http_cache=True,
+                    crawl_depth=0, max_pages=200, frontier_path=CRAWL_FRONTIER_PATH):
+    """
+    Crawl the links file and yield chunks as each page arrives
+    
+    Scraping, chunking and whatever consumes the chunks (e.g. embedding) overlap
+    instead of running back to back. Pages are chunked in completion order, so
+    the order of the chunks can differ between runs of the same crawl.
+    
+    Args:
+        links_file: Path to file containing URLs
+        chunk_size: Size of chunks for processing
+        chunk_overlap: Overlap between chunks
+        chunk_unit: "chars" or "tokens" (sizes in embedding model tokens)
+        use_http_cache: Revalidate pages scraped on earlier runs instead of downloading them again
+        crawl_depth: Same-site link hops to follow from the listed URLs (0 scrapes only the list)
+        max_pages: Maximum number of pages when crawling
+        frontier_path: File where an interrupted crawl's state is kept for resuming
+    
+    Yields:
+        Chunks with metadata
+    """
     # Initialize scraper
-    scraper = WebScraper(max_threads=5, delay=1.5)
+    http_cache = HTTPCache() if use_http_cache else None
+    scraper = WebScraper(max_threads=5, delay=1.5, http_cache=http_cache, robots_cache=RobotsCache())
     
-    # Scrape URLs
-    scraped_data = scraper.scrape_urls_from_file(links_file)
+    if crawl_depth > 0:
+        # Follow same-site links and sitemaps, skipping duplicate pages
+        crawler = SiteCrawler(scraper, max_depth=crawl_depth, max_pages=max_pages, frontier_path=frontier_path)
+        pages = crawler.crawl(scraper.read_urls(links_file))
+    else:
+        pages = scraper.iter_scrape_urls(links_file)
     
-    # Split into chunks
-    web_chunks = scraper.split_into_chunks(scraped_data, chunk_size, chunk_overlap)
+    # Scrape URLs and split each page as soon as it is scraped
+    try:
+        yield from scraper.iter_chunks(pages, chunk_size, chunk_overlap, chunk_unit)
+    finally:
+        pages.close()
+        scraper.close()
     
-    print(f"Created {len(web_chunks)} chunks from web data")
-    return web_chunks
+    if http_cache:
+        cache_stats = http_cache.stats()
+        print(f"HTTP cache: {cache_stats['not_modified']} not modified, "
+              f"{cache_stats['unchanged']} unchanged, {cache_stats['changed']} new or changed pages")
 
 
 if __name__ == "__main__":
+    configure_logging(log_file="web_scraping.log", timings_file="web_scraping_timings.jsonl")
     main() 
\ No newline at end of file